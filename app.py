@@ -180,6 +180,8 @@ from pathlib import Path
 
 # Импорт из наших модулей установки
 from app.modules.installer.install import InstallDialog
+from app.modules.installer.install_queue import get_install_queue, InstallQueueDialog
+from app.modules.installer.launch_supervisor import LaunchSupervisor
 from app.modules.installer.game_downloader import GameDownloader
 
 from core import APP_VERSION, STYLES_DIR, THEME_FILE
@@ -204,7 +206,7 @@ from modules.settings_plugins.appearance_settings import AppearanceSettingsPage
 from modules.settings_plugins.dev_settings import DevSettingsPage
 
 # Импорт пути игровых данных
-from core import get_users_path
+from core import get_users_path, load_installed_games, users_root_env
 
 class MainWindow(QMainWindow):
     """Главное окно приложения с модульной навигацией"""
@@ -261,6 +263,16 @@ class MainWindow(QMainWindow):
         # Инициализация поиска
         self.setup_search_overlay()
 
+        # Очередь установки: продолжаем задания, прерванные прошлым выходом
+        self.install_queue = get_install_queue(Path(BASE_DIR))
+        self.install_queue.job_finished.connect(self.on_queue_job_finished)
+        self.install_queue_dialog = None
+        QTimer.singleShot(0, self.install_queue.start)
+
+        # Наблюдение за запущенными играми: время запуска, длительность, память
+        self.launch_supervisor = LaunchSupervisor(self)
+        self.launch_supervisor.session_finished.connect(self.on_game_session_finished)
+
     def init_ui(self):
         """Инициализация пользовательского интерфейса"""
         # Страница библиотеки игр
@@ -448,6 +460,9 @@ class MainWindow(QMainWindow):
             # Останавливаем проверку обновлений
             self.updater.stop_checking()
 
+            # Приостанавливаем установки - очередь продолжит их при запуске
+            self.install_queue.shutdown()
+
             # Отключаем все сигналы
             try:
                 theme_manager.theme_changed.disconnect(self.apply_theme)
@@ -575,8 +590,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Файл installed_games.json не найден")
                 return
                 
-            with open(installed_games_file, 'r', encoding='utf-8') as f:
-                installed_games = json.load(f)
+            installed_games = load_installed_games(installed_games_file)
             
             game_id = game_data.get('id')
             if game_id not in installed_games:
@@ -585,14 +599,45 @@ class MainWindow(QMainWindow):
                 
             game_info = installed_games[game_id]
             launcher_path = game_info.get('launcher_path')
-            
-            if not launcher_path or not os.path.exists(launcher_path):
+
+            # Спецификация запуска (argv/env), собранная при установке
+            from app.modules.installer.launch_spec import LaunchSpec
+            spec_path = game_info.get('launch_spec_path') or (
+                str(Path(launcher_path).with_suffix('.json')) if launcher_path else None)
+            spec = LaunchSpec.load(Path(spec_path)) if spec_path else None
+
+            if not spec and (not launcher_path or not os.path.exists(launcher_path)):
                 QMessageBox.warning(self, "Ошибка", f"Лаунчер не найден: {launcher_path}")
                 return
-                
-            # Запускаем скрипт
-            import subprocess
-            subprocess.Popen(['bash', launcher_path], start_new_session=True)
+
+            # Собираем слои конфигов игры (пресет платформы, пресет игры, правки пользователя)
+            extra_env = {}
+            try:
+                from app.modules.installer.config_manager import ConfigManager
+                config_manager = ConfigManager(Path(BASE_DIR), logs_callback=logging.getLogger('ConfigManager').info)
+                config_dir = config_manager.prepare_game_config(
+                    dict(game_data, platform=game_info.get('platform', game_data.get('platform')),
+                         serial=game_info.get('serial') or game_data.get('serial')),
+                    game_info.get('emulator')
+                )
+                extra_env['XDG_CONFIG_HOME'] = str(config_dir)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось собрать конфиг игры, используется общий: {e}")
+
+            started = time.monotonic()
+            if spec:
+                # Эмулятор запускается напрямую, без bash; AppImage - из распакованного кеша, если он готов
+                executable = None
+                if app_settings.get_prelaunch_cache():
+                    from app.modules.installer.prelaunch_cache import get_prelaunch_cache
+                    executable = get_prelaunch_cache().extracted_apprun(spec.resolve(extra_env)[0][0])
+                process = spec.spawn(extra_env, executable)
+            else:
+                # Игры, установленные до появления спецификаций
+                process = subprocess.Popen(['bash', launcher_path], env={**os.environ, **users_root_env()},
+                                           start_new_session=True)
+            logger.info(f"⏱️ Процесс игры запущен за {(time.monotonic() - started) * 1000:.0f} мс (PID {process.pid})")
+            self.launch_supervisor.watch(game_id, process, game_info.get('emulator'), started)
             logger.info(f"✅ Запущена игра: {game_data.get('title')}")
             
         except Exception as e:
@@ -626,26 +671,33 @@ class MainWindow(QMainWindow):
             self.install_game(game_data)
 
     def install_game(self, game_data):
-        """Установка выбранной игры"""
+        """Установка выбранной игры через очередь установки"""
         logger.info(f"Начало установки игры: {game_data['title']}")
 
-        # Создаем и показываем диалог установки
         try:
-            installer_dialog = InstallDialog(
-                game_data=game_data,
-                project_root=Path(BASE_DIR),
-                parent=self
-            )
-            # Просто показываем диалог, не подключаем никаких сигналов
-            installer_dialog.exec()
-            
-            # После закрытия диалога обновляем статус
-            self._update_game_status_after_installation(game_data)
-            
+            self.install_queue.enqueue(game_data)
+            self.show_install_queue()
+
         except Exception as e:
-            logger.error(f"Не удалось запустить диалог установки: {e}")
+            logger.error(f"Не удалось добавить игру в очередь установки: {e}")
             QMessageBox.critical(self, "Ошибка установки", f"Не удалось начать установку: {e}")
 
+    def show_install_queue(self):
+        """Показывает немодальное окно очереди установки"""
+        if self.install_queue_dialog is None:
+            self.install_queue_dialog = InstallQueueDialog(self.install_queue, parent=self)
+        self.install_queue_dialog.show()
+        self.install_queue_dialog.raise_()
+
+    def on_game_session_finished(self, game_id, duration):
+        """Игра закрыта: обновляем время в игре, если ее страница открыта"""
+        if (self.game_info_page.game_data or {}).get('id') == game_id:
+            self.game_info_page.update_play_time()
+
+    def on_queue_job_finished(self, game_data, success):
+        """Установка из очереди завершилась: обновляем статус игры"""
+        self._update_game_status_after_installation(game_data)
+
     def _update_game_status_after_installation(self, game_data):
         """Обновляет статус игры после установки"""
         try:
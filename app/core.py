@@ -52,179 +52,187 @@ def get_users_subpath(subfolder):
     users_path = get_users_path()
     return os.path.join(users_path, subfolder)
 
-def update_launcher_scripts(old_users_path, new_users_path):
-    """
-    Обновляет пути в скриптах запуска игр после изменения расположения users
-    """
-    try:
-        logger.info(f"🔄 Обновление скриптов запуска:")
-        logger.info(f"   Старый путь: {old_users_path}")
-        logger.info(f"   Новый путь: {new_users_path}")
-
-        # Путь к папке с лаунчерами в НОВОМ расположении
-        new_launchers_dir = Path(new_users_path) / "launchers"
+# Корень users в лаунчерах, спецификациях запуска и installed_games.json
+# хранится как ${USERS_ROOT} и подставляется при запуске - перенос users
+# сводится к записи нового пути в настройки
+USERS_ROOT_VAR = "USERS_ROOT"
+USERS_ROOT_PLACEHOLDER = "${USERS_ROOT}"
 
-        # Проверяем существование папки со скриптами в НОВОМ пути
-        if not new_launchers_dir.exists():
-            logger.info(f"ℹ️ Папка со скриптами не найдена: {new_launchers_dir}")
-            return True
-
-        # Получаем все файлы скриптов из НОВОГО расположения
-        script_files = list(new_launchers_dir.glob("*.sh"))
+# Поля installed_games.json, которые содержат пути
+INSTALLED_PATH_FIELDS = ('install_path', 'launcher_path', 'launch_spec_path', 'manifest_path', 'cover_path')
 
-        if not script_files:
-            logger.info("ℹ️ Скрипты запуска не найдены")
-            return True
 
-        updated_scripts = 0
+def to_users_relative(path, users_path=None):
+    """Заменяет корень users в пути на ${USERS_ROOT}; пути вне users не меняются"""
+    value = str(path)
+    root = os.path.normpath(str(users_path or get_users_path()))
+    if value == root or value.startswith(root + os.sep):
+        return USERS_ROOT_PLACEHOLDER + value[len(root):]
+    return value
 
-        for script_file in script_files:
-            try:
-                # Читаем содержимое скрипта
-                with open(script_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
 
-                # Сохраняем оригинальное содержимое для сравнения
-                old_content = content
+def resolve_users_path(value, users_path=None):
+    """Подставляет текущий корень users вместо ${USERS_ROOT}"""
+    if not isinstance(value, str) or USERS_ROOT_PLACEHOLDER not in value:
+        return value
+    return value.replace(USERS_ROOT_PLACEHOLDER, str(users_path or get_users_path()))
 
-                # Ищем ВСЕ пути, содержащие "ArcadeDeck/users" и заменяем их
-                import re
 
-                # Паттерн для поиска всех путей ArcadeDeck/users
-                pattern = r'/home/deck/[^/]+/ArcadeDeck/users'
+def users_root_env():
+    """Переменные окружения для раскрытия плейсхолдеров при запуске"""
+    return {USERS_ROOT_VAR: str(get_users_path())}
 
-                # Заменяем все старые пути на новый
-                content = re.sub(pattern, new_users_path, content)
 
-                # Дополнительно: заменяем конкретный старый путь, если он отличается от pattern
-                if old_users_path in content:
-                    content = content.replace(old_users_path, new_users_path)
+def load_installed_games(installed_games_file=None):
+    """Читает installed_games.json с уже подставленным корнем users"""
+    users_path = get_users_path()
+    installed_games_file = Path(installed_games_file or Path(users_path) / "installed_games.json")
+    if not installed_games_file.exists():
+        return {}
+    with open(installed_games_file, 'r', encoding='utf-8') as f:
+        installed_games = json.load(f)
+
+    for game_info in installed_games.values():
+        if isinstance(game_info, dict):
+            for field in INSTALLED_PATH_FIELDS:
+                if field in game_info:
+                    game_info[field] = resolve_users_path(game_info[field], users_path)
+    return installed_games
+
+
+def save_installed_games(installed_games, installed_games_file=None):
+    """Атомарно сохраняет installed_games.json, заменяя корень users на ${USERS_ROOT}"""
+    users_path = get_users_path()
+    installed_games_file = Path(installed_games_file or Path(users_path) / "installed_games.json")
 
-                # Если изменения были, сохраняем обновленный скрипт
-                if content != old_content:
-                    # Перезаписываем тот же файл
-                    with open(script_file, 'w', encoding='utf-8') as f:
-                        f.write(content)
+    relocatable = {}
+    for game_id, game_info in installed_games.items():
+        if isinstance(game_info, dict):
+            game_info = dict(game_info)
+            for field in INSTALLED_PATH_FIELDS:
+                if game_info.get(field):
+                    game_info[field] = to_users_relative(game_info[field], users_path)
+        relocatable[game_id] = game_info
 
-                    # Делаем скрипт исполняемым (на всякий случай)
-                    script_file.chmod(0o755)
+    installed_games_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = installed_games_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(relocatable, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, installed_games_file)
 
-                    updated_scripts += 1
-                    logger.info(f"✅ Обновлен скрипт: {script_file.name}")
 
-                    # Детальное логирование изменений
-                    old_lines = old_content.split('\n')
-                    new_lines = content.split('\n')
+def regenerate_launchers(force=False):
+    """
+    Пакетная перегенерация лаунчеров: пересобираются только те, у которых
+    изменились входные данные (профиль эмулятора, путь к игре, формат скрипта).
+    Возвращает (пересобрано, без изменений, ошибок).
+    """
+    from app.modules.installer.launch_manager import LaunchManager
+    return LaunchManager(Path(BASE_DIR)).regenerate_launchers(force=force)
 
-                    for i, (old_line, new_line) in enumerate(zip(old_lines, new_lines)):
-                        if old_line != new_line:
-                            logger.info(f"   Строка {i+1}:")
-                            logger.info(f"     Было: {old_line}")
-                            logger.info(f"     Стало: {new_line}")
-                else:
-                    logger.info(f"ℹ️ Скрипт {script_file.name} не требует обновления")
 
-            except Exception as e:
-                logger.error(f"❌ Ошибка при обновлении скрипта {script_file.name}: {e}")
+def migrate_manifests(old_users_path, new_users_path):
+    """
+    Переводит root манифестов установок (users/manifests/*.json) с абсолютного
+    пути на ${USERS_ROOT}. Манифесты, оставшиеся в старой папке users,
+    переносятся в новую. Возвращает число измененных манифестов.
+    """
+    new_dir = Path(new_users_path) / "manifests"
+    sources = [new_dir]
+    old_dir = Path(old_users_path) / "manifests"
+    if old_dir != new_dir:
+        sources.append(old_dir)
+
+    migrated = 0
+    for source_dir in sources:
+        if not source_dir.is_dir():
+            continue
+        for manifest_file in source_dir.glob("*.json"):
+            target_file = new_dir / manifest_file.name
+            if source_dir != new_dir and target_file.exists():
                 continue
+            try:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                root = str(data.get('root', ''))
+                if root and USERS_ROOT_PLACEHOLDER not in root:
+                    relative = to_users_relative(root, old_users_path)
+                    if relative == root:
+                        relative = to_users_relative(root, new_users_path)
+                    data['root'] = relative
+                if data.get('root') == root and source_dir == new_dir:
+                    continue
+
+                new_dir.mkdir(parents=True, exist_ok=True)
+                tmp_file = target_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, target_file)
+                if source_dir != new_dir:
+                    manifest_file.unlink()
+                migrated += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось перенести манифест {manifest_file}: {e}")
+    return migrated
 
-        logger.info(f"✅ Обновлено скриптов: {updated_scripts}/{len(script_files)}")
-        return True
-
-    except Exception as e:
-        logger.error(f"❌ Ошибка при обновлении скриптов запуска: {e}")
-        import traceback
-        logger.error(f"📋 Подробности ошибки: {traceback.format_exc()}")
-        return False
 
 def update_installation_paths(old_users_path, new_users_path):
     """
-    Обновляет пути в installed_games.json и скриптах запуска после изменения расположения users
+    Переносит installed_games.json после изменения расположения users.
+
+    Пути в реестре, лаунчерах и спецификациях запуска относительны ${USERS_ROOT},
+    поэтому обычно достаточно сохранить новый путь в настройках. Записи,
+    манифесты и лаунчеры старого формата с абсолютными путями переводятся
+    на плейсхолдер один раз.
     """
     try:
-        # Ищем installed_games.json в СТАРОМ пути (где он реально находится)
         old_installed_games_file = Path(old_users_path) / "installed_games.json"
         new_installed_games_file = Path(new_users_path) / "installed_games.json"
 
-        logger.info(f"🔍 Поиск installed_games.json:")
-        logger.info(f"   Старый путь: {old_installed_games_file}")
-        logger.info(f"   Новый путь: {new_installed_games_file}")
-
-        # Сначала проверяем старый путь (где файл реально находится)
-        installed_games_file = None
         if old_installed_games_file.exists():
             installed_games_file = old_installed_games_file
-            logger.info(f"✅ Найден installed_games.json в старом пути")
         elif new_installed_games_file.exists():
             installed_games_file = new_installed_games_file
-            logger.info(f"✅ Найден installed_games.json в новом пути")
         else:
-            logger.info("❌ Файл installed_games.json не найден ни в старом, ни в новом пути")
+            logger.info("ℹ️ Файл installed_games.json не найден, обновлять нечего")
             return True
 
-        # Читаем файл
-        logger.info(f"📖 Чтение файла: {installed_games_file}")
         with open(installed_games_file, 'r', encoding='utf-8') as f:
             installed_games = json.load(f)
 
-        updated = False
-
+        # Миграция абсолютных путей старого формата на ${USERS_ROOT}
+        migrated = 0
         for game_id, game_info in installed_games.items():
-            # Обновляем путь к лаунчеру (скрипту запуска)
-            if game_info.get('launcher_path'):
-                old_launcher_path = game_info['launcher_path']
-
-                # Извлекаем относительный путь от старой папки users
-                if old_users_path in old_launcher_path:
-                    relative_launcher_path = Path(old_launcher_path).relative_to(Path(old_users_path))
-                    new_launcher_path = str(Path(new_users_path) / relative_launcher_path)
-                    game_info['launcher_path'] = new_launcher_path
-                    updated = True
-                    logger.info(f"🔄 Обновлен путь лаунчера для {game_id}:")
-                    logger.info(f"   Было: {old_launcher_path}")
-                    logger.info(f"   Стало: {new_launcher_path}")
-
-            # Обновляем путь к файлу игры
-            if game_info.get('install_path'):
-                old_install_path = game_info['install_path']
-
-                # Извлекаем относительный путь от старой папки users
-                if old_users_path in old_install_path:
-                    relative_install_path = Path(old_install_path).relative_to(Path(old_users_path))
-                    new_install_path = str(Path(new_users_path) / relative_install_path)
-                    game_info['install_path'] = new_install_path
-                    updated = True
-                    logger.info(f"🔄 Обновлен путь игры для {game_id}:")
-                    logger.info(f"   Было: {old_install_path}")
-                    logger.info(f"   Стало: {new_install_path}")
-
-        if updated:
-            # Сохраняем обновленный файл в НОВОМ пути
-            new_installed_games_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(new_installed_games_file, 'w', encoding='utf-8') as f:
-                json.dump(installed_games, f, ensure_ascii=False, indent=2)
-
-            # Если файл был в старом пути, удаляем его оттуда
-            if installed_games_file == old_installed_games_file and old_installed_games_file.exists():
+            if not isinstance(game_info, dict):
+                continue
+            for field in INSTALLED_PATH_FIELDS:
+                value = game_info.get(field)
+                if not value or USERS_ROOT_PLACEHOLDER in str(value):
+                    continue
+                relative = to_users_relative(value, old_users_path)
+                if relative == value:
+                    relative = to_users_relative(value, new_users_path)
+                if relative != value:
+                    game_info[field] = relative
+                    migrated += 1
+
+        if migrated or installed_games_file != new_installed_games_file:
+            save_installed_games(installed_games, new_installed_games_file)
+            if installed_games_file == old_installed_games_file and old_installed_games_file != new_installed_games_file:
                 old_installed_games_file.unlink()
-                logger.info(f"🗑️ Удален старый файл installed_games.json: {old_installed_games_file}")
-
-            logger.info("✅ Все пути в installed_games.json успешно обновлены")
-
-            # Логируем результат для проверки
-            logger.info("📋 Итоговые пути в installed_games.json:")
-            for game_id, game_info in installed_games.items():
-                logger.info(f"   {game_id}:")
-                logger.info(f"     install_path: {game_info.get('install_path')}")
-                logger.info(f"     launcher_path: {game_info.get('launcher_path')}")
-
+            logger.info(f"✅ installed_games.json перенесен, переведено на ${{USERS_ROOT}} путей: {migrated}")
         else:
-            logger.info("ℹ️ Обновление путей не требуется (пути уже актуальны)")
+            logger.info("ℹ️ Пути в installed_games.json уже относительны, обновление не требуется")
 
-        # ОБНОВЛЯЕМ СКРИПТЫ ЗАПУСКА
-        scripts_updated = update_launcher_scripts(old_users_path, new_users_path)
+        # Манифесты установок старого формата хранят абсолютный корень
+        migrated_manifests = migrate_manifests(old_users_path, new_users_path)
+        if migrated_manifests:
+            logger.info(f"✅ Манифесты установок переведены на ${{USERS_ROOT}}: {migrated_manifests}")
 
-        return updated and scripts_updated
+        # Лаунчеры старого формата пересобираются, остальные пропускаются
+        rebuilt, unchanged, failed = regenerate_launchers()
+        logger.info(f"✅ Лаунчеры: пересобрано {rebuilt}, без изменений {unchanged}, ошибок {failed}")
+        return failed == 0
 
     except Exception as e:
         logger.error(f"❌ Ошибка при обновлении путей: {e}")
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
+import os
 import logging
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal, QThread
 import time
 import subprocess
 import shutil
+import threading
+
+from .format_detector import detect_format
+from .extract_journal import ExtractJournal
+from .ps3_index import get_ps3_index
 
 logger = logging.getLogger('ArchiveExtractor')
 
@@ -14,14 +20,19 @@ class ArchiveExtractor(QThread):
     error_occurred = pyqtSignal(str)
     files_extracted = pyqtSignal(list)
 
-    def __init__(self, game_data: dict, download_dir: Path, parent=None):
+    def __init__(self, game_data: dict, download_dir: Path, planner=None, parent=None):
         super().__init__(parent)
         self.game_data = game_data
         self.download_dir = download_dir
+        self.planner = planner
         self._cancelled = False
+        self.failed = False
         self.last_update_time = 0
         self.update_interval = 0.5
         self.extracted_files = []
+        # Распакованный архив и ожидаемые размеры его файлов (для проверки перед удалением)
+        self.archive_path = None
+        self.entry_sizes = {}
 
         # Проверяем зависимости при инициализации
         self._ensure_dependencies()
@@ -55,46 +66,11 @@ class ArchiveExtractor(QThread):
             logger.info(f"📋 Определен архив по расширению: {file_path.suffix}")
             return True
 
-        # Проверка сигнатур
-        try:
-            with open(file_path, 'rb') as f:
-                header = f.read(12)
-
-            archive_signatures = {
-                b'PK\x03\x04': 'ZIP',
-                b'Rar!\x1A\x07\x00': 'RAR5',
-                b'Rar!\x1A\x07\x01': 'RAR5',
-                b'Rar!\x1A\x07': 'RAR',
-                b'7z\xBC\xAF\x27\x1C': '7ZIP',
-                b'\x1F\x8B\x08': 'GZIP',
-                b'BZh': 'BZIP2',
-                b'\xFD7zXZ\x00': 'XZ',
-                b'# archiver': 'ARJ',
-                b'!<arch>': 'AR (Unix)',
-                b'\x60\xEA': 'AR (Unix)',
-                b'MSZIP': 'CAB (Microsoft)',
-                b'MSCF': 'CAB (Microsoft)',
-                b'-lh': 'LHA/LZH',
-                b'-lz': 'LHA/LZH'
-            }
-
-            for signature, format_name in archive_signatures.items():
-                if header.startswith(signature):
-                    logger.info(f"📋 Обнаружена сигнатура архива: {format_name}")
-                    return True
-
-            # Проверка для TAR архивов
-            if len(header) >= 512:
-                if header[257:262] == b'ustar' or header[257:263] == b'ustar ':
-                    logger.info("📋 Обнаружена сигнатура TAR")
-                    return True
-
-                if header[257:263] == b'ustar\x00':
-                    logger.info("📋 Обнаружена сигнатура TAR (GNU)")
-                    return True
-
-        except Exception as e:
-            logger.warning(f"⚠️ Не удалось прочитать сигнатуру файла: {e}")
+        # Проверка сигнатур (общий детектор, результат кэшируется)
+        file_format = detect_format(file_path)
+        if file_format.is_archive:
+            logger.info(f"📋 Обнаружена сигнатура архива: {file_format.kind}")
+            return True
 
         logger.info(f"📋 Файл не является архивом: {file_path.suffix}")
         return False
@@ -116,6 +92,34 @@ class ArchiveExtractor(QThread):
             logger.error(f"❌ Архив поврежден: {e}")
             return False
 
+    def _get_unpacked_size(self, archive_path: Path) -> int:
+        """Размер содержимого архива после распаковки (по оглавлению)"""
+        try:
+            if archive_path.suffix.lower() == '.rar':
+                import rarfile
+                with rarfile.RarFile(str(archive_path)) as rf:
+                    return sum(info.file_size for info in rf.infolist() if not info.isdir())
+
+            import libarchive
+            total_size = 0
+            with libarchive.file_reader(str(archive_path)) as archive:
+                for entry in archive:
+                    if not entry.isdir:
+                        total_size += entry.size or 0
+            return total_size
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось определить размер содержимого архива: {e}")
+            return 0
+
+    def _collect_extracted(self, names) -> list:
+        """Возвращает пути распакованных файлов по именам из оглавления архива"""
+        extracted = []
+        for name in names:
+            file_path = self.download_dir / name
+            if file_path.is_file():
+                extracted.append(file_path)
+        return extracted
+
     def _extract_rar_with_unrar(self, archive_path: Path):
         """Распаковывает RAR архив с помощью unrar (системная утилита)"""
         try:
@@ -143,18 +147,36 @@ class ArchiveExtractor(QThread):
             logger.info(f"📊 В RAR архиве {total_files} файлов")
             self.progress_updated.emit(0, f"📦 Распаковка RAR ({total_files} файлов)...")
 
-            # Распаковка
-            result = subprocess.run([
+            # Распаковка (процесс прерывается при отмене)
+            process = subprocess.Popen([
                 unrar_path, 'x', '-y', str(archive_path), str(self.download_dir)
-            ], capture_output=True, text=True, check=True)
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+            while True:
+                try:
+                    process.wait(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self._cancelled:
+                        process.terminate()
+                        process.wait()
+                        logger.info("🚫 unrar остановлен по запросу отмены")
+                        return
+
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    process.returncode, unrar_path, stderr=process.stderr.read()
+                )
 
             logger.info("✅ RAR распаковка через unrar завершена")
 
-            # Собираем список распакованных файлов
-            self.extracted_files = []
-            for file_path in self.download_dir.rglob('*'):
-                if file_path.is_file() and file_path != archive_path:
-                    self.extracted_files.append(file_path)
+            # Список распакованных файлов берем из оглавления архива,
+            # а не сканированием всей папки загрузки
+            self.extracted_files = self._collect_extracted(
+                name.strip() for name in file_list if name.strip()
+            )
+            # unrar lb не сообщает размеры - проверяем только наличие
+            self.entry_sizes = {file_path: None for file_path in self.extracted_files}
 
         except subprocess.CalledProcessError as e:
             raise Exception(f"Ошибка unrar: {e.stderr}")
@@ -174,20 +196,39 @@ class ArchiveExtractor(QThread):
                 logger.info(f"🔧 Установлен путь к unrar: {unrar_path}")
 
             with rarfile.RarFile(str(archive_path)) as rf:
-                file_list = rf.namelist()
+                file_infos = [info for info in rf.infolist() if not info.isdir()]
+                file_list = [info.filename for info in file_infos]
                 total_files = len(file_list)
 
                 logger.info(f"📊 В RAR архиве {total_files} файлов")
                 self.progress_updated.emit(0, f"📦 Распаковка RAR ({total_files} файлов)...")
 
-                # Распаковка
-                rf.extractall(path=str(self.download_dir))
+                # Распаковка одним проходом: в солидном архиве извлечение по одному
+                # файлу каждый раз разжимает блок с начала. Журнал - после каждого файла
+                journal = ExtractJournal(self.download_dir, archive_path)
+                remaining = [info for info in file_infos
+                             if not journal.is_done(info.filename, info.file_size)]
+                try:
+                    if remaining and unrar_path:
+                        self._extract_rar_stream(archive_path, unrar_path, remaining,
+                                                 total_files, journal)
+                    elif remaining:
+                        rf.extractall(path=str(self.download_dir), members=remaining)
+                        for info in remaining:
+                            journal.mark_done(info.filename, info.file_size)
+                finally:
+                    journal.flush()
+
+                if self._cancelled:
+                    return True
+
+            journal.remove()
 
-            # Собираем список распакованных файлов
-            self.extracted_files = []
-            for file_path in self.download_dir.rglob('*'):
-                if file_path.is_file() and file_path != archive_path:
-                    self.extracted_files.append(file_path)
+            # Список распакованных файлов берем из оглавления архива
+            self.extracted_files = self._collect_extracted(file_list)
+            self.entry_sizes = {
+                self.download_dir / info.filename: info.file_size for info in file_infos
+            }
 
             logger.info(f"✅ Rarfile распаковал {len(self.extracted_files)} файлов")
             return True
@@ -199,11 +240,74 @@ class ArchiveExtractor(QThread):
             logger.error(f"❌ Ошибка rarfile: {e}")
             return False
 
+    def _extract_rar_stream(self, archive_path: Path, unrar_path: str, remaining: list,
+                            total_files: int, journal: ExtractJournal):
+        """
+        Распаковывает оставшиеся файлы RAR одним процессом unrar. unrar сообщает
+        о каждом записанном файле ("Extracting  <путь>  OK"), и в журнале
+        отмечается файл с этим именем сразу после записи.
+        """
+        # Недописанные файлы прошлой попытки удаляем, готовые unrar пропустит (-o-)
+        for info in remaining:
+            (self.download_dir / info.filename).unlink(missing_ok=True)
+
+        process = subprocess.Popen([
+            unrar_path, 'x', '-y', '-o-', '-idc', '-idp', str(archive_path), f"{self.download_dir}{os.sep}"
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace')
+
+        def stop_on_cancel():
+            # Вывод unrar читается построчно - отмену отслеживаем отдельно
+            while process.poll() is None:
+                if self._cancelled:
+                    process.terminate()
+                    return
+                time.sleep(0.5)
+
+        threading.Thread(target=stop_on_cancel, daemon=True).start()
+
+        done = total_files - len(remaining)
+        pending = {info.filename.replace('\\', '/'): info for info in remaining}
+        prefix = f"{self.download_dir}{os.sep}"
+        for line in process.stdout:
+            line = line.strip()
+            if not line.startswith('Extracting ') or not line.endswith('OK'):
+                continue
+            name = line[len('Extracting '):-len('OK')].strip()
+            if name.startswith(prefix):
+                name = name[len(prefix):]
+            info = pending.pop(name, None)
+            if info is None:
+                logger.warning(f"⚠️ unrar сообщил о неизвестном файле: {name}")
+                continue
+            journal.mark_done(info.filename, info.file_size)
+            done += 1
+
+            current_time = time.time()
+            if current_time - self.last_update_time >= self.update_interval:
+                progress_percent = int((done / total_files) * 100)
+                self.progress_updated.emit(
+                    progress_percent,
+                    f"📦 Распаковка RAR: {progress_percent}% ({done}/{total_files})"
+                )
+                self.last_update_time = current_time
+        process.wait()
+
+        if self._cancelled or process.returncode != 0:
+            # Среди неотмеченных - файл, на котором остановился unrar, он записан не полностью
+            for info in pending.values():
+                (self.download_dir / info.filename).unlink(missing_ok=True)
+        if self._cancelled:
+            logger.info("🚫 unrar остановлен по запросу отмены")
+            return
+        if process.returncode != 0:
+            raise Exception(f"unrar завершился с кодом {process.returncode}: {process.stderr.read().strip()}")
+
     def _extract_with_libarchive(self, archive_path: Path):
-        """Распаковка через libarchive"""
+        """Распаковка через libarchive с журналом (пропуск уже записанных файлов)"""
         try:
             import libarchive
             self.extracted_files = []
+            self.entry_sizes = {}
 
             logger.info(f"📦 Распаковываю архив {archive_path.name} через libarchive...")
             self.progress_updated.emit(0, "📊 Подсчет файлов в архиве...")
@@ -225,59 +329,93 @@ class ArchiveExtractor(QThread):
             logger.info(f"📊 В архиве {total_files} файлов, общий размер: {self._format_size(total_size)}")
             self.progress_updated.emit(0, f"📦 Распаковка {total_files} файлов...")
 
+            journal = ExtractJournal(self.download_dir, archive_path)
+
             # Распаковка
             extracted_files = 0
+            skipped_files = 0
             extracted_size = 0
             start_time = time.time()
             self.last_update_time = start_time
 
-            with libarchive.file_reader(str(archive_path)) as archive:
-                for entry in archive:
-                    if self._cancelled:
-                        break
-
-                    if entry.isdir:
-                        target_dir = self.download_dir / entry.pathname
-                        target_dir.mkdir(parents=True, exist_ok=True)
-                        continue
-
-                    target_file = self.download_dir / entry.pathname
-                    target_file.parent.mkdir(parents=True, exist_ok=True)
-
-                    with open(target_file, 'wb') as f:
-                        for block in entry.get_blocks():
-                            if self._cancelled:
+            try:
+                with libarchive.file_reader(str(archive_path)) as archive:
+                    for entry in archive:
+                        if self._cancelled:
+                            break
+
+                        if entry.isdir:
+                            target_dir = self.download_dir / entry.pathname
+                            target_dir.mkdir(parents=True, exist_ok=True)
+                            continue
+
+                        target_file = self.download_dir / entry.pathname
+
+                        if journal.is_done(entry.pathname, entry.size):
+                            # Файл записан в прошлой попытке - данные не читаем
+                            skipped_files += 1
+                            extracted_size += entry.size
+                        else:
+                            target_file.parent.mkdir(parents=True, exist_ok=True)
+                            if not self._write_entry(entry, target_file):
                                 break
-                            f.write(block)
-                            extracted_size += len(block)
-
-                    # Добавляем файл в список распакованных
-                    self.extracted_files.append(target_file)
-                    extracted_files += 1
-
-                    # Обновляем прогресс с ограниченной частотой
-                    current_time = time.time()
-                    if current_time - self.last_update_time >= self.update_interval:
-                        progress_percent = int((extracted_size / total_size) * 100) if total_size > 0 else 0
-                        remaining_size = total_size - extracted_size
-
-                        self.progress_updated.emit(
-                            progress_percent,
-                            f"📦 Распаковка: {progress_percent}% ({self._format_size(remaining_size)})"
-                        )
-                        self.last_update_time = current_time
+                            extracted_size += entry.size
+                            journal.mark_done(entry.pathname, entry.size)
+
+                        # Добавляем файл в список распакованных
+                        self.extracted_files.append(target_file)
+                        self.entry_sizes[target_file] = entry.size
+                        extracted_files += 1
+
+                        # Обновляем прогресс с ограниченной частотой
+                        current_time = time.time()
+                        if current_time - self.last_update_time >= self.update_interval:
+                            progress_percent = int((extracted_size / total_size) * 100) if total_size > 0 else 0
+                            remaining_size = total_size - extracted_size
+
+                            self.progress_updated.emit(
+                                progress_percent,
+                                f"📦 Распаковка: {progress_percent}% ({self._format_size(remaining_size)})"
+                            )
+                            self.last_update_time = current_time
+            finally:
+                journal.flush()
 
             # Финальное обновление
             if not self._cancelled:
+                journal.remove()
+                if skipped_files:
+                    logger.info(f"⏭️ Пропущено уже распакованных файлов: {skipped_files}")
                 logger.info(f"✅ Распаковано {extracted_files} файлов через libarchive")
                 self.progress_updated.emit(100, f"✅ Распаковано {extracted_files} файлов")
 
         except Exception as e:
             raise Exception(f"Ошибка libarchive: {e}")
 
+    def _write_entry(self, entry, target_file: Path) -> bool:
+        """
+        Записывает один файл архива. При отмене недописанный файл удаляется,
+        чтобы на диске не оставалось частичных данных.
+        """
+        try:
+            with open(target_file, 'wb') as f:
+                for block in entry.get_blocks():
+                    if self._cancelled:
+                        break
+                    f.write(block)
+        except BaseException:
+            target_file.unlink(missing_ok=True)
+            raise
+
+        if self._cancelled:
+            target_file.unlink(missing_ok=True)
+            logger.info(f"🧹 Удален недописанный файл: {target_file.name}")
+            return False
+        return True
+
     def _is_ps3_pkg_file(self, file_path: Path) -> bool:
         """Определяет, является ли файл PS3 PKG"""
-        if file_path.suffix.lower() == '.pkg':
+        if file_path.suffix.lower() == '.pkg' or detect_format(file_path).kind == 'pkg':
             logger.info(f"📦 Обнаружен PS3 PKG файл: {file_path.name}")
             return True
         return False
@@ -285,33 +423,20 @@ class ArchiveExtractor(QThread):
     def _is_ps3_iso_file(self, file_path: Path) -> bool:
         """Определяет, является ли файл PS3 ISO"""
         if file_path.suffix.lower() == '.iso':
-            # Дополнительная проверка для PS3 ISO
-            try:
-                with open(file_path, 'rb') as f:
-                    header = f.read(16)
-                    # Проверяем сигнатуры PS3 ISO
-                    if header.startswith(b'PS3') or b'PLAYSTATION' in header.upper():
-                        logger.info(f"🎮 Обнаружен PS3 ISO файл: {file_path.name}")
-                        return True
-            except:
-                pass
+            # PS3 определяем по системному идентификатору ISO9660 / метке PlayStation3
+            if detect_format(file_path).platform_hint == 'PS3':
+                logger.info(f"🎮 Обнаружен PS3 ISO файл: {file_path.name}")
+                return True
         return False
 
     def _is_ps3_folder_structure(self, file_path: Path) -> bool:
         """Определяет, является ли папка структурой PS3 игры"""
         if file_path.is_dir():
-            # Проверяем наличие ключевых файлов PS3
-            ps3_files = [
-                file_path / "EBOOT.BIN",
-                file_path / "USRDIR" / "EBOOT.BIN",
-                file_path / "PS3_GAME" / "PARAM.SFO",
-                file_path / "PARAM.SFO"
-            ]
-
-            for ps3_file in ps3_files:
-                if ps3_file.exists():
-                    logger.info(f"📁 Обнаружена папка PS3 игры: {file_path.name}")
-                    return True
+            # PARAM.SFO или EBOOT.BIN в раскладке диска или dev_hdd0 (один scandir)
+            record = get_ps3_index().title_info(file_path)
+            if record:
+                logger.info(f"📁 Обнаружена папка PS3 игры: {file_path.name} ({record['title_id'] or 'без PARAM.SFO'})")
+                return True
         return False
 
     def _get_ps3_game_type(self, file_path: Path) -> str:
@@ -351,10 +476,17 @@ class ArchiveExtractor(QThread):
         if not self._check_archive_integrity(archive_path):
             logger.warning("⚠️ Архив не прошел проверку целостности")
 
+        # Проверяем место под распакованное содержимое до начала записи
+        if self.planner:
+            ok, message = self.planner.check_extraction(self._get_unpacked_size(archive_path))
+            if not ok:
+                raise Exception(message)
+
         # Определяем приоритет методов в зависимости от типа архива
         archive_ext = archive_path.suffix.lower()
+        archive_kind = detect_format(archive_path).kind
 
-        if archive_ext == '.rar':
+        if archive_ext == '.rar' or archive_kind in ('rar', 'rar5'):
             # Для RAR архивов пробуем в таком порядке:
             methods = [
                 self._extract_with_rarfile,    # 1. rarfile (Python)
@@ -498,6 +630,7 @@ class ArchiveExtractor(QThread):
         try:
             logger.info(f"📦 Начинаю распаковку: {downloaded_file.name}")
             self.progress_updated.emit(0, f"Подготовка к распаковке: {downloaded_file.name}")
+            self.archive_path = downloaded_file
             self._extract_archive(downloaded_file)
 
             if not self._cancelled:
@@ -509,10 +642,12 @@ class ArchiveExtractor(QThread):
 
         except Exception as e:
             if not self._cancelled:
+                self.failed = True
                 error_msg = f"Ошибка при распаковке: {e}"
                 logger.error(f"❌ {error_msg}")
                 self.error_occurred.emit(error_msg)
 
     def cancel(self):
+        """Отмена распаковки: запись текущего файла прерывается, недописанный файл удаляется"""
         self._cancelled = True
         logger.info("🚫 Запрос отмены распаковки")
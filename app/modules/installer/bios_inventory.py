@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('BIOSInventory')
+
+
+class BIOSInventory:
+    """
+    Учет установленных файлов BIOS платформы: путь, размер, mtime и SHA-1.
+    Хранится в users/bios/<platform>/.bios_inventory.json.
+    Если размер и mtime файла не менялись, хэш повторно не считается.
+    Файлы, которых не оказалось в скачанном архиве, запоминаются как
+    недоступные и не вызывают повторной загрузки, пока запись реестра
+    BIOS не изменится.
+    """
+
+    FILE_NAME = '.bios_inventory.json'
+    HASH_CHUNK = 1024 * 1024
+
+    def __init__(self, bios_dir: Path):
+        self.bios_dir = Path(bios_dir)
+        self.path = self.bios_dir / self.FILE_NAME
+        self.files: Dict[str, dict] = {}
+        # {'source': отпечаток записи реестра, 'files': [имена]}
+        self.unavailable: Dict = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.files = data.get('files', {})
+            self.unavailable = data.get('unavailable', {})
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прочитать инвентарь BIOS: {e}")
+            self.files = {}
+            self.unavailable = {}
+
+    def save(self):
+        """Атомарно сохраняет инвентарь"""
+        self.bios_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files, 'unavailable': self.unavailable}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def _hash_file(cls, file_path: Path) -> str:
+        sha1 = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
+    def _locate(self, names: List[str]) -> Dict[str, Path]:
+        """Находит файлы BIOS: сначала по записанному пути, затем одним обходом папки"""
+        found = {}
+        for name in names:
+            record = self.files.get(name)
+            candidates = [self.bios_dir / record['path']] if record else []
+            candidates.append(self.bios_dir / name)
+            for candidate in candidates:
+                if candidate.is_file():
+                    found[name] = candidate
+                    break
+
+        pending = set(names) - set(found)
+        if pending and self.bios_dir.exists():
+            # Архив мог распаковаться во вложенную папку
+            for dirpath, _, filenames in os.walk(self.bios_dir):
+                for filename in filenames:
+                    if filename in pending:
+                        found[filename] = Path(dirpath) / filename
+                        pending.discard(filename)
+                if not pending:
+                    break
+        return found
+
+    def _validate(self, name: str, file_path: Path) -> bool:
+        """Проверяет файл по инвентарю; новый или измененный файл перехэшируется"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+
+        if st.st_size == 0:
+            logger.warning(f"⚠️ Пустой файл BIOS: {name}")
+            return False
+
+        record = self.files.get(name)
+        if record and record.get('size') == st.st_size and record.get('mtime') == st.st_mtime_ns:
+            return True
+
+        file_hash = self._hash_file(file_path)
+        if record and record.get('sha1') and record['sha1'] != file_hash:
+            logger.warning(f"⚠️ Файл BIOS поврежден или изменен: {name}")
+            return False
+
+        self._record(name, file_path, st, file_hash)
+        return True
+
+    def _record(self, name: str, file_path: Path, st: os.stat_result, file_hash: str):
+        self.files[name] = {
+            'path': file_path.relative_to(self.bios_dir).as_posix(),
+            'size': st.st_size,
+            'mtime': st.st_mtime_ns,
+            'sha1': file_hash
+        }
+
+    @staticmethod
+    def source_key(bios_info: dict) -> str:
+        """Отпечаток записи реестра BIOS: при ее изменении недоступные файлы проверяются снова"""
+        return hashlib.sha1(json.dumps(bios_info, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def mark_unavailable(self, names: List[str], source: str):
+        """Запоминает файлы, которых нет в архиве текущей записи реестра"""
+        self.unavailable = {'source': source, 'files': sorted(names)} if names else {}
+        self.save()
+
+    def missing_files(self, names: List[str], source: Optional[str] = None) -> List[str]:
+        """
+        Возвращает список отсутствующих или поврежденных файлов BIOS.
+        С source не учитываются файлы, недоступные в архиве этой же записи реестра.
+        """
+        located = self._locate(names)
+        missing = []
+        changed = False
+        for name in names:
+            file_path = located.get(name)
+            before = self.files.get(name)
+            if not file_path or not self._validate(name, file_path):
+                missing.append(name)
+            changed = changed or self.files.get(name) != before
+
+        if changed:
+            self.save()
+
+        if source and self.unavailable.get('source') == source:
+            unavailable = set(self.unavailable.get('files', []))
+            skipped = [name for name in missing if name in unavailable]
+            if skipped:
+                logger.info(f"ℹ️ Нет в архиве BIOS, повторно не скачиваются: {skipped}")
+            missing = [name for name in missing if name not in unavailable]
+        return missing
+
+    def record_files(self, names: List[str]) -> List[str]:
+        """
+        Записывает в инвентарь свежескачанные файлы (прежние хэши не действуют).
+        Возвращает список файлов, которых по-прежнему нет.
+        """
+        located = self._locate(names)
+        missing = []
+        for name in names:
+            file_path = located.get(name)
+            if not file_path:
+                missing.append(name)
+                continue
+            self._record(name, file_path, os.stat(file_path), self._hash_file(file_path))
+
+        self.save()
+        return missing
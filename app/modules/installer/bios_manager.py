@@ -1,5 +1,6 @@
 # bios_manager.py
 #!/usr/bin/env python3
+import gzip
 import json
 import logging
 import shutil
@@ -7,7 +8,10 @@ import zipfile
 from pathlib import Path
 from urllib.parse import unquote, urlparse
 from PyQt6.QtCore import QThread, pyqtSignal
-import requests
+
+from .format_detector import detect_format
+from .http_downloader import HttpDownloader, get_session
+from .bios_inventory import BIOSInventory
 
 logger = logging.getLogger('BIOSManager')
 
@@ -30,7 +34,7 @@ class YandexDownloader:
             # Получаем прямую ссылку через Яндекс API
             api_url = f"https://cloud-api.yandex.net/v1/disk/public/resources/download?public_key=https://disk.yandex.ru/d/{public_key}"
 
-            response = requests.get(api_url)
+            response = get_session().get(api_url, timeout=30)
             if response.status_code != 200:
                 logger.error("❌ Не удалось получить ссылку Яндекс.Диска")
                 return False
@@ -50,36 +54,14 @@ class YandexDownloader:
 
     @staticmethod
     def _download_direct(url: str, target_path: Path, progress_callback=None) -> bool:
-        """Прямая загрузка файла"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
-                'Accept': '*/*'
-            }
-
-            response = requests.get(url, stream=True, headers=headers, timeout=30)
-            response.raise_for_status()
-
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-
-            with open(target_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-
-                        if progress_callback and total_size > 0:
-                            progress = int((downloaded_size / total_size) * 100)
-                            mb_downloaded = downloaded_size / (1024 * 1024)
-                            progress_callback(progress, f"📥 Загрузка BIOS: {mb_downloaded:.1f}MB")
-
-            logger.info(f"✅ Загрузка успешна: {target_path.name}")
-            return True
+        """Прямая загрузка файла через общий HTTP загрузчик (Range, докачка)"""
+        def on_progress(downloaded, total):
+            if progress_callback and total > 0:
+                progress = int((downloaded / total) * 100)
+                mb_downloaded = downloaded / (1024 * 1024)
+                progress_callback(progress, f"📥 Загрузка BIOS: {mb_downloaded:.1f}MB")
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка загрузки: {e}")
-            return False
+        return HttpDownloader().download(url, target_path, on_progress)
 
 
 class BIOSDownloadThread(QThread):
@@ -87,11 +69,13 @@ class BIOSDownloadThread(QThread):
     finished = pyqtSignal(bool, str)
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, bios_info: dict, target_dir: Path, platform: str):
+    def __init__(self, bios_info: dict, target_dir: Path, platform: str, wanted_files=None):
         super().__init__()
         self.bios_info = bios_info
         self.target_dir = target_dir
         self.platform = platform
+        # Распаковываем только эти файлы (None - весь архив)
+        self.wanted_files = set(wanted_files) if wanted_files else None
         self._cancelled = False
 
     def run(self):
@@ -190,30 +174,11 @@ class BIOSDownloadThread(QThread):
 
     def _is_archive_by_signature(self, file_path: Path) -> bool:
         """Проверяет, является ли файл архивом по сигнатурам файлов"""
-        try:
-            with open(file_path, 'rb') as f:
-                header = f.read(8)  # Читаем первые 8 байт
-
-            # ZIP signature
-            if header.startswith(b'PK\x03\x04'):
-                return True
-            # 7z signature
-            elif header.startswith(b'7z\xBC\xAF\x27\x1C'):
-                return True
-            # RAR signature
-            elif header.startswith(b'Rar!\x1A\x07\x00'):
-                return True
-            # GZIP signature (for .tar.gz)
-            elif header.startswith(b'\x1F\x8B'):
-                return True
-            # TAR signature
-            elif header.startswith(b'ustar') or header[257:262] == b'ustar':
-                return True
+        return detect_format(file_path).is_archive
 
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка проверки сигнатуры файла: {e}")
-
-        return False
+    def _is_wanted(self, member_name: str) -> bool:
+        """Нужно ли распаковывать этот файл архива"""
+        return not self.wanted_files or Path(member_name).name in self.wanted_files
 
     def _extract_archive(self, archive_path: Path, extract_to: Path) -> list:
         """Распаковывает архив и возвращает список распакованных файлов"""
@@ -221,9 +186,19 @@ class BIOSDownloadThread(QThread):
 
         try:
             # Сначала пробуем определить тип по сигнатуре
-            if self._is_zip_by_signature(archive_path):
+            archive_kind = detect_format(archive_path).kind
+            if archive_kind == 'zip':
                 logger.info(f"📦 Распаковываю ZIP архив (по сигнатуре): {archive_path.name}")
                 return self._extract_zip(archive_path, extract_to)
+            elif archive_kind in ('7z', 'rar', 'rar5', 'xz', 'bzip2'):
+                logger.info(f"📦 Распаковываю {archive_kind} архив (по сигнатуре): {archive_path.name}")
+                return self._extract_with_libarchive(archive_path, extract_to)
+            elif archive_kind == 'tar' or (archive_kind == 'gzip' and self._is_gzipped_tar(archive_path)):
+                logger.info(f"📦 Распаковываю TAR архив (по сигнатуре): {archive_path.name}")
+                return self._extract_tar(archive_path, extract_to)
+            elif archive_kind == 'gzip':
+                logger.info(f"📦 Распаковываю GZIP файл (по сигнатуре): {archive_path.name}")
+                return self._extract_gzip(archive_path, extract_to)
             elif self._is_archive_by_extension(archive_path):
                 file_ext = archive_path.suffix.lower()
                 if file_ext == '.zip':
@@ -248,11 +223,7 @@ class BIOSDownloadThread(QThread):
 
     def _is_zip_by_signature(self, file_path: Path) -> bool:
         """Проверяет, является ли файл ZIP архивом по сигнатуре"""
-        try:
-            with open(file_path, 'rb') as f:
-                return f.read(4) == b'PK\x03\x04'
-        except:
-            return False
+        return detect_format(file_path).kind == 'zip'
 
     def _extract_zip(self, archive_path: Path, extract_to: Path) -> list:
         """Распаковывает ZIP архив"""
@@ -260,11 +231,11 @@ class BIOSDownloadThread(QThread):
         try:
             with zipfile.ZipFile(archive_path, 'r') as zip_ref:
                 # Получаем список файлов в архиве
-                file_list = zip_ref.namelist()
+                file_list = [name for name in zip_ref.namelist() if self._is_wanted(name)]
                 logger.info(f"📋 Файлы в ZIP архиве: {file_list}")
 
                 # Распаковываем
-                zip_ref.extractall(extract_to)
+                zip_ref.extractall(extract_to, members=file_list)
 
                 # Собираем список распакованных файлов
                 for file_name in file_list:
@@ -289,7 +260,7 @@ class BIOSDownloadThread(QThread):
             import libarchive
             with libarchive.file_reader(str(archive_path)) as archive:
                 for entry in archive:
-                    if not entry.isdir:
+                    if not entry.isdir and self._is_wanted(entry.pathname):
                         target_path = extract_to / entry.pathname
                         target_path.parent.mkdir(parents=True, exist_ok=True)
                         with open(target_path, 'wb') as f:
@@ -308,20 +279,49 @@ class BIOSDownloadThread(QThread):
 
         return extracted_files
 
+    @staticmethod
+    def _is_gzipped_tar(archive_path: Path) -> bool:
+        """Внутри gzip лежит TAR (сигнатура ustar в первом блоке)"""
+        try:
+            with gzip.open(archive_path, 'rb') as f:
+                return f.read(512)[257:262] == b'ustar'
+        except (OSError, EOFError):
+            return False
+
+    def _extract_gzip(self, archive_path: Path, extract_to: Path) -> list:
+        """Распаковывает одиночный файл в gzip (bios.bin.gz)"""
+        # К имени без расширения архива при загрузке дописывается .zip
+        name = archive_path.name
+        for suffix in ('.zip', '.gz'):
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+        target_path = extract_to / (name or archive_path.stem)
+        try:
+            with gzip.open(archive_path, 'rb') as src, open(target_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        except (OSError, EOFError) as e:
+            target_path.unlink(missing_ok=True)
+            logger.error(f"❌ Ошибка распаковки GZIP: {e}")
+            raise
+        logger.info(f"✅ GZIP распакован: {target_path.name}")
+        return [target_path]
+
     def _extract_tar(self, archive_path: Path, extract_to: Path) -> list:
         """Распаковывает TAR/TAR.GZ архив"""
         extracted_files = []
         try:
             import tarfile
-            mode = 'r:gz' if archive_path.suffix == '.gz' else 'r'
+            # Сжатие определяет сам tarfile (имя BIOS-архива может не совпадать с форматом)
+            mode = 'r:*'
 
             with tarfile.open(archive_path, mode) as tar_ref:
                 # Получаем список файлов в архиве
-                file_list = tar_ref.getnames()
+                members = [member for member in tar_ref.getmembers() if self._is_wanted(member.name)]
+                file_list = [member.name for member in members]
                 logger.info(f"📋 Файлы в TAR архиве: {file_list}")
 
                 # Распаковываем
-                tar_ref.extractall(extract_to)
+                tar_ref.extractall(extract_to, members=members)
 
                 # Собираем список распакованных файлов
                 for file_name in file_list:
@@ -421,8 +421,33 @@ class BIOSManager:
         bios_dir = self.project_root / 'users' / 'bios' / resolved_platform
         bios_dir.mkdir(parents=True, exist_ok=True)
 
-        # Скачиваем BIOS
-        return self._download_and_install_bios(bios_info, bios_dir, platform, progress_callback)
+        # Проверяем уже установленные файлы по инвентарю
+        bios_files = bios_info.get('bios_files', [])
+        inventory = BIOSInventory(bios_dir)
+        source = BIOSInventory.source_key(bios_info)
+        missing_files = inventory.missing_files(bios_files, source) if bios_files else []
+
+        if bios_files and not missing_files:
+            logger.info(f"✅ Все файлы BIOS для {platform} уже установлены ({len(bios_files)})")
+            return True
+
+        if bios_files:
+            logger.info(f"📋 Отсутствуют файлы BIOS: {missing_files}")
+
+        # Скачиваем BIOS (из архива берем только недостающие файлы)
+        success = self._download_and_install_bios(
+            bios_info, bios_dir, platform, progress_callback,
+            wanted_files=missing_files if len(missing_files) < len(bios_files) else None
+        )
+
+        if success and bios_files:
+            still_missing = inventory.record_files(bios_files)
+            if still_missing:
+                logger.warning(f"⚠️ После загрузки не найдены файлы BIOS: {still_missing}")
+            # Этих файлов нет в архиве: не скачиваем его заново при каждой установке
+            inventory.mark_unavailable(still_missing, source)
+
+        return success
 
     def _load_bios_registry(self):
         """Загружает реестр BIOS"""
@@ -437,7 +462,8 @@ class BIOSManager:
             logger.error(f"❌ Ошибка чтения registry_bios.json: {e}")
             return None
 
-    def _download_and_install_bios(self, bios_info: dict, bios_dir: Path, platform: str, progress_callback=None) -> bool:
+    def _download_and_install_bios(self, bios_info: dict, bios_dir: Path, platform: str,
+                                   progress_callback=None, wanted_files=None) -> bool:
         """Скачивает и устанавливает BIOS"""
         if self._cancelled:
             return False
@@ -449,7 +475,7 @@ class BIOSManager:
         logger.info(f"⬇️ Загружаем BIOS для {platform}")
 
         # Создаем и запускаем поток загрузки
-        self.download_thread = BIOSDownloadThread(bios_info, bios_dir, platform)
+        self.download_thread = BIOSDownloadThread(bios_info, bios_dir, platform, wanted_files)
 
         if progress_callback:
             self.download_thread.progress_updated.connect(progress_callback)
@@ -466,13 +492,13 @@ class BIOSManager:
         self.download_thread.finished.connect(on_finished)
         self.download_thread.error_occurred.connect(on_error)
 
-        self.download_thread.start()
-        self.download_thread.wait()
+        # Вызывающий уже работает в фоновом потоке установки:
+        # выполняем загрузку в нем же, без запуска и ожидания еще одного QThread
+        self.download_thread.run()
 
         return self.download_success
 
     def cancel(self):
         self._cancelled = True
-        if self.download_thread and self.download_thread.isRunning():
+        if self.download_thread:
             self.download_thread.cancel()
-            self.download_thread.wait()
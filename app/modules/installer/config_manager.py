@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import os
+import re
 import shutil
 import configparser
 import json
@@ -6,6 +8,11 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Callable
 
+from .config_sync import ConfigSync
+
+# Импорт каталога конфигов
+from core import get_users_subpath
+
 
 class ConfigManager:
     def __init__(self, project_root: Path, logs_callback=None, test_mode=False):
@@ -52,29 +59,42 @@ class ConfigManager:
         """Получает конфигурацию формата для эмулятора"""
         return self.EMULATOR_FORMATS.get(emulator_name, self.EMULATOR_FORMATS['default'])
 
-    def _handle_ini_config(self, source_path: Path, target_path: Path, game_id: str = None):
-        """Обработчик INI конфигов с поддержкой game-specific настроек"""
+    @staticmethod
+    def _normalize_key(key: str) -> str:
+        """'rendering_mode' и 'RenderingMode' - один и тот же ключ"""
+        return re.sub(r'[\s_\-]', '', str(key)).lower()
+
+    @staticmethod
+    def _format_value(value) -> str:
+        if isinstance(value, bool):
+            return "True" if value else "False"
+        return str(value)
+
+    def _handle_ini_config(self, source_path: Path, target_path: Path, overlay: Dict = None):
+        """Обработчик INI конфигов: накладывает секции/ключи слоя на базовый файл"""
         try:
             if not self.test_mode:
-                # Для INI файлов можем добавлять game-specific секции
-                if game_id and source_path.exists():
-                    config = configparser.ConfigParser()
-                    config.read(source_path)
-
-                    # Добавляем секцию для конкретной игры (если нужно)
-                    game_section = f"GameSettings_{game_id}"
-                    if not config.has_section(game_section):
-                        config.add_section(game_section)
-                        config.set(game_section, 'GameID', game_id)
-
-                    # Сохраняем обновленный конфиг
-                    with open(target_path, 'w') as f:
-                        config.write(f)
-                    self._log(f"✅ INI конфиг обогащен game-specific настройками: {target_path.name}")
-                else:
-                    # Просто копируем как есть
-                    shutil.copy(source_path, target_path)
-                    self._log(f"✅ INI конфиг скопирован: {source_path.name}")
+                config = configparser.ConfigParser(strict=False, interpolation=None)
+                config.optionxform = str
+                if source_path.exists():
+                    # utf-8-sig: ppsspp.ini сохраняется с BOM
+                    config.read(source_path, encoding='utf-8-sig')
+
+                for section_name, values in (overlay or {}).items():
+                    if not isinstance(values, dict):
+                        continue
+                    section = next((name for name in config.sections()
+                                    if self._normalize_key(name) == self._normalize_key(section_name)), None)
+                    if section is None:
+                        section = section_name
+                        config.add_section(section)
+                    existing = {self._normalize_key(key): key for key in config[section]}
+                    for key, value in values.items():
+                        config.set(section, existing.get(self._normalize_key(key), key), self._format_value(value))
+
+                with open(target_path, 'w', encoding='utf-8') as f:
+                    config.write(f)
+                self._log(f"✅ INI конфиг собран из слоев: {target_path.name}")
             else:
                 self._log(f"[TEST MODE] Обработка INI: {source_path.name} -> {target_path.name}")
 
@@ -83,29 +103,20 @@ class ConfigManager:
             if not self.test_mode and source_path.exists():
                 shutil.copy(source_path, target_path)  # Fallback
 
-    def _handle_json_config(self, source_path: Path, target_path: Path, game_id: str = None):
-        """Обработчик JSON конфигов"""
+    def _handle_json_config(self, source_path: Path, target_path: Path, overlay: Dict = None):
+        """Обработчик JSON конфигов: рекурсивно накладывает слой на базовый файл"""
         try:
             if not self.test_mode:
-                if game_id and source_path.exists():
-                    # Для JSON можем добавить game-specific поля
+                config_data = {}
+                if source_path.exists():
                     with open(source_path, 'r', encoding='utf-8') as f:
                         config_data = json.load(f)
 
-                    # Добавляем идентификатор игры
-                    if 'game_specific' not in config_data:
-                        config_data['game_specific'] = {}
-                    config_data['game_specific'][game_id] = {
-                        'game_id': game_id,
-                        'configured': True
-                    }
-
-                    with open(target_path, 'w', encoding='utf-8') as f:
-                        json.dump(config_data, f, indent=2, ensure_ascii=False)
-                    self._log(f"✅ JSON конфиг обогащен game-specific настройками: {target_path.name}")
-                else:
-                    shutil.copy(source_path, target_path)
-                    self._log(f"✅ JSON конфиг скопирован: {source_path.name}")
+                config_data = self._merge_layers(config_data, overlay or {})
+
+                with open(target_path, 'w', encoding='utf-8') as f:
+                    json.dump(config_data, f, indent=2, ensure_ascii=False)
+                self._log(f"✅ JSON конфиг собран из слоев: {target_path.name}")
             else:
                 self._log(f"[TEST MODE] Обработка JSON: {source_path.name} -> {target_path.name}")
 
@@ -114,26 +125,29 @@ class ConfigManager:
             if not self.test_mode and source_path.exists():
                 shutil.copy(source_path, target_path)  # Fallback
 
-    def _handle_cfg_config(self, source_path: Path, target_path: Path, game_id: str = None):
-        """Обработчик CFG конфигов (RetroArch)"""
+    def _handle_cfg_config(self, source_path: Path, target_path: Path, overlay: Dict = None):
+        """Обработчик CFG конфигов (RetroArch): строки key = "value", слой - плоский словарь"""
         if not self.test_mode:
-            shutil.copy(source_path, target_path)
-            self._log(f"✅ CFG конфиг скопирован: {source_path.name}")
+            lines = source_path.read_text(encoding='utf-8').splitlines() if source_path.exists() else []
+            values = {key: value for key, value in (overlay or {}).items() if not isinstance(value, dict)}
+            for index, line in enumerate(lines):
+                key = line.split('=', 1)[0].strip()
+                if '=' in line and key in values:
+                    lines[index] = f'{key} = "{self._format_value(values.pop(key))}"'
+            lines.extend(f'{key} = "{self._format_value(value)}"' for key, value in values.items())
+            target_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+            self._log(f"✅ CFG конфиг собран из слоев: {target_path.name}")
         else:
             self._log(f"[TEST MODE] Обработка CFG: {source_path.name} -> {target_path.name}")
 
-    def _handle_conf_config(self, source_path: Path, target_path: Path, game_id: str = None):
-        """Обработчик CONF конфигов (DOSBox)"""
-        if not self.test_mode:
-            shutil.copy(source_path, target_path)
-            self._log(f"✅ CONF конфиг скопирован: {source_path.name}")
-        else:
-            self._log(f"[TEST MODE] Обработка CONF: {source_path.name} -> {target_path.name}")
+    def _handle_conf_config(self, source_path: Path, target_path: Path, overlay: Dict = None):
+        """Обработчик CONF конфигов (DOSBox): тот же формат секций, что и INI"""
+        self._handle_ini_config(source_path, target_path, overlay)
 
     def apply_config(self, game_id: str, platform: str, emulator_name: str) -> bool:
         """
         Универсальное применение конфигурации для игры
-        Теперь копирует ВСЮ папку эмулятора с готовыми конфигами!
+        Раскладывает папку эмулятора с готовыми конфигами (только изменения)
         """
         if self._cancelled:
             return False
@@ -170,19 +184,11 @@ class ConfigManager:
 
                 self._log(f"📁 Найдена папка эмулятора: {source_folder}")
 
-                # Копируем ВСЮ папку эмулятора
+                # Раскладываем папку эмулятора: только изменившиеся файлы
                 if not self.test_mode:
-                    target_emulator_folder.mkdir(parents=True, exist_ok=True)
-
-                    # Рекурсивно копируем все файлы и папки
-                    for item in source_folder.iterdir():
-                        target_item = target_emulator_folder / item.name
-                        if item.is_dir():
-                            shutil.copytree(item, target_item, dirs_exist_ok=True)
-                        else:
-                            shutil.copy2(item, target_item)
-
-                    self._log(f"✅ Папка эмулятора скопирована: {target_emulator_folder}")
+                    placed, skipped = ConfigSync(source_folder, target_emulator_folder).sync()
+                    self._log(f"✅ Папка эмулятора синхронизирована: {target_emulator_folder} "
+                              f"(обновлено: {placed}, без изменений: {skipped})")
                 else:
                     self._log(f"[TEST MODE] Копирование папки: {source_folder} -> {target_emulator_folder}")
 
@@ -223,8 +229,8 @@ class ConfigManager:
         return False
 
     def _apply_single_config(self, source_path: Path, target_path: Path,
-                           config_format: str, game_id: str = None) -> bool:
-        """Применяет одиночный конфиг с обработчиком формата"""
+                           config_format: str, overlay: Dict = None) -> bool:
+        """Собирает одиночный конфиг: базовый файл + слой обработчиком формата"""
         if self._cancelled:
             return False
 
@@ -237,12 +243,134 @@ class ConfigManager:
             target_path.parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            handler(source_path, target_path, game_id)
+            handler(source_path, target_path, overlay)
             return True
         except Exception as e:
             self._log(f"❌ Ошибка применения конфига {source_path}: {e}")
             return False
 
+    # === СЛОИ КОНФИГОВ ИГРЫ ===
+    # Базовый пресет (users/configs/<платформа> + preset_default.json), затем
+    # пресет игры (app/emulators/<платформа>/games/*.json, по id/preset или по
+    # серийному номеру образа), затем правки
+    # пользователя (users/configs/<платформа>/overrides/<game_id>.json).
+    # Слои собираются при запуске в users/configs/<платформа>/.games/<game_id>:
+    # там лежит только собранный основной файл, остальное - ссылки на базу.
+
+    @staticmethod
+    def game_config_dir(platform: str, game_id: str) -> Path:
+        return Path(get_users_subpath("configs")) / platform / '.games' / game_id
+
+    @staticmethod
+    def _merge_layers(base: Dict, overlay: Dict) -> Dict:
+        merged = dict(base)
+        for key, value in overlay.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = ConfigManager._merge_layers(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
+
+    def get_config_layers(self, game_data: dict) -> List[Path]:
+        """Файлы слоев игры по порядку применения; пусто, если своих настроек у игры нет"""
+        platform = game_data.get('platform', '')
+        game_id = game_data.get('id', '')
+        platform_dir = self.project_root / 'app' / 'emulators' / platform
+
+        # Имя preset в реестре не всегда совпадает с файлом - тогда пресет по id
+        preset_names = [name for name in (game_data.get('preset'), f"{game_id}.json") if name]
+        game_preset = next((platform_dir / 'games' / name for name in preset_names
+                            if (platform_dir / 'games' / name).is_file()), None)
+
+        game_layers = [
+            game_preset,
+            Path(get_users_subpath("configs")) / platform / 'overrides' / f"{game_id}.json"
+        ]
+        if game_data.get('serial'):
+            game_layers.insert(1, platform_dir / 'games' / f"{game_data['serial']}.json")
+        game_layers = [path for path in game_layers if path and path.is_file()]
+        if not game_layers:
+            return []
+
+        base_layer = platform_dir / 'preset_default.json'
+        return ([base_layer] if base_layer.is_file() else []) + game_layers
+
+    def _find_main_file(self, base_dir: Path, main_file: str) -> Optional[Path]:
+        """Путь основного файла эмулятора внутри базового дерева (без папок слоев)"""
+        for root, dirs, files in os.walk(base_dir):
+            dirs[:] = [name for name in dirs if name not in ('.games', 'overrides')]
+            if main_file in files:
+                return Path(root, main_file).relative_to(base_dir)
+        return None
+
+    def _build_game_dir(self, base_dir: Path, game_dir: Path, relative_file: Path):
+        """Каталог игры: реальные папки по пути к основному файлу, остальное - ссылки на базу"""
+        tmp_dir = game_dir.with_name(f".{game_dir.name}.tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+
+        source, target = base_dir, tmp_dir
+        for depth, part in enumerate(relative_file.parts):
+            target.mkdir(parents=True, exist_ok=True)
+            if source.is_dir():
+                for child in source.iterdir():
+                    if child.name == part or (depth == 0 and child.name in ('.games', 'overrides')):
+                        continue
+                    os.symlink(child, target / child.name)
+            source, target = source / part, target / part
+
+        if game_dir.exists():
+            shutil.rmtree(game_dir)
+        os.replace(tmp_dir, game_dir)
+
+    def prepare_game_config(self, game_data: dict, emulator_name: str = None) -> Path:
+        """
+        Собирает слои конфигов игры перед запуском и возвращает каталог для
+        XDG_CONFIG_HOME. Если слои не менялись с прошлой сборки, ничего не
+        пересобирается; без своих слоев игра использует общий каталог платформы.
+        """
+        platform = game_data.get('platform', '')
+        game_id = game_data.get('id', '')
+        base_dir = Path(get_users_subpath("configs")) / platform
+        game_dir = self.game_config_dir(platform, game_id)
+
+        layers = self.get_config_layers(game_data)
+        if not layers:
+            if game_dir.exists():
+                shutil.rmtree(game_dir)
+            return base_dir
+
+        emulator_config = self._get_emulator_config(emulator_name or game_data.get('preferred_emulator', ''))
+        main_file = emulator_config['main_file']
+        relative_file = self._find_main_file(base_dir, main_file) or Path(main_file)
+        source_file = base_dir / relative_file
+
+        stamp_sources = layers + ([source_file] if source_file.exists() else [])
+        stamp = [[str(path), path.stat().st_size, path.stat().st_mtime_ns] for path in stamp_sources]
+        stamp_file = game_dir / '.layers.json'
+        try:
+            with open(stamp_file, 'r', encoding='utf-8') as f:
+                if json.load(f) == stamp:
+                    return game_dir
+        except Exception:
+            pass
+
+        overlay = {}
+        for layer in layers:
+            try:
+                with open(layer, 'r', encoding='utf-8') as f:
+                    overlay = self._merge_layers(overlay, json.load(f))
+            except Exception as e:
+                self._log(f"⚠️ Слой конфига пропущен {layer}: {e}")
+
+        self._log(f"🧩 Сборка конфига {game_id}: {', '.join(layer.name for layer in layers)} -> {relative_file}")
+        self._build_game_dir(base_dir, game_dir, relative_file)
+        self._apply_single_config(source_file, game_dir / relative_file, emulator_config['format'], overlay)
+
+        with open(stamp_file, 'w', encoding='utf-8') as f:
+            json.dump(stamp, f)
+        return game_dir
+
     def cancel(self):
         """Отмена операции"""
         self._cancelled = True
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+import os
+import json
+import errno
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # не Linux
+    fcntl = None
+
+logger = logging.getLogger('ConfigSync')
+
+# ioctl FICLONE из linux/fs.h: клон файла на btrfs/xfs/bcachefs без копирования данных
+FICLONE = 0x40049409
+
+# Жесткой ссылкой с исходником делятся только ресурсы, которые эмулятор не
+# переписывает: шрифты, переводы, картинки. Карты памяти, сохранения, NVRAM
+# (.bin/.dat), кеши шейдеров и dev_hdd0 эмулятор пишет на месте - общая
+# ссылка испортила бы исходник в app/emulators и копии всех игр
+HARDLINK_SUFFIXES = {
+    '.ttf', '.otf', '.ttc', '.pfb', '.pfm',         # шрифты
+    '.qm', '.mo',                                   # переводы
+    '.png', '.jpg', '.jpeg', '.svg', '.ico', '.webp', '.bmp'  # ресурсы интерфейса
+}
+
+
+class ConfigSync:
+    """
+    Раскладывает папку конфигов эмулятора в users/configs только с изменениями.
+
+    .provisioned.json в целевой папке хранит, какие файлы и из какого
+    состояния исходника (размер, mtime, sha1) уже разложены. Неизменившийся
+    исходник пропускается без чтения (и без затирания правок пользователя),
+    одинаковые по sha1 файлы не копируются. Новые файлы клонируются через
+    reflink (FICLONE), шрифты, переводы и картинки - жесткими ссылками,
+    все остальное копией.
+    """
+
+    MANIFEST_NAME = '.provisioned.json'
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, source_dir: Path, target_dir: Path):
+        self.source_dir = Path(source_dir)
+        self.target_dir = Path(target_dir)
+        self.manifest_path = self.target_dir / self.MANIFEST_NAME
+        self.manifest = self._load_manifest()
+        self._reflink_supported = fcntl is not None
+        self._hardlink_supported = True
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('source') == str(self.source_dir):
+                    return data
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось прочитать {self.manifest_path}: {e}")
+        return {'source': str(self.source_dir), 'files': {}}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _hash_file(self, path: Path) -> str:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # --- способы размещения ---
+
+    def _reflink(self, source: Path, target: Path) -> bool:
+        if not self._reflink_supported:
+            return False
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        try:
+            with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, tmp_path)
+            os.replace(tmp_path, target)
+            return True
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            if e.errno in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+                # Файловая система не умеет клонировать - больше не пробуем
+                self._reflink_supported = False
+            return False
+
+    def _hardlink(self, source: Path, target: Path) -> bool:
+        if not self._hardlink_supported:
+            return False
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        try:
+            tmp_path.unlink(missing_ok=True)
+            os.link(source, tmp_path)
+            os.replace(tmp_path, target)
+            return True
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            self._hardlink_supported = False
+            return False
+
+    def _place(self, source: Path, target: Path) -> str:
+        """Размещает файл самым дешевым безопасным способом; возвращает способ"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if self._reflink(source, target):
+            return 'reflink'
+        if source.suffix.lower() in HARDLINK_SUFFIXES and self._hardlink(source, target):
+            return 'hardlink'
+        if target.is_symlink() or (target.exists() and target.stat().st_nlink > 1):
+            # Не пишем поверх общей с исходником жесткой ссылки
+            target.unlink()
+        shutil.copy2(source, target)
+        return 'copy'
+
+    # --- синхронизация ---
+
+    def sync(self) -> Tuple[int, int]:
+        """Возвращает (размещено файлов, пропущено без изменений)"""
+        placed = 0
+        skipped = 0
+        changed = False
+        methods: Dict[str, int] = {}
+        files = self.manifest['files']
+        self.target_dir.mkdir(parents=True, exist_ok=True)
+
+        for root, dirs, filenames in os.walk(self.source_dir):
+            dirs.sort()
+            for filename in sorted(filenames):
+                source = Path(root) / filename
+                relative = source.relative_to(self.source_dir).as_posix()
+                target = self.target_dir / relative
+                st = source.stat()
+                record = files.get(relative)
+
+                # Прежние версии делили жесткой ссылкой и записываемые файлы - разделяем
+                shared = (record and record.get('method') == 'hardlink'
+                          and source.suffix.lower() not in HARDLINK_SUFFIXES)
+
+                # Исходник не менялся с прошлого раза и файл на месте
+                if (record and record['size'] == st.st_size and record['mtime_ns'] == st.st_mtime_ns
+                        and target.exists() and not shared):
+                    skipped += 1
+                    continue
+
+                sha1 = self._hash_file(source)
+                if shared and target.exists() and os.path.samefile(source, target):
+                    target.unlink()
+                if (target.exists() and target.stat().st_size == st.st_size
+                        and self._hash_file(target) == sha1):
+                    method = 'same'
+                    skipped += 1
+                else:
+                    method = self._place(source, target)
+                    methods[method] = methods.get(method, 0) + 1
+                    placed += 1
+
+                changed = True
+                files[relative] = {
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'sha1': sha1,
+                    'method': method
+                }
+
+        if changed:
+            self._save_manifest()
+
+        summary = ", ".join(f"{method}: {count}" for method, count in methods.items()) or "нет"
+        logger.info(f"📁 {self.source_dir.name}: размещено {placed} ({summary}), без изменений {skipped}")
+        return placed, skipped
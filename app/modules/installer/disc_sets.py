@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import os
+import re
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger('DiscSets')
+
+# Game (USA) (Disc 2).cue, Game [Disk 1 of 3].chd, Game - CD2.bin
+DISC_TAG = re.compile(r'[\s_-]*[\(\[]?\s*\b(?:disc|disk|cd)\s*(\d+)(?:\s*of\s*\d+)?\s*[\)\]]?', re.IGNORECASE)
+CUE_FILE_LINE = re.compile(r'^\s*FILE\s+(?:"([^"]+)"|(\S+))\s+\S+\s*$', re.IGNORECASE | re.MULTILINE)
+
+# Образы, которые эмулятор открывает сам (трек .bin из CUE - не точка входа)
+ENTRY_SUFFIXES = {'.cue', '.chd', '.iso', '.pbp', '.cso', '.ecm', '.img', '.mdf', '.bin'}
+
+# Эмуляторы, которые открывают .m3u как набор дисков со сменой в меню
+PLAYLIST_EMULATORS = {'duckstation', 'retroarch'}
+
+MAX_CUE_SIZE = 64 * 1024
+
+
+def parse_cue(cue_path: Path) -> List[Path]:
+    """Файлы треков из CUE (пути относительно папки CUE); имена сверяются без учета регистра"""
+    cue_path = Path(cue_path)
+    try:
+        with open(cue_path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read(MAX_CUE_SIZE)
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось прочитать {cue_path.name}: {e}")
+        return []
+
+    try:
+        siblings = {name.lower(): name for name in os.listdir(cue_path.parent)}
+    except OSError:
+        siblings = {}
+
+    tracks = []
+    for match in CUE_FILE_LINE.finditer(text):
+        name = (match.group(1) or match.group(2)).replace('\\', '/').split('/')[-1]
+        tracks.append(cue_path.parent / siblings.get(name.lower(), name))
+    return tracks
+
+
+def disc_number(path: Path) -> Optional[int]:
+    match = DISC_TAG.search(Path(path).stem)
+    return int(match.group(1)) if match else None
+
+
+def set_title(path: Path) -> str:
+    """Название набора: имя файла без метки диска"""
+    return DISC_TAG.sub('', Path(path).stem).strip(' _-') or Path(path).stem
+
+
+def resolve_disc_set(files: Iterable[Path], write_playlist: bool = True) -> Optional[Dict]:
+    """
+    Собирает набор дисков игры из файлов установки.
+
+    Треки, на которые ссылаются CUE, не считаются отдельными дисками; диски
+    группируются по названию без метки (Disc N) и сортируются по номеру.
+    Для нескольких дисков рядом с первым пишется <название>.m3u. Возвращает
+    entry (что передать эмулятору), discs, tracks и m3u, либо None.
+    """
+    files = [Path(f) for f in files if Path(f).suffix.lower() in ENTRY_SUFFIXES]
+    if not files:
+        return None
+
+    cues = [f for f in files if f.suffix.lower() == '.cue']
+    tracks = {cue: parse_cue(cue) for cue in cues}
+    referenced = {str(track) for cue_tracks in tracks.values() for track in cue_tracks}
+    for cue, cue_tracks in tracks.items():
+        missing = [track.name for track in cue_tracks if not track.exists()]
+        if missing:
+            logger.warning(f"⚠️ {cue.name}: отсутствуют треки {missing}")
+
+    discs = [f for f in files if str(f) not in referenced]
+    if not discs:
+        return None
+
+    groups: Dict[str, List[Path]] = {}
+    for disc in discs:
+        groups.setdefault(set_title(disc).lower(), []).append(disc)
+
+    # Основной набор: больше дисков, затем больший общий объем
+    def group_size(group: List[Path]) -> int:
+        return sum(os.path.getsize(track) for disc in group
+                   for track in (tracks.get(disc) or [disc]) if os.path.exists(track))
+
+    group = max(groups.values(), key=lambda group: (len(group), group_size(group)))
+    group.sort(key=lambda disc: (disc_number(disc) or 0, disc.name.lower()))
+
+    result = {
+        'entry': group[0],
+        'discs': group,
+        'tracks': {str(disc): tracks.get(disc, []) for disc in group},
+        'm3u': None
+    }
+
+    if len(group) > 1 and write_playlist:
+        m3u_path = group[0].parent / f"{set_title(group[0])}.m3u"
+        lines = [os.path.relpath(disc, m3u_path.parent) for disc in group]
+        content = "\n".join(lines) + "\n"
+        try:
+            if not m3u_path.exists() or m3u_path.read_text(encoding='utf-8') != content:
+                tmp_path = m3u_path.with_name(f".{m3u_path.name}.tmp")
+                tmp_path.write_text(content, encoding='utf-8')
+                os.replace(tmp_path, m3u_path)
+            result['entry'] = m3u_path
+            result['m3u'] = m3u_path
+            logger.info(f"💿 Плейлист {m3u_path.name}: {len(group)} дисков")
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось записать {m3u_path.name}, запуск с первого диска: {e}")
+
+    return result
+
+
+def disc_set_record(disc_set: Dict, base_dir: Path) -> Dict:
+    """Запись набора для installed_games.json: имена относительно папки игры"""
+    base_dir = Path(base_dir)
+    return {
+        'entry': os.path.relpath(disc_set['entry'], base_dir),
+        'discs': [os.path.relpath(disc, base_dir) for disc in disc_set['discs']],
+        'm3u': os.path.relpath(disc_set['m3u'], base_dir) if disc_set['m3u'] else None
+    }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+import os
+import re
+import stat
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .emulator_store import EmulatorStore
+
+logger = logging.getLogger('EmulatorInventory')
+
+
+class EmulatorInventory:
+    """
+    Кеш установленных эмуляторов. Список Flatpak приложений читается
+    одним вызовом `flatpak list` и хранится до invalidate() (после установки
+    или удаления), AppImage проверяются через stat без запуска процессов.
+
+    Индекс AppImage сопоставляет ID эмулятора (rpcs3, pcsx2...) с файлом:
+    сначала текущая версия из хранилища (EmulatorStore), затем имена из
+    конфигов платформ и профилей запуска, затем однократное сканирование
+    папки с точным совпадением имени эмулятора.
+    """
+
+    FLATPAK_TIMEOUT = 10
+    VERSION_PATTERN = re.compile(r'v?(\d+(?:\.\d+)+)')
+
+    def __init__(self, appimage_dir: Optional[Path] = None):
+        self.appimage_dir = Path(appimage_dir) if appimage_dir else None
+        self.store = EmulatorStore(self.appimage_dir) if self.appimage_dir else None
+        self._flatpak_apps: Optional[Set[str]] = None
+        self._declared_appimages: Dict[str, List[str]] = {}
+        self._appimage_index: Dict[str, Optional[Dict]] = {}
+        self._scanned_appimages: Optional[Dict[str, List[Dict]]] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Сбрасывает кеши; следующий запрос перечитает Flatpak и папку AppImage"""
+        with self._lock:
+            self._flatpak_apps = None
+            self._appimage_index = {}
+            self._scanned_appimages = None
+
+    def _load_flatpak_apps(self) -> Set[str]:
+        try:
+            result = subprocess.run(
+                ["flatpak", "list", "--app", "--columns=application"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, timeout=self.FLATPAK_TIMEOUT
+            )
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            logger.warning("⚠️ flatpak не найден в системе или проверка заняла слишком много времени.")
+            return set()
+
+        if result.returncode != 0:
+            logger.warning(f"⚠️ flatpak list завершился с кодом {result.returncode}: {result.stderr.strip()}")
+            return set()
+
+        apps = {line.strip() for line in result.stdout.splitlines() if line.strip()}
+        logger.info(f"📦 Установлено Flatpak приложений: {len(apps)}")
+        return apps
+
+    def flatpak_apps(self) -> Set[str]:
+        """Множество id установленных Flatpak приложений (читается один раз)"""
+        with self._lock:
+            if self._flatpak_apps is None:
+                self._flatpak_apps = self._load_flatpak_apps()
+            return self._flatpak_apps
+
+    def is_flatpak_installed(self, flatpak_id: str) -> bool:
+        return bool(flatpak_id) and flatpak_id in self.flatpak_apps()
+
+    def appimage_path(self, appimage_filename: str) -> Optional[Path]:
+        if not appimage_filename or not self.appimage_dir:
+            return None
+        return self.appimage_dir / appimage_filename
+
+    def appimage_info(self, appimage_filename: str) -> Optional[Dict]:
+        """Размер, время изменения и флаг исполняемости AppImage или None, если файла нет"""
+        path = self.appimage_path(appimage_filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+            return None
+        return {
+            'path': path,
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'executable': bool(st.st_mode & stat.S_IXUSR)
+        }
+
+    def is_installed(self, emu_info: dict) -> bool:
+        """Проверка эмулятора по его конфигурации платформы"""
+        install_method = emu_info.get('install_method')
+        if install_method == 'flatpak':
+            return self.is_flatpak_installed(emu_info.get('flatpak_id'))
+        if install_method == 'appimage':
+            emulator_id = emu_info.get('emulator', emu_info.get('id', ''))
+            if self.store:
+                version = self.store.version_for(emu_info)
+                # Ссылка без версии: годится любая сборка, обновление проверит установка
+                if version is None and self.store.current(emulator_id):
+                    return True
+                if version and self.store.has_version(emulator_id, version):
+                    return True
+            return self.appimage_info(emu_info.get('appimage_filename')) is not None
+        # system / none не требуют установки
+        return True
+
+    def missing_emulators(self, emu_infos: Iterable[dict]) -> List[dict]:
+        """Конфигурации эмуляторов, которые еще не установлены"""
+        return [emu_info for emu_info in emu_infos if not self.is_installed(emu_info)]
+
+    # --- индекс AppImage ---
+
+    def declare_appimage(self, emulator_id: str, appimage_filename: str):
+        """Регистрирует имя файла AppImage, под которым эмулятор ставится или запускается"""
+        if not emulator_id or not appimage_filename:
+            return
+        with self._lock:
+            filenames = self._declared_appimages.setdefault(emulator_id.lower(), [])
+            if appimage_filename not in filenames:
+                filenames.append(appimage_filename)
+                self._appimage_index.pop(emulator_id.lower(), None)
+
+    @classmethod
+    def parse_version(cls, filename: str) -> str:
+        match = cls.VERSION_PATTERN.search(Path(filename).stem)
+        return match.group(1) if match else ""
+
+    @staticmethod
+    def _emulator_token(filename: str) -> str:
+        """Имя эмулятора из имени файла: 'DuckStation-x64.AppImage' -> 'duckstation'"""
+        return re.split(r'[-_.\s]', Path(filename).stem, maxsplit=1)[0].lower()
+
+    def _appimage_record(self, filename: str) -> Optional[Dict]:
+        info = self.appimage_info(filename)
+        if not info:
+            return None
+        info['filename'] = filename
+        info['version'] = self.parse_version(filename)
+        return info
+
+    def _scan_appimages(self) -> Dict[str, List[Dict]]:
+        """Однократный обход папки AppImage: ID эмулятора -> найденные файлы"""
+        scanned: Dict[str, List[Dict]] = {}
+        if not self.appimage_dir or not self.appimage_dir.is_dir():
+            return scanned
+        with os.scandir(self.appimage_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.AppImage'):
+                    continue
+                record = self._appimage_record(entry.name)
+                if record:
+                    scanned.setdefault(self._emulator_token(entry.name), []).append(record)
+        return scanned
+
+    @staticmethod
+    def _version_key(record: Dict):
+        version = tuple(int(part) for part in record['version'].split('.')) if record['version'] else ()
+        return version, record['mtime'], record['filename']
+
+    def find_appimage(self, emulator_id: str) -> Optional[Dict]:
+        """
+        Путь, версия, размер и время изменения AppImage эмулятора или None.
+        Из нескольких подходящих файлов выбирается самая новая версия.
+        """
+        key = (emulator_id or "").lower()
+        with self._lock:
+            if key in self._appimage_index:
+                return self._appimage_index[key]
+
+            current = self.store.current(key) if self.store else None
+            if current:
+                record = self._appimage_record(current['path'].name)
+                if record:
+                    record['version'] = current['version']
+                    self._appimage_index[key] = record
+                    return record
+
+            candidates = [record for record in map(self._appimage_record, self._declared_appimages.get(key, []))
+                          if record]
+            if not candidates:
+                if self._scanned_appimages is None:
+                    self._scanned_appimages = self._scan_appimages()
+                candidates = self._scanned_appimages.get(key, [])
+
+            record = max(candidates, key=self._version_key) if candidates else None
+            self._appimage_index[key] = record
+            return record
+
+
+_inventories: Dict[str, EmulatorInventory] = {}
+_inventories_lock = threading.Lock()
+
+
+def get_emulator_inventory(project_root: Path) -> EmulatorInventory:
+    """Общий кеш эмуляторов для всех EmulatorManager одного проекта"""
+    appimage_dir = Path(project_root) / "app" / "emulators" / "appimages"
+    key = str(appimage_dir)
+    with _inventories_lock:
+        if key not in _inventories:
+            _inventories[key] = EmulatorInventory(appimage_dir)
+        return _inventories[key]
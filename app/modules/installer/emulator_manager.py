@@ -9,6 +9,9 @@ from datetime import datetime
 from PyQt6.QtCore import QObject, pyqtSignal
 import importlib.util
 
+from .http_downloader import HttpDownloader
+from .emulator_inventory import get_emulator_inventory
+
 # Создаем логгер для этого модуля
 logger = logging.getLogger('EmulatorManager')
 
@@ -18,10 +21,14 @@ class EmulatorManager(QObject):
         self.project_root = project_root
         self.test_mode = test_mode
         self._cancelled = False
+        self.inventory = get_emulator_inventory(project_root)
 
         # Загружаем конфигурации всех платформ
         self.platform_configs = self._load_all_platform_configs()
         logger.info(f"✅ Загружено конфигураций платформ: {len(self.platform_configs)}")
+        for config in self.platform_configs.values():
+            if config.get('install_method') == 'appimage':
+                self.inventory.declare_appimage(config.get('emulator', config['id']), config.get('appimage_filename'))
 
         # Загружаем алиасы платформ
         self.platform_aliases = {}
@@ -201,12 +208,39 @@ class EmulatorManager(QObject):
             return False
 
     def _is_flatpak_installed(self, flatpak_id: str) -> bool:
-        try:
-            res = subprocess.run(["flatpak", "list"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=10)
-            return flatpak_id in res.stdout
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            logger.warning("⚠️ flatpak не найден в системе или проверка заняла слишком много времени.")
-            return False
+        return self.inventory.is_flatpak_installed(flatpak_id)
+
+    def get_missing_emulators(self, emulator_ids) -> list:
+        """
+        Возвращает ID эмуляторов из списка, которые еще не установлены.
+        Один запрос к кешу вместо проверки каждого эмулятора отдельно.
+        """
+        emu_infos = [self.platform_configs[emu_id] for emu_id in emulator_ids if emu_id in self.platform_configs]
+        return [emu_info['id'] for emu_info in self.inventory.missing_emulators(emu_infos)]
+
+    def ensure_emulators(self, emulator_ids) -> bool:
+        """
+        Устанавливает сразу несколько эмуляторов: все недостающие Flatpak
+        пакеты ставятся одной командой flatpak install, AppImage - по очереди.
+        """
+        missing = self.get_missing_emulators(emulator_ids)
+        if not missing:
+            logger.info("✅ Все эмуляторы уже установлены")
+            return True
+
+        flatpak_infos = [self.platform_configs[emu_id] for emu_id in missing
+                         if self.platform_configs[emu_id].get('install_method') == 'flatpak']
+        if len(flatpak_infos) > 1 and not self.test_mode:
+            names = ", ".join(emu_info.get('name', emu_info['id']) for emu_info in flatpak_infos)
+            if not self._install_flatpaks([emu_info.get('flatpak_id') for emu_info in flatpak_infos], names):
+                return False
+
+        for emu_id in missing:
+            if self._cancelled:
+                return False
+            if not self.ensure_emulator(emu_id):
+                return False
+        return True
 
     def _ensure_appimage(self, emu_info: dict) -> bool:
         """
@@ -230,16 +264,27 @@ class EmulatorManager(QObject):
         appimage_dir.mkdir(parents=True, exist_ok=True)
 
         appimage_path = appimage_dir / appimage_filename
+        store = self.inventory.store
+        emulator_id = emu_info.get('emulator', emu_info.get('id', name))
+        version = store.version_for(emu_info)
+        unversioned = version is None
+        if unversioned:
+            # Ссылка без версии: версию сообщает сервер (ETag/Last-Modified),
+            # иначе ее определит содержимое скачанного файла
+            version = store.remote_version(appimage_url)
+            current = store.current(emulator_id)
+            if version is None and current:
+                logger.info(f"ℹ️ Сервер не сообщил версию {name}, остается установленная сборка")
+                version = current['version']
 
         if self._cancelled:
             return False
 
-        # Проверяем, уже ли скачан AppImage
-        if appimage_path.exists():
-            # Делаем исполняемым если нужно
-            if not os.access(appimage_path, os.X_OK):
-                appimage_path.chmod(0o755)
-            logger.info(f"✅ AppImage {name} уже установлен")
+        # Нужная версия уже в хранилище - достаточно переключить ссылку
+        if version and store.has_version(emulator_id, version):
+            store.activate(emulator_id, version)
+            self.inventory.invalidate()
+            logger.info(f"✅ AppImage {name} {version} уже установлен")
             self.progress_updated.emit(100, f"✅ {name} уже установлен")
             return True
 
@@ -248,61 +293,54 @@ class EmulatorManager(QObject):
             return True
 
         try:
-            self.progress_updated.emit(10, f"🔄 Скачивание {name}...")
-
-            # Скачиваем AppImage
-            download_command = ["wget", appimage_url, "-O", str(appimage_path)]
+            # AppImage, скачанный до появления хранилища, переносим в него
+            if self.inventory.appimage_info(appimage_filename) and not appimage_path.is_symlink():
+                logger.info(f"📦 Перенос {appimage_filename} в хранилище эмуляторов")
+                # Сборка старого файла по ссылке без версии неизвестна - версия по содержимому
+                version = store.add_file(emulator_id, None if unversioned else version,
+                                         appimage_path, appimage_url)
+                store.activate(emulator_id, version)
+                # Существующие лаунчеры и спецификации запускают файл по старому имени
+                store.link_alias(emulator_id, appimage_filename)
+                self.inventory.invalidate()
+                self.progress_updated.emit(100, f"✅ {name} уже установлен")
+                return True
 
-            process = subprocess.Popen(
-                download_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1
-            )
+            self.progress_updated.emit(10, f"🔄 Скачивание {name}...")
 
-            # Чтение и отправка вывода
-            for line in process.stdout:
+            def on_progress(downloaded, total):
+                if total > 0:
+                    progress = int((downloaded / total) * 100)
+                    self.progress_updated.emit(
+                        progress,
+                        f"🔄 Скачивание {name}: {downloaded / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB"
+                    )
+
+            # Новая версия: сначала дельта от текущей через zsync, иначе полная загрузка
+            # (при отмене .part остается для докачки)
+            incoming_path = store.incoming_path(emulator_id, version or 'latest')
+            if not store.zsync_update(appimage_url, emulator_id, incoming_path, lambda: self._cancelled):
                 if self._cancelled:
-                    process.terminate()
-                    if appimage_path.exists():
-                        appimage_path.unlink()  # Удаляем частично скачанный файл
                     return False
-                self.progress_updated.emit(50, line.strip())
-
-            process.wait(timeout=300)  # Таймаут 5 минут
-
-            if self._cancelled:
-                if appimage_path.exists():
-                    appimage_path.unlink()
-                return False
+                downloader = HttpDownloader(is_cancelled=lambda: self._cancelled)
+                if not downloader.download(appimage_url, incoming_path, on_progress):
+                    if not self._cancelled:
+                        error_msg = f"Ошибка при скачивании AppImage {name}"
+                        self.progress_updated.emit(0, error_msg)
+                        logger.error(error_msg)
+                    return False
 
-            if process.returncode == 0:
-                # Делаем исполняемым
-                appimage_path.chmod(0o755)
-                self.progress_updated.emit(100, f"✅ {name} успешно установлен.")
-                return True
-            else:
-                error_msg = f"Ошибка при скачивании AppImage: процесс завершился с кодом {process.returncode}"
-                self.progress_updated.emit(0, error_msg)
-                logger.error(error_msg)
-                if appimage_path.exists():
-                    appimage_path.unlink()
-                return False
+            version = store.add_file(emulator_id, version, incoming_path, appimage_url)
+            store.activate(emulator_id, version)
+            store.gc()
+            self.inventory.invalidate()
+            self.progress_updated.emit(100, f"✅ {name} успешно установлен.")
+            return True
 
-        except subprocess.TimeoutExpired:
-            error_msg = "❌ Скачивание AppImage заняло слишком много времени."
-            self.progress_updated.emit(0, error_msg)
-            logger.error(error_msg)
-            if appimage_path.exists():
-                appimage_path.unlink()
-            return False
         except Exception as e:
             error_msg = f"❌ Непредвиденная ошибка при установке AppImage: {e}"
             self.progress_updated.emit(0, error_msg)
             logger.error(error_msg)
-            if appimage_path.exists():
-                appimage_path.unlink()
             return False
 
     def get_emulator_path(self, emulator_id: str) -> str | None:
@@ -316,10 +354,8 @@ class EmulatorManager(QObject):
         install_method = emulator_info.get('install_method')
 
         if install_method == 'appimage':
-            appimage_filename = emulator_info.get('appimage_filename')
-            if appimage_filename:
-                appimage_path = self.project_root / "app" / "emulators" / "appimages" / appimage_filename
-                return str(appimage_path) if appimage_path.exists() else None
+            appimage_info = self.inventory.find_appimage(emulator_info.get('emulator', emulator_id))
+            return str(appimage_info['path']) if appimage_info else None
 
         elif install_method == 'flatpak':
             return emulator_info.get('flatpak_id')
@@ -345,43 +381,46 @@ class EmulatorManager(QObject):
             logger.info("[TEST MODE] Симуляция установки Flatpak")
             return True
 
+        if self._is_flatpak_installed(flatpak_id):
+            self.progress_updated.emit(100, f"✅ {name} уже установлен через Flatpak")
+            return True
+        return self._install_flatpaks([flatpak_id], name)
+
+    def _install_flatpaks(self, flatpak_ids: list, name: str) -> bool:
+        """Ставит один или несколько Flatpak пакетов одной командой и сбрасывает кеш"""
         try:
-            if self._is_flatpak_installed(flatpak_id):
-                self.progress_updated.emit(100, f"✅ {name} уже установлен через Flatpak")
-                return True
-            else:
-                self.progress_updated.emit(10, f"🔄 Установка {name} через Flatpak...")
-                # Добавляем флаг --noninteractive для автоматического подтверждения
-                install_command = ["flatpak", "install", "--noninteractive", "flathub", flatpak_id, "-y"]
-
-                process = subprocess.Popen(
-                    install_command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1
-                )
-
-                # Чтение и отправка вывода
-                for line in process.stdout:
-                    if self._cancelled:
-                        process.terminate()
-                        return False
-                    self.progress_updated.emit(50, line.strip())
-
-                process.wait(timeout=300)  # Таймаут 5 минут
+            self.progress_updated.emit(10, f"🔄 Установка {name} через Flatpak...")
+            # Добавляем флаг --noninteractive для автоматического подтверждения
+            install_command = ["flatpak", "install", "--noninteractive", "flathub", *flatpak_ids, "-y"]
+
+            process = subprocess.Popen(
+                install_command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
 
+            # Чтение и отправка вывода
+            for line in process.stdout:
                 if self._cancelled:
+                    process.terminate()
                     return False
+                self.progress_updated.emit(50, line.strip())
 
-                if process.returncode == 0:
-                    self.progress_updated.emit(100, f"✅ {name} успешно установлен.")
-                    return True
-                else:
-                    error_msg = f"Ошибка при установке Flatpak: процесс завершился с кодом {process.returncode}"
-                    self.progress_updated.emit(0, error_msg)
-                    logger.error(error_msg)
-                    return False
+            process.wait(timeout=300)  # Таймаут 5 минут
+
+            if self._cancelled:
+                return False
+
+            if process.returncode == 0:
+                self.progress_updated.emit(100, f"✅ {name} успешно установлен.")
+                return True
+            else:
+                error_msg = f"Ошибка при установке Flatpak: процесс завершился с кодом {process.returncode}"
+                self.progress_updated.emit(0, error_msg)
+                logger.error(error_msg)
+                return False
         except subprocess.CalledProcessError as e:
             error_msg = f"❌ Ошибка при установке Flatpak: {e.stderr}"
             self.progress_updated.emit(0, error_msg)
@@ -402,6 +441,9 @@ class EmulatorManager(QObject):
             self.progress_updated.emit(0, error_msg)
             logger.error(error_msg)
             return False
+        finally:
+            # Набор установленных пакетов мог измениться (в т.ч. частично)
+            self.inventory.invalidate()
 
     def get_supported_formats(self, emulator_id: str) -> list:
         """
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger('EmulatorStore')
+
+
+class EmulatorStore:
+    """
+    Хранилище версий AppImage эмуляторов.
+
+    Файлы лежат в appimages/.store/objects под своим sha256 (одинаковые
+    сборки хранятся один раз), manifest.json описывает версии каждого
+    эмулятора, а appimages/<эмулятор>.AppImage - символическая ссылка на
+    текущую версию, которая переключается атомарно. Старые версии
+    удаляются gc(), кроме текущей и KEEP_PREVIOUS предыдущих (для отката).
+    """
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+    KEEP_PREVIOUS = 1
+    VERSION_PATTERN = re.compile(r'v?(\d+(?:\.\d+)+)')
+
+    def __init__(self, appimage_dir: Path):
+        self.appimage_dir = Path(appimage_dir)
+        self.store_dir = self.appimage_dir / '.store'
+        self.objects_dir = self.store_dir / 'objects'
+        self.incoming_dir = self.store_dir / 'incoming'
+        self.manifest_path = self.store_dir / 'manifest.json'
+        self._lock = threading.RLock()
+        self.manifest = self._load_manifest()
+
+    # --- манифест ---
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения манифеста эмуляторов: {e}")
+        return {'emulators': {}}
+
+    def _save_manifest(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _emulator_entry(self, emulator_id: str) -> Dict:
+        return self.manifest['emulators'].setdefault(emulator_id.lower(), {'current': None, 'versions': {}})
+
+    # --- пути и версии ---
+
+    @classmethod
+    def version_for(cls, emu_info: dict) -> Optional[str]:
+        """
+        Версия AppImage из конфига: явная, из имени файла или из URL. None для
+        ссылок без версии (.../releases/latest/download/X.AppImage): имя файла
+        у них не меняется между сборками и версией служить не может.
+        """
+        if emu_info.get('version'):
+            return str(emu_info['version'])
+        filename = emu_info.get('appimage_filename') or ''
+        for source in (Path(filename).stem, Path(emu_info.get('appimage_url') or '').stem):
+            match = cls.VERSION_PATTERN.search(source)
+            if match:
+                return match.group(1)
+        return None
+
+    @staticmethod
+    def remote_version(url: str) -> Optional[str]:
+        """
+        Версия сборки по ссылке без версии: ETag или Last-Modified ответа на HEAD.
+        None, если сервер недоступен или не сообщает ни того, ни другого.
+        """
+        try:
+            from .http_downloader import get_session
+            response = get_session().head(url, allow_redirects=True, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось получить версию {url}: {e}")
+            return None
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if not validator:
+            return None
+        return f"remote-{hashlib.sha1(validator.encode('utf-8')).hexdigest()[:12]}"
+
+    @staticmethod
+    def content_version(sha256: str) -> str:
+        """Версия сборки, о которой известно только содержимое"""
+        return f"sha256-{sha256[:12]}"
+
+    def object_path(self, sha256: str) -> Path:
+        return self.objects_dir / f"{sha256}.AppImage"
+
+    def current_link(self, emulator_id: str) -> Path:
+        return self.appimage_dir / f"{emulator_id.lower()}.AppImage"
+
+    def incoming_path(self, emulator_id: str, version: str) -> Path:
+        """Куда скачивать новую версию перед добавлением в хранилище"""
+        safe_version = re.sub(r'[^\w.-]', '_', version)
+        return self.incoming_dir / f"{emulator_id.lower()}-{safe_version}.AppImage"
+
+    def has_version(self, emulator_id: str, version: str) -> bool:
+        with self._lock:
+            entry = self.manifest['emulators'].get(emulator_id.lower(), {})
+            record = entry.get('versions', {}).get(version)
+            return bool(record) and self.object_path(record['object']).exists()
+
+    def current(self, emulator_id: str) -> Optional[Dict]:
+        """Текущая версия эмулятора: version, path (ссылка), object, size или None"""
+        with self._lock:
+            entry = self.manifest['emulators'].get(emulator_id.lower())
+            if not entry or not entry.get('current'):
+                return None
+            record = entry['versions'].get(entry['current'])
+            link = self.current_link(emulator_id)
+            if not record or not link.exists():
+                return None
+            return dict(record, version=entry['current'], path=link)
+
+    # --- изменение хранилища ---
+
+    def _hash_file(self, path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def add_file(self, emulator_id: str, version: Optional[str], path: Path, url: str = '') -> str:
+        """
+        Переносит файл в хранилище под его sha256 и записывает версию в манифест
+        (без версии - по содержимому, content_version). Если такая сборка уже
+        есть, новый файл удаляется. Возвращает записанную версию.
+        """
+        path = Path(path)
+        sha256 = self._hash_file(path)
+        size = path.stat().st_size
+        version = version or self.content_version(sha256)
+
+        with self._lock:
+            self.objects_dir.mkdir(parents=True, exist_ok=True)
+            object_path = self.object_path(sha256)
+            if object_path.exists():
+                logger.info(f"♻️ Сборка {emulator_id} {version} уже есть в хранилище")
+                path.unlink()
+            else:
+                try:
+                    os.replace(path, object_path)
+                except OSError:
+                    # Другая файловая система
+                    shutil.move(str(path), str(object_path))
+                object_path.chmod(0o755)
+
+            self._emulator_entry(emulator_id)['versions'][version] = {
+                'object': sha256,
+                'size': size,
+                'url': url,
+                'added': time.time()
+            }
+            self._save_manifest()
+
+        logger.info(f"📦 {emulator_id} {version} добавлен в хранилище ({sha256[:12]})")
+        return version
+
+    def activate(self, emulator_id: str, version: str) -> Path:
+        """Атомарно переключает ссылку <эмулятор>.AppImage на указанную версию"""
+        with self._lock:
+            entry = self._emulator_entry(emulator_id)
+            record = entry['versions'][version]
+            link = self.current_link(emulator_id)
+            tmp_link = link.with_name(f".{link.name}.tmp")
+
+            target = os.path.relpath(self.object_path(record['object']), link.parent)
+            if tmp_link.is_symlink() or tmp_link.exists():
+                tmp_link.unlink()
+            os.symlink(target, tmp_link)
+            os.replace(tmp_link, link)
+
+            if entry.get('current') != version:
+                entry['previous'] = entry.get('current')
+                entry['current'] = version
+                entry['versions'][version]['activated'] = time.time()
+                self._save_manifest()
+
+        logger.info(f"🔗 Текущая версия {emulator_id}: {version}")
+        return link
+
+    def link_alias(self, emulator_id: str, filename: str) -> Path:
+        """
+        Ссылка <filename> на текущую версию: старое имя AppImage, под которым
+        эмулятор запускают лаунчеры, созданные до появления хранилища.
+        """
+        link = self.current_link(emulator_id)
+        alias = self.appimage_dir / filename
+        if alias == link:
+            return alias
+        with self._lock:
+            tmp_alias = alias.with_name(f".{alias.name}.tmp")
+            if tmp_alias.is_symlink() or tmp_alias.exists():
+                tmp_alias.unlink()
+            os.symlink(link.name, tmp_alias)
+            os.replace(tmp_alias, alias)
+        logger.info(f"🔗 {filename} -> {link.name}")
+        return alias
+
+    def gc(self) -> int:
+        """
+        Удаляет версии, кроме текущей и KEEP_PREVIOUS последних активных,
+        и объекты, на которые не ссылается ни одна версия. Возвращает число
+        освобожденных байт.
+        """
+        freed = 0
+        with self._lock:
+            for emulator_id, entry in self.manifest['emulators'].items():
+                others = sorted(
+                    (version for version in entry['versions'] if version != entry.get('current')),
+                    key=lambda version: entry['versions'][version].get('activated', entry['versions'][version]['added']),
+                    reverse=True
+                )
+                for version in others[self.KEEP_PREVIOUS:]:
+                    logger.info(f"🗑️ Удаление старой версии {emulator_id} {version}")
+                    del entry['versions'][version]
+                    if entry.get('previous') == version:
+                        entry['previous'] = None
+
+            referenced = {record['object']
+                          for entry in self.manifest['emulators'].values()
+                          for record in entry['versions'].values()}
+            if self.objects_dir.exists():
+                for object_path in self.objects_dir.iterdir():
+                    if object_path.name.split('.')[0] not in referenced:
+                        freed += object_path.stat().st_size
+                        object_path.unlink()
+            self._save_manifest()
+
+        if freed:
+            logger.info(f"🧹 Освобождено в хранилище эмуляторов: {freed / (1024 * 1024):.1f} MB")
+        return freed
+
+    # --- дельта-обновление ---
+
+    def zsync_update(self, url: str, emulator_id: str, target_path: Path,
+                     is_cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Собирает новую версию через zsync, используя текущую как основу:
+        скачиваются только изменившиеся блоки. False, если zsync недоступен,
+        сборка не публикует .zsync или нет предыдущей версии.
+        """
+        current = self.current(emulator_id)
+        zsync = shutil.which('zsync')
+        if not current or not zsync:
+            return False
+
+        zsync_url = f"{url}.zsync"
+        try:
+            from .http_downloader import get_session
+            response = get_session().head(zsync_url, allow_redirects=True, timeout=15)
+            if response.status_code != 200:
+                return False
+        except Exception:
+            return False
+
+        target_path = Path(target_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        seed = self.object_path(current['object'])
+        logger.info(f"🔀 Дельта-обновление {emulator_id} через zsync (основа: {current['version']})")
+
+        process = subprocess.Popen(
+            [zsync, '-q', '-i', str(seed), '-o', str(target_path), zsync_url],
+            cwd=str(target_path.parent), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        while True:
+            try:
+                process.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if is_cancelled and is_cancelled():
+                    process.terminate()
+                    process.wait()
+                    return False
+
+        # zsync оставляет копию основы с суффиксом .zs-old
+        target_path.with_name(target_path.name + '.zs-old').unlink(missing_ok=True)
+        if process.returncode != 0 or not target_path.exists():
+            logger.warning(f"⚠️ zsync завершился с кодом {process.returncode}, будет полная загрузка")
+            target_path.unlink(missing_ok=True)
+            return False
+        return True
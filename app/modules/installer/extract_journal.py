@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger('ExtractJournal')
+
+
+class ExtractJournal:
+    """
+    Журнал распаковки: какие файлы архива уже полностью записаны.
+    Лежит в папке распаковки (staging), поэтому переживает падение
+    и позволяет повторной установке пропустить готовые файлы.
+    """
+
+    FILE_NAME = '.extract_journal.json'
+
+    # Как часто сбрасывать журнал на диск
+    FLUSH_INTERVAL = 2.0
+    FLUSH_ENTRIES = 200
+
+    def __init__(self, extract_dir: Path, archive_path: Path):
+        self.extract_dir = Path(extract_dir)
+        self.path = self.extract_dir / self.FILE_NAME
+        self.archive_name = Path(archive_path).name
+        try:
+            self.archive_size = os.stat(archive_path).st_size
+        except OSError:
+            self.archive_size = 0
+
+        self.entries = {}
+        self._dirty = 0
+        self._last_flush = time.time()
+        self._load()
+
+    def _load(self):
+        """Загружает журнал, если он относится к этому же архиву"""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Журнал распаковки поврежден, начинаем заново: {e}")
+            return
+
+        if data.get('archive') != self.archive_name or data.get('archive_size') != self.archive_size:
+            logger.info("♻️ Журнал распаковки от другого архива, начинаем заново")
+            return
+
+        self.entries = {name: int(size) for name, size in data.get('entries', {}).items()}
+        logger.info(f"📒 Журнал распаковки: готово {len(self.entries)} файлов")
+
+    def is_done(self, name: str, size: Optional[int]) -> bool:
+        """Файл уже распакован: отмечен в журнале и лежит на диске с тем же размером"""
+        if name not in self.entries:
+            return False
+        if size is not None and self.entries[name] != size:
+            return False
+        try:
+            return os.stat(self.extract_dir / name).st_size == self.entries[name]
+        except OSError:
+            return False
+
+    def mark_done(self, name: str, size: int):
+        """Отмечает файл как полностью записанный"""
+        self.entries[name] = size
+        self._dirty += 1
+        if (self._dirty >= self.FLUSH_ENTRIES or
+                time.time() - self._last_flush >= self.FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Атомарно записывает журнал на диск"""
+        if not self._dirty:
+            return
+
+        data = {
+            'archive': self.archive_name,
+            'archive_size': self.archive_size,
+            'entries': self.entries
+        }
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = 0
+            self._last_flush = time.time()
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить журнал распаковки: {e}")
+
+    def remove(self):
+        """Удаляет журнал после успешной распаковки"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось удалить журнал распаковки: {e}")
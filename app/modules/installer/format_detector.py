@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+import os
+import stat
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger('FormatDetector')
+
+# Один ограниченный буфер заголовка покрывает все сигнатуры:
+# TAR (257), ISO9660 PVD (0x8000) и PVD в сырых 2352-байтных секторах BIN
+HEADER_SIZE = 0xA000
+
+ISO_SECTOR = 2048
+RAW_SECTOR = 2352
+PVD_SECTOR = 16
+
+# Категории форматов
+ARCHIVE = 'archive'
+DISC_IMAGE = 'disc_image'
+PACKAGE = 'package'
+EXECUTABLE = 'executable'
+UNKNOWN = 'unknown'
+
+# Реестр сигнатур: (смещение, магические байты, формат, категория)
+SIGNATURES = [
+    (0, b'PK\x03\x04', 'zip', ARCHIVE),
+    (0, b'PK\x05\x06', 'zip', ARCHIVE),  # пустой ZIP
+    (0, b'Rar!\x1A\x07\x01\x00', 'rar5', ARCHIVE),
+    (0, b'Rar!\x1A\x07\x00', 'rar', ARCHIVE),
+    (0, b'7z\xBC\xAF\x27\x1C', '7z', ARCHIVE),
+    (0, b'\x1F\x8B\x08', 'gzip', ARCHIVE),
+    (0, b'BZh', 'bzip2', ARCHIVE),
+    (0, b'\xFD7zXZ\x00', 'xz', ARCHIVE),
+    (0, b'MSCF', 'cab', ARCHIVE),
+    (0, b'\x60\xEA', 'arj', ARCHIVE),
+    (0, b'!<arch>', 'ar', ARCHIVE),
+    (2, b'-lh', 'lha', ARCHIVE),
+    (2, b'-lz', 'lha', ARCHIVE),
+    (257, b'ustar', 'tar', ARCHIVE),
+    (0, b'MComprHD', 'chd', DISC_IMAGE),
+    (0, b'CISO', 'cso', DISC_IMAGE),
+    (0, b'ZISO', 'zso', DISC_IMAGE),
+    (0, b'WBFS', 'wbfs', DISC_IMAGE),
+    (0, b'RVZ\x01', 'rvz', DISC_IMAGE),
+    (0, b'\x00PBP', 'pbp', PACKAGE),
+    (0, b'\x7fPKG', 'pkg', PACKAGE),
+    (0, b'\x7fELF', 'elf', EXECUTABLE),
+]
+
+# Форматы, однозначно указывающие на платформу
+PLATFORM_BY_FORMAT = {
+    'cso': 'PSP',
+    'zso': 'PSP',
+    'pbp': 'PSP',
+    'pkg': 'PS3',
+}
+
+
+class FileFormat:
+    """Результат определения формата файла по содержимому"""
+
+    def __init__(self, kind: str = 'unknown', category: str = UNKNOWN,
+                 platform_hint: Optional[str] = None, volume_id: str = '',
+                 system_id: str = '', raw_sectors: bool = False):
+        self.kind = kind
+        self.category = category
+        self.platform_hint = platform_hint
+        self.volume_id = volume_id
+        self.system_id = system_id
+        self.raw_sectors = raw_sectors
+
+    @property
+    def is_archive(self) -> bool:
+        return self.category == ARCHIVE
+
+    @property
+    def is_disc_image(self) -> bool:
+        return self.category == DISC_IMAGE
+
+    @property
+    def is_known(self) -> bool:
+        return self.kind != 'unknown'
+
+    def __repr__(self):
+        hint = f", {self.platform_hint}" if self.platform_hint else ""
+        return f"FileFormat({self.kind}, {self.category}{hint})"
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+_CACHE_LIMIT = 512
+
+
+def _read_pvd(header: bytes) -> Optional[FileFormat]:
+    """Ищет ISO9660 Primary Volume Descriptor в обычных и сырых секторах"""
+    candidates = [
+        (PVD_SECTOR * ISO_SECTOR, False),
+        (PVD_SECTOR * RAW_SECTOR + 16, True),  # MODE1/2352
+        (PVD_SECTOR * RAW_SECTOR + 24, True),  # MODE2/2352
+    ]
+    for offset, raw in candidates:
+        if header[offset:offset + 6] != b'\x01CD001':
+            continue
+
+        system_id = header[offset + 8:offset + 40].decode('ascii', 'replace').strip()
+        volume_id = header[offset + 40:offset + 72].decode('ascii', 'replace').strip()
+
+        platform_hint = None
+        if system_id.startswith('PS3') or header[0x800:0x80C] == b'PlayStation3':
+            platform_hint = 'PS3'
+        elif system_id.startswith('PSP'):
+            platform_hint = 'PSP'
+        # PLAYSTATION - PS1 или PS2: по заголовку не различить (PS1 бывает и
+        # 2048-байтным ISO), решает SYSTEM.CNF в detect_format
+
+        return FileFormat('iso9660', DISC_IMAGE, platform_hint, volume_id, system_id, raw)
+    return None
+
+
+def detect_header(header: bytes) -> FileFormat:
+    """Определяет формат по уже прочитанному буферу заголовка"""
+    for offset, magic, kind, category in SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return FileFormat(kind, category, PLATFORM_BY_FORMAT.get(kind))
+
+    iso = _read_pvd(header)
+    if iso:
+        return iso
+
+    # Расшифрованный PS3 образ без PVD в начале
+    if header[0x800:0x80C] == b'PlayStation3':
+        return FileFormat('iso9660', DISC_IMAGE, 'PS3')
+
+    return FileFormat()
+
+
+def detect_format(file_path: Path) -> FileFormat:
+    """
+    Определяет формат файла по содержимому.
+    Читает один буфер заголовка; результат кэшируется по (путь, размер, mtime).
+    """
+    file_path = Path(file_path)
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return FileFormat()
+
+    if not stat.S_ISREG(st.st_mode):
+        return FileFormat()
+
+    key = (str(file_path), st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось прочитать заголовок {file_path.name}: {e}")
+        return FileFormat()
+
+    result = detect_header(header)
+
+    # PS1 загружается по BOOT, PS2 - по BOOT2 из SYSTEM.CNF
+    if result.kind == 'iso9660' and result.system_id.startswith('PLAYSTATION'):
+        from .image_metadata import playstation_platform
+        result.platform_hint = playstation_platform(file_path)
+
+    logger.info(f"🔎 Формат {file_path.name}: {result}")
+
+    with _cache_lock:
+        if len(_cache) >= _CACHE_LIMIT:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = result
+    return result
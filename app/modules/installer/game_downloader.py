@@ -15,14 +15,17 @@ class GameDownloader(QThread):
     finished = pyqtSignal()
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, game_data: dict, download_dir: Path, parent=None):
+    def __init__(self, game_data: dict, download_dir: Path, planner=None, parent=None):
         super().__init__(parent)
         self.game_data = game_data
         self.download_dir = download_dir
+        self.planner = planner
         self._process = None
         self._cancelled = False
         self.session = None
         self.handle = None
+        self.space_error = None
+        self.download_complete = False
 
     def _load_trackers_from_file(self) -> list:
         """Загружает список трекеров из текстового файла в папке installer."""
@@ -95,6 +98,9 @@ class GameDownloader(QThread):
                 'piece_timeout': 20,
                 'inactivity_timeout': 20,
                 'auto_manage_interval': 30,
+                # Алерты о статусе и ошибках будят цикл ожидания вместо опроса
+                'alert_mask': (lt.alert.category_t.status_notification |
+                               lt.alert.category_t.error_notification),
             }
 
             self.session = lt.session(settings)
@@ -215,11 +221,23 @@ class GameDownloader(QThread):
             last_progress = 0
             last_log_time = time.time()
             max_speed = 0
+            space_checked = False
 
             while not self._cancelled and self.handle and self.handle.status().state != lt.torrent_status.seeding:
                 status = self.handle.status()
                 current_time = time.time()
 
+                # Как только пришли метаданные - проверяем место под весь торрент
+                if not space_checked and status.has_metadata and self.planner:
+                    space_checked = True
+                    ok, message = self.planner.check_download(status.total_wanted, status.total_wanted_done)
+                    if not ok:
+                        self.space_error = message
+                        self.session.remove_torrent(self.handle)
+                        self.handle = None
+                        self.error_occurred.emit(message)
+                        return
+
                 # Рассчитываем прогресс
                 if status.total_wanted > 0:
                     progress = int((status.total_done / status.total_wanted) * 100)
@@ -293,7 +311,11 @@ class GameDownloader(QThread):
                     last_update_time = current_time
                     last_progress = progress
 
-                time.sleep(0.05)  # Минимальная задержка для максимальной отзывчивости
+                # Ждем события libtorrent (не дольше интервала обновления UI)
+                if self.session.wait_for_alert(250):
+                    for alert in self.session.pop_alerts():
+                        if isinstance(alert, lt.torrent_error_alert):
+                            raise Exception(alert.message())
 
             # Проверяем завершение загрузки
             if not self._cancelled and self.handle and self.handle.status().state == lt.torrent_status.seeding:
@@ -305,6 +327,7 @@ class GameDownloader(QThread):
                 logger.info(f"🏆 Максимальная скорость: {max_speed/1024:.2f} MB/s")
 
                 self.progress_updated.emit(100, f"✅ Скачивание завершено! Макс. скорость: {max_speed/1024:.1f} MB/s")
+                self.download_complete = True
                 self.finished.emit()
 
         except Exception as e:
@@ -384,6 +407,45 @@ class GameDownloader(QThread):
         logger.warning("⚠️ Скачанный файл не найден")
         return None
 
+    def get_downloaded_files(self) -> list:
+        """
+        Возвращает список (путь, размер) всех файлов торрента.
+        Берется из метаданных, без сканирования папки загрузки.
+        """
+        files = []
+        try:
+            if self.handle and self.handle.status().has_metadata:
+                storage = self.handle.get_torrent_info().files()
+                for index in range(storage.num_files()):
+                    file_path = self.download_dir / storage.file_path(index)
+                    files.append((file_path, storage.file_size(index)))
+                logger.info(f"📋 Файлов в торренте: {len(files)}")
+                return files
+
+            # Fallback: только то, что вернул поиск скачанного файла
+            downloaded = self.get_downloaded_file_path()
+            if downloaded and downloaded.is_file():
+                files.append((downloaded, downloaded.stat().st_size))
+            elif downloaded and downloaded.is_dir():
+                for file_path in downloaded.rglob('*'):
+                    if file_path.is_file():
+                        files.append((file_path, file_path.stat().st_size))
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения списка файлов торрента: {e}")
+
+        return files
+
+    def release(self):
+        """Убирает завершенный торрент из сессии и освобождает файлы"""
+        if self.session and self.handle:
+            try:
+                self.session.remove_torrent(self.handle)
+                logger.info("📤 Торрент убран из сессии, файлы освобождены")
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось убрать торрент из сессии: {e}")
+        self.handle = None
+
     def cancel(self):
         """Отмена загрузки"""
         logger.info("⏹️ Запрос отмены загрузки...")
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('HttpDownloader')
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+    'Accept': '*/*'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Общая сессия с пулом соединений и повторами для всех HTTP загрузок"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=3, backoff_factor=0.5,
+                          status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=frozenset(['GET', 'HEAD']))
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+            _session = requests.Session()
+            _session.headers.update(DEFAULT_HEADERS)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+class HttpDownloader:
+    """
+    HTTP загрузчик: несколько соединений через Range (если сервер их
+    поддерживает), докачка из .part файла, крупные блоки и прогресс
+    не чаще PROGRESS_INTERVAL.
+    progress_callback(скачано_байт, всего_байт) вызывается из рабочих потоков.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+    PROGRESS_INTERVAL = 0.25
+    TIMEOUT = 30
+
+    def __init__(self, connections: int = 4, headers: Optional[dict] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None):
+        self.connections = max(1, connections)
+        self.headers = headers or {}
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.session = get_session()
+
+        self._lock = threading.Lock()
+        self._downloaded = 0
+        self._total = 0
+        self._last_report = 0
+        self._progress_callback = None
+
+    # --- служебные методы ---
+
+    def _probe(self, url: str) -> dict:
+        """Запрашивает первый байт: размер, поддержка Range, валидаторы и итоговый URL"""
+        headers = dict(self.headers, Range='bytes=0-0')
+        with self.session.get(url, headers=headers, stream=True,
+                              timeout=self.TIMEOUT, allow_redirects=True) as response:
+            response.raise_for_status()
+            info = {
+                'url': response.url,
+                'size': 0,
+                'ranges': False,
+                'validator': response.headers.get('ETag') or response.headers.get('Last-Modified', '')
+            }
+            content_range = response.headers.get('Content-Range', '')
+            match = re.match(r'bytes \d+-\d+/(\d+)', content_range)
+            if response.status_code == 206 and match:
+                info['size'] = int(match.group(1))
+                info['ranges'] = True
+            else:
+                info['size'] = int(response.headers.get('Content-Length', 0))
+            return info
+
+    def _report(self, amount: int):
+        with self._lock:
+            self._downloaded += amount
+            now = time.time()
+            if not self._progress_callback or now - self._last_report < self.PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+            downloaded, total = self._downloaded, self._total
+        self._progress_callback(downloaded, total)
+
+    @staticmethod
+    def _state_path(part_path: Path) -> Path:
+        return part_path.with_name(part_path.name + '.json')
+
+    def _load_state(self, part_path: Path, info: dict) -> Optional[dict]:
+        """Состояние прерванной загрузки (если файл на сервере не менялся)"""
+        state_path = self._state_path(part_path)
+        if not part_path.exists() or not state_path.exists():
+            return None
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception:
+            return None
+        if state.get('size') != info['size'] or state.get('validator') != info['validator']:
+            return None
+        return state
+
+    def _save_state(self, part_path: Path, state: dict):
+        state_path = self._state_path(part_path)
+        tmp_path = state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    # --- загрузка ---
+
+    def _download_stream(self, url: str, part_path: Path, info: dict) -> bool:
+        """
+        Одно соединение; докачка с конца .part, если сервер поддерживает Range
+        и файл на сервере тот же (валидатор в состоянии .part и If-Range).
+        """
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        state = self._load_state(part_path, info) if offset else None
+        if offset and (not state or 'segments' in state):
+            # .part от другой версии файла (или от сегментной загрузки) - начинаем заново
+            logger.info(f"♻️ {part_path.name} не соответствует файлу на сервере, загрузка заново")
+            offset = 0
+        if self._total and offset > self._total:
+            offset = 0
+        if self._total and offset == self._total:
+            # Файл скачан полностью, но не успел переименоваться
+            self._downloaded = offset
+            return True
+
+        headers = dict(self.headers)
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if info['validator'] and not info['validator'].startswith('W/'):
+                # Файл сменился после пробного запроса - сервер отдаст его целиком
+                headers['If-Range'] = info['validator']
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.TIMEOUT) as response:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                # Сервер отдал файл целиком - начинаем заново
+                offset = 0
+            self._downloaded = offset
+            if not offset:
+                self._save_state(part_path, {'size': info['size'], 'validator': info['validator']})
+
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    if self.is_cancelled():
+                        return False
+                    if chunk:
+                        f.write(chunk)
+                        self._report(len(chunk))
+        return True
+
+    def _download_segment(self, url: str, part_path: Path, segment: list, state: dict) -> bool:
+        """Скачивает один сегмент [start, end, done] в свою область .part файла"""
+        start, end, done = segment
+        if start + done > end:
+            return True
+
+        headers = dict(self.headers, Range=f'bytes={start + done}-{end}')
+        with self.session.get(url, headers=headers, stream=True, timeout=self.TIMEOUT) as response:
+            if response.status_code != 206:
+                raise Exception(f"Сервер не вернул диапазон (HTTP {response.status_code})")
+
+            # Без буфера: журнал сегментов не должен опережать данные на диске
+            with open(part_path, 'r+b', buffering=0) as f:
+                f.seek(start + done)
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    if self.is_cancelled():
+                        return False
+                    if chunk:
+                        f.write(chunk)
+                        with self._lock:
+                            segment[2] += len(chunk)
+                        self._report(len(chunk))
+
+        with self._lock:
+            self._save_state(part_path, state)
+        return True
+
+    def _download_segmented(self, url: str, part_path: Path, info: dict) -> bool:
+        state = self._load_state(part_path, info)
+        if state:
+            logger.info(f"⏯️ Докачка {part_path.name}: {sum(s[2] for s in state['segments'])} байт уже скачано")
+        else:
+            size = info['size']
+            count = min(self.connections, max(1, size // self.MIN_SEGMENT_SIZE))
+            step = size // count
+            segments = []
+            for index in range(count):
+                start = index * step
+                end = size - 1 if index == count - 1 else start + step - 1
+                segments.append([start, end, 0])
+            state = {'size': size, 'validator': info['validator'], 'segments': segments}
+
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            self._save_state(part_path, state)
+
+        self._downloaded = sum(segment[2] for segment in state['segments'])
+        logger.info(f"🔀 Загрузка в {len(state['segments'])} соединений")
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(state['segments']),
+                                    thread_name_prefix='http-segment') as pool:
+                futures = [
+                    pool.submit(self._download_segment, url, part_path, segment, state)
+                    for segment in state['segments']
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            with self._lock:
+                self._save_state(part_path, state)
+
+        return all(results)
+
+    def download(self, url: str, target_path: Path, progress_callback=None) -> bool:
+        """
+        Скачивает url в target_path. Данные пишутся в target_path.part и
+        переименовываются по завершении; прерванная загрузка продолжается.
+        """
+        target_path = Path(target_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = target_path.with_name(target_path.name + '.part')
+        self._progress_callback = progress_callback
+
+        try:
+            info = self._probe(url)
+            self._total = info['size']
+            logger.info(f"🌐 Загрузка {target_path.name}: {info['size']} байт, "
+                        f"Range: {'да' if info['ranges'] else 'нет'}")
+
+            if info['ranges'] and info['size'] >= self.MIN_SEGMENT_SIZE * 2 and self.connections > 1:
+                completed = self._download_segmented(info['url'], part_path, info)
+            else:
+                completed = self._download_stream(info['url'], part_path, info)
+
+            if not completed:
+                logger.info(f"⏸️ Загрузка прервана, частичный файл сохранен: {part_path.name}")
+                return False
+
+            if info['size'] and part_path.stat().st_size != info['size']:
+                raise Exception(f"Размер файла {part_path.stat().st_size} не совпадает с {info['size']}")
+
+            os.replace(part_path, target_path)
+            self._state_path(part_path).unlink(missing_ok=True)
+
+            if progress_callback:
+                progress_callback(self._total or self._downloaded, self._total or self._downloaded)
+            logger.info(f"✅ Загрузка успешна: {target_path.name}")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка загрузки {target_path.name}: {e}")
+            return False
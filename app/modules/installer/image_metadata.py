@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+import os
+import re
+import zlib
+import struct
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from .format_detector import detect_format, ISO_SECTOR, RAW_SECTOR, PVD_SECTOR
+from .ps3_index import parse_sfo, SFO_MAX_SIZE
+
+logger = logging.getLogger('ImageMetadata')
+
+# Смещение пользовательских данных в сыром секторе: MODE1/2352 и MODE2/2352 (Form 1)
+RAW_DATA_OFFSETS = (16, 24)
+
+# Заголовок CSO: магия, размер заголовка, размер образа, размер блока, версия, выравнивание
+CSO_HEADER = struct.Struct('<4sIQIBB2x')
+CSO_PLAIN_FLAG = 0x80000000
+
+# Заголовок PBP: магия, версия, смещения 8 секций (первая - PARAM.SFO)
+PBP_HEADER = struct.Struct('<4sI8I')
+
+# BOOT2 = cdrom0:\SLUS_200.62;1 (PS2) / BOOT = cdrom:\SCUS_944.26;1 (PS1)
+BOOT_LINE = re.compile(r'^\s*(BOOT2?)\s*=\s*cdrom0?:\\*([^;\s]+)', re.IGNORECASE | re.MULTILINE)
+SERIAL_PATTERN = re.compile(r'([A-Z]{4})[_-]?(\d{3})\.?(\d{2})')
+
+MAX_SMALL_FILE = 64 * 1024
+
+
+def normalize_serial(value: str) -> Optional[str]:
+    """SLUS_200.62 / SLUS-20062 / slus20062 -> SLUS-20062"""
+    match = SERIAL_PATTERN.search(value.upper()) if value else None
+    return f"{match.group(1)}-{match.group(2)}{match.group(3)}" if match else None
+
+
+class _SectorReader:
+    """Чтение 2048-байтных секторов ISO9660 из ISO, сырого BIN или CSO через os.pread"""
+
+    def __init__(self, fd: int, kind: str):
+        self.fd = fd
+        self.sector_size = ISO_SECTOR
+        self.data_offset = 0
+        self.cso = None
+
+        if kind == 'cso':
+            magic, _, total, block_size, _, align = CSO_HEADER.unpack(os.pread(fd, CSO_HEADER.size, 0))
+            count = (total + block_size - 1) // block_size + 1
+            index = struct.unpack(f'<{count}I', os.pread(fd, count * 4, CSO_HEADER.size))
+            self.cso = (block_size, align, index)
+            return
+
+        # Сырой CD-образ: ищем PVD с обоими вариантами смещения данных
+        for offset in RAW_DATA_OFFSETS:
+            if os.pread(fd, 6, PVD_SECTOR * RAW_SECTOR + offset) == b'\x01CD001':
+                self.sector_size = RAW_SECTOR
+                self.data_offset = offset
+                break
+
+    def _cso_block(self, block: int) -> bytes:
+        block_size, align, index = self.cso
+        start = (index[block] & ~CSO_PLAIN_FLAG) << align
+        end = (index[block + 1] & ~CSO_PLAIN_FLAG) << align
+        data = os.pread(self.fd, end - start, start)
+        if index[block] & CSO_PLAIN_FLAG:
+            return data[:block_size]
+        return zlib.decompressobj(-15).decompress(data, block_size)
+
+    def read(self, sector: int, count: int = 1) -> bytes:
+        if self.cso:
+            block_size = self.cso[0]
+            start = sector * ISO_SECTOR
+            end = start + count * ISO_SECTOR
+            data = b''.join(self._cso_block(block)
+                            for block in range(start // block_size, (end - 1) // block_size + 1))
+            return data[start % block_size:start % block_size + count * ISO_SECTOR]
+        if self.sector_size == ISO_SECTOR:
+            return os.pread(self.fd, count * ISO_SECTOR, sector * ISO_SECTOR)
+        return b''.join(os.pread(self.fd, ISO_SECTOR, (sector + i) * RAW_SECTOR + self.data_offset)
+                        for i in range(count))
+
+
+class _Iso9660:
+    """Минимальный разбор ISO9660: поиск файла по пути и чтение небольших файлов"""
+
+    def __init__(self, reader: _SectorReader):
+        self.reader = reader
+        pvd = reader.read(PVD_SECTOR)
+        if pvd[:6] != b'\x01CD001':
+            raise ValueError("PVD не найден")
+        self.volume_id = pvd[40:72].decode('ascii', 'replace').strip()
+        self.root = self._parse_record(pvd[156:190])
+
+    @staticmethod
+    def _parse_record(record: bytes) -> Dict:
+        name_length = record[32]
+        name = record[33:33 + name_length].decode('ascii', 'replace').split(';')[0].rstrip('.')
+        return {
+            'lba': struct.unpack_from('<I', record, 2)[0],
+            'size': struct.unpack_from('<I', record, 10)[0],
+            'is_dir': bool(record[25] & 0x02),
+            'name': name.upper()
+        }
+
+    def _list(self, directory: Dict) -> Dict[str, Dict]:
+        sectors = (directory['size'] + ISO_SECTOR - 1) // ISO_SECTOR
+        data = self.reader.read(directory['lba'], min(sectors, 64))
+        entries = {}
+        for sector_start in range(0, len(data), ISO_SECTOR):
+            position = sector_start
+            while position < sector_start + ISO_SECTOR:
+                length = data[position]
+                if length == 0:
+                    break
+                record = self._parse_record(data[position:position + length])
+                if record['name'] not in ('\x00', '\x01', ''):
+                    entries[record['name']] = record
+                position += length
+        return entries
+
+    def find(self, path: str) -> Optional[Dict]:
+        current = self.root
+        for part in path.upper().strip('\\/').replace('\\', '/').split('/'):
+            if not current['is_dir']:
+                return None
+            current = self._list(current).get(part)
+            if not current:
+                return None
+        return current
+
+    def read_file(self, path: str, limit: int = MAX_SMALL_FILE) -> Optional[bytes]:
+        record = self.find(path)
+        if not record or record['is_dir']:
+            return None
+        size = min(record['size'], limit)
+        return self.reader.read(record['lba'], (size + ISO_SECTOR - 1) // ISO_SECTOR)[:size]
+
+
+def _read_iso_metadata(fd: int, kind: str) -> Optional[Dict]:
+    iso = _Iso9660(_SectorReader(fd, kind))
+    result = {'volume_id': iso.volume_id}
+
+    # PSP: UMD_DATA.BIN ("ULUS-10041|...") и PSP_GAME/PARAM.SFO
+    umd_data = iso.read_file('UMD_DATA.BIN', 64)
+    sfo = parse_sfo(iso.read_file('PSP_GAME/PARAM.SFO', SFO_MAX_SIZE) or b'')
+    if umd_data or sfo:
+        sfo = sfo or {}
+        serial = normalize_serial(umd_data.split(b'|')[0].decode('ascii', 'replace')) if umd_data else None
+        return dict(result, platform='PSP', serial=serial or normalize_serial(sfo.get('DISC_ID', '')),
+                    title=sfo.get('TITLE'), version=sfo.get('DISC_VERSION') or sfo.get('APP_VER'))
+
+    # PS1/PS2: загрузочный ELF из SYSTEM.CNF
+    system_cnf = iso.read_file('SYSTEM.CNF', 4096)
+    if system_cnf:
+        match = BOOT_LINE.search(system_cnf.decode('ascii', 'replace'))
+        if match:
+            boot = match.group(2).replace('\\', '/')
+            version = re.search(r'^\s*VER\s*=\s*(\S+)', system_cnf.decode('ascii', 'replace'), re.MULTILINE)
+            return dict(result, platform='PS2' if match.group(1).upper() == 'BOOT2' else 'PS1',
+                        serial=normalize_serial(boot), boot=boot,
+                        version=version.group(1) if version else None)
+
+    # PS1 без SYSTEM.CNF запускает PSX.EXE - серийного номера нет
+    if iso.find('PSX.EXE'):
+        return dict(result, platform='PS1', serial=None)
+    return result
+
+
+def _read_pbp_metadata(fd: int) -> Optional[Dict]:
+    header = os.pread(fd, PBP_HEADER.size, 0)
+    offsets = PBP_HEADER.unpack(header)[2:]
+    sfo = parse_sfo(os.pread(fd, min(offsets[1] - offsets[0], SFO_MAX_SIZE), offsets[0]))
+    if not sfo:
+        return None
+    # CATEGORY ME - PS1 классика в PBP, остальное - PSP
+    platform = 'PS1' if sfo.get('CATEGORY') == 'ME' else 'PSP'
+    return {'platform': platform, 'serial': normalize_serial(sfo.get('DISC_ID', '')),
+            'title': sfo.get('TITLE'), 'version': sfo.get('DISC_VERSION') or sfo.get('APP_VER')}
+
+
+def playstation_platform(image_path: Path) -> Optional[str]:
+    """PS1 или PS2 для образа с системой PLAYSTATION по SYSTEM.CNF (BOOT / BOOT2); None, если не определить"""
+    try:
+        fd = os.open(image_path, os.O_RDONLY)
+        try:
+            metadata = _read_iso_metadata(fd, 'iso9660')
+        finally:
+            os.close(fd)
+    except (OSError, ValueError, struct.error, IndexError):
+        return None
+    platform = metadata.get('platform') if metadata else None
+    return platform if platform in ('PS1', 'PS2') else None
+
+
+def _cue_data_file(cue_path: Path) -> Optional[Path]:
+    """Первый трек данных из CUE (FILE "game.bin" BINARY)"""
+    try:
+        with open(cue_path, 'r', encoding='utf-8', errors='replace') as f:
+            match = re.search(r'^\s*FILE\s+"?([^"\n]+?)"?\s+BINARY', f.read(MAX_SMALL_FILE),
+                              re.IGNORECASE | re.MULTILINE)
+    except OSError:
+        return None
+    return cue_path.parent / match.group(1) if match else None
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+_CACHE_LIMIT = 1024
+
+
+def read_image_metadata(image_path: Path) -> Optional[Dict]:
+    """
+    Метаданные образа игры: platform, serial (вида SLUS-20062), title,
+    version, volume_id. Читаются только нужные сектора (PVD, каталог,
+    SYSTEM.CNF / UMD_DATA.BIN / PARAM.SFO) через os.pread, без распаковки
+    образа. Результат кешируется по (устройство, inode, размер, mtime).
+    """
+    image_path = Path(image_path)
+    if image_path.suffix.lower() == '.cue':
+        data_file = _cue_data_file(image_path)
+        return read_image_metadata(data_file) if data_file else None
+
+    try:
+        st = os.stat(image_path)
+    except OSError:
+        return None
+
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+
+    kind = detect_format(image_path).kind
+    result = None
+    try:
+        fd = os.open(image_path, os.O_RDONLY)
+        try:
+            if kind in ('iso9660', 'cso'):
+                result = _read_iso_metadata(fd, kind)
+            elif kind == 'pbp':
+                result = _read_pbp_metadata(fd)
+        finally:
+            os.close(fd)
+    except (OSError, ValueError, struct.error, zlib.error, IndexError) as e:
+        logger.warning(f"⚠️ Не удалось прочитать метаданные {image_path.name}: {e}")
+
+    if result and result.get('serial'):
+        logger.info(f"🏷️ {image_path.name}: {result.get('platform')} {result['serial']}")
+
+    with _cache_lock:
+        if len(_cache) >= _CACHE_LIMIT:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = result
+    return result
+
+
+def image_serial(image_path: Path) -> Optional[str]:
+    """Серийный номер образа или None"""
+    metadata = read_image_metadata(image_path)
+    return metadata.get('serial') if metadata else None
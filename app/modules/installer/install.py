@@ -1,6 +1,8 @@
+import os
 import sys
 import json
 import logging
+import threading
 import time
 from pathlib import Path
 from typing import Optional, Dict
@@ -16,14 +18,26 @@ from .config_manager import ConfigManager
 from .game_downloader import GameDownloader
 from .archive_extractor import ArchiveExtractor
 from .launch_manager import LaunchManager
+from .install_manifest import InstallManifest
+from .staging import StagingArea
+from .install_planner import InstallPlanner
+from .stage_scheduler import StageScheduler
+from .install_resources import install_resources
+from .ps3_index import get_ps3_index
+from .image_metadata import read_image_metadata
+from .disc_sets import resolve_disc_set, disc_set_record, PLAYLIST_EMULATORS
 
 # Импорт каталога установки
 from core import get_users_path
 from core import get_users_subpath
+from core import load_installed_games, save_installed_games
 
 # Создаем основной логгер приложения
 logger = logging.getLogger('InstallDialog')
 
+# installed_games.json обновляют несколько установок одновременно
+_registry_lock = threading.Lock()
+
 
 class InstallThread(QThread):
 
@@ -34,35 +48,54 @@ class InstallThread(QThread):
     error_occurred = pyqtSignal(str)
     cancelled = pyqtSignal()
     set_indeterminate = pyqtSignal(bool)
+    # Поток завершил работу (успех, ошибка или отмена)
+    completed = pyqtSignal()
 
     def __init__(self, game_data: dict, install_dir: Path, project_root: Path, parent=None):
         super().__init__(parent)
         self.game_data = game_data
-        self.install_dir = install_dir
         self.project_root = project_root
         self._cancelled = False
         self._was_cancelled = False
+        # Этап уже сообщил об ошибке - общее сообщение не дублируем
+        self._error_reported = False
+        # Другой этап завершился неудачей: загрузка и распаковка прерываются
+        self._aborted = False
+        # При приостановке staging сохраняется для продолжения установки
+        self._keep_staging = False
         self.installed_games_file = Path(get_users_path()) / 'installed_games.json'
 
+        # Каждая установка работает в своей staging папке,
+        # install_dir - папка платформы, куда игра переносится после успеха
+        self.staging = StagingArea(install_dir, self.game_data.get('id'))
+        self.install_dir = self.staging.prepare()
+        self.planner = InstallPlanner(self.game_data, self.install_dir)
+
         self.emulator_manager = EmulatorManager(self.project_root, test_mode=False)
         self.bios_manager = BIOSManager(self.project_root)
-        self.game_downloader = GameDownloader(self.game_data, self.install_dir)
-        self.archive_extractor = ArchiveExtractor(self.game_data, self.install_dir)
+        self.game_downloader = GameDownloader(self.game_data, self.install_dir, self.planner)
+        self.archive_extractor = ArchiveExtractor(self.game_data, self.install_dir, self.planner)
         self.extracted_files = []
+        self.disc_set = None
+        self.manifest = InstallManifest(self.game_data.get('id'), self.install_dir)
         self.config_manager = ConfigManager(self.project_root)
         self.launch_manager = LaunchManager(self.project_root)  # Создаем экземпляр LaunchManager
 
     def get_installed_games(self):
         """Возвращает словарь установленных игр"""
-        if self.installed_games_file.exists():
-            try:
-                with open(self.installed_games_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        try:
+            return load_installed_games(self.installed_games_file)
+        except:
+            return {}
 
     def run(self):
+        # Одну игру не устанавливают одновременно диалог и очередь:
+        # оба потока писали бы в одну staging папку
+        if not self.staging.acquire():
+            self._report_error("Эта игра уже устанавливается")
+            self.completed.emit()
+            return
+
         try:
             # ДИАГНОСТИКА: выводим информацию о том, что ищем
             logger.info(f"🎯 Начинаем установку игры: {self.game_data.get('title')}")
@@ -73,197 +106,291 @@ class InstallThread(QThread):
             # Выводим содержимое директории для диагностики
             if self.install_dir.exists():
                 contents = [f.name for f in self.install_dir.iterdir()]
-                logger.info(f"📋 Содержимое директории установки: {contents}")
+                if contents:
+                    logger.info(f"📋 Staging содержит данные прошлой попытки: {contents}")
 
-            # Шаг 1: Проверка и установка эмулятора
-            self.progress_updated.emit(5, "Этап 1: Проверка и установка эмулятора...")
-            if self._cancelled:
-                self._was_cancelled = True
+            # Отказываем сразу, если места не хватит даже под размер из каталога
+            space_ok, space_message = self.planner.check_catalog_size()
+            if not space_ok:
+                self._report_error(space_message)
                 return
 
-            # Используем ensure_emulator_for_game
-            if not self.emulator_manager.ensure_emulator_for_game(self.game_data):
-                self.error_occurred.emit("Ошибка при установке эмулятора.")
-                return
+            # Эмулятор, BIOS и загрузка игры независимы и идут параллельно;
+            # конфиги и лаунчер ждут завершения всех трех
+            scheduler = StageScheduler(is_cancelled=lambda: self._cancelled, on_abort=self._abort_stages)
+            scheduler.add('emulator', self._stage_emulator)
+            scheduler.add('bios', self._stage_bios)
+            scheduler.add('download', self._stage_download)
+            scheduler.add('extract', self._stage_extract, depends=['download'])
+            scheduler.add('promote', self._stage_promote, depends=['extract'])
+            scheduler.add('config', self._stage_config, depends=['emulator', 'bios', 'promote'])
+            scheduler.add('launcher', self._stage_launcher, depends=['config'])
 
-            if self._cancelled:
-                self._was_cancelled = True
-                return
+            scheduler.run()
 
-            # Шаг 2: Проверка и установка BIOS
-            self.progress_updated.emit(30, "Этап 2: Проверка и установка BIOS...")
             if self._cancelled:
                 self._was_cancelled = True
-                return
+            elif scheduler.error and not self._error_reported:
+                self.error_occurred.emit(f"Установка прервана из-за ошибки: {scheduler.error}")
 
-            bios_result = self.bios_manager.ensure_bios_for_platform(self.game_data.get('platform'))
-            if not bios_result:
-                # Даже если BIOS не установился, продолжаем установку
-                logger.warning("⚠️ BIOS не установлен, но продолжаем установку игры")
-                self.progress_updated.emit(35, "⚠️ BIOS не установлен, продолжаем...")
-            else:
-                self.progress_updated.emit(35, "✅ BIOS проверен/установлен")
+        except Exception as e:
+            if not self._was_cancelled:
+                self._report_error(f"Установка прервана из-за ошибки: {e}")
+        finally:
+            self.set_indeterminate.emit(False)
+            if self._was_cancelled:
+                if not self._keep_staging:
+                    self.staging.discard()
+                self.cancelled.emit()
+            self.staging.release()
+            self.completed.emit()
 
-            if self._cancelled:
-                self._was_cancelled = True
-                return
+    def _report_error(self, message: str):
+        """Сообщает об ошибке установки (одна ошибка - одно сообщение)"""
+        self._error_reported = True
+        self.error_occurred.emit(message)
 
-            # Шаг 3: Скачивание игры
-            self.progress_updated.emit(50, "Этап 3: Подготовка к загрузке игры...")
-            self.set_indeterminate.emit(True)
+    def _stopped(self) -> bool:
+        """Установка отменена пользователем или прервана неудачей другого этапа"""
+        return self._cancelled or self._aborted
 
-            # Подключаем сигналы game_downloader
-            self.game_downloader.progress_updated.connect(self.progress_updated)
-            self.game_downloader.finished.connect(self.on_download_finished)
-            self.game_downloader.error_occurred.connect(self.on_download_error)
+    def _abort_stages(self):
+        """Останавливает долгие этапы после неудачи эмулятора, BIOS и т.д. (staging сохраняется)"""
+        self._aborted = True
+        self.game_downloader.cancel()
+        self.archive_extractor.cancel()
 
-            # Запускаем загрузку в отдельном потоке
-            self.game_downloader.start()
+    def _stage_emulator(self) -> bool:
+        """Этап 1: Проверка и установка эмулятора (один эмулятор ставит одна установка)"""
+        self.progress_updated.emit(5, "Этап 1: Проверка и установка эмулятора...")
+        emulator_info = self.emulator_manager.get_emulator_info_for_game(self.game_data) or {}
+        # Ключ тот же, что у хранилища эмуляторов
+        emulator_id = emulator_info.get('emulator', emulator_info.get('id')) or self.game_data.get('platform')
+        with install_resources.hold(install_resources.emulator_lock(emulator_id), self._stopped) as acquired:
+            return acquired and self._install_emulator()
+
+    def _install_emulator(self) -> bool:
+        if self._cancelled:
+            return False
+
+        # Используем ensure_emulator_for_game
+        if not self.emulator_manager.ensure_emulator_for_game(self.game_data):
+            if not self._cancelled:
+                self._report_error("Ошибка при установке эмулятора.")
+            return False
+
+        return not self._cancelled
+
+    def _stage_bios(self) -> bool:
+        """Этап 2: Проверка и установка BIOS (BIOS платформы ставит одна установка)"""
+        self.progress_updated.emit(30, "Этап 2: Проверка и установка BIOS...")
+        with install_resources.hold(install_resources.bios_lock(self.game_data.get('platform')), self._stopped) as acquired:
+            return acquired and self._install_bios()
+
+    def _install_bios(self) -> bool:
+        if self._cancelled:
+            return False
+
+        bios_result = self.bios_manager.ensure_bios_for_platform(self.game_data.get('platform'))
+        if not bios_result:
+            # Даже если BIOS не установился, продолжаем установку
+            logger.warning("⚠️ BIOS не установлен, но продолжаем установку игры")
+            self.progress_updated.emit(35, "⚠️ BIOS не установлен, продолжаем...")
+        else:
+            self.progress_updated.emit(35, "✅ BIOS проверен/установлен")
 
-            # Ждем завершения загрузки
-            while self.game_downloader.isRunning() and not self._cancelled:
-                self.msleep(100)
+        return not self._cancelled
 
-            if self._cancelled:
-                self.game_downloader.cancel()
-                self.game_downloader.wait()
-                self._was_cancelled = True
-                return
+    def _stage_download(self) -> bool:
+        """Этап 3: Скачивание игры (в пределах общего лимита загрузок)"""
+        self.progress_updated.emit(50, "Этап 3: Подготовка к загрузке игры...")
+        with install_resources.hold(install_resources.downloads, self._stopped) as acquired:
+            return acquired and self._download_game()
 
+    def _download_game(self) -> bool:
+        self.set_indeterminate.emit(True)
+
+        # Подключаем сигналы game_downloader
+        self.game_downloader.progress_updated.connect(self.progress_updated)
+        self.game_downloader.finished.connect(self.on_download_finished)
+        # Напрямую в потоке этапа: ошибка отмечается до того, как этап вернет результат
+        self.game_downloader.error_occurred.connect(self.on_download_error, Qt.ConnectionType.DirectConnection)
+
+        # Загрузка идет прямо в потоке этапа: без вложенного QThread и опроса isRunning
+        try:
+            self.game_downloader.run()
+        finally:
             # Отключаем сигналы
             self.game_downloader.progress_updated.disconnect(self.progress_updated)
             self.game_downloader.finished.disconnect(self.on_download_finished)
             self.game_downloader.error_occurred.disconnect(self.on_download_error)
-
-            if self._cancelled:
-                self._was_cancelled = True
-                return
-
-            # Шаг 4: Обработка файлов (распаковка если нужно)
             self.set_indeterminate.emit(False)
-            self.progress_updated.emit(75, "Этап 4: Обработка скачанных файлов...")
-            if self._cancelled:
-                self._was_cancelled = True
-                return
 
-            # Подключаем сигналы archive_extractor
-            self.archive_extractor.progress_updated.connect(self.progress_updated)
-            self.archive_extractor.finished.connect(self.on_extraction_finished)
-            self.archive_extractor.error_occurred.connect(self.on_extraction_error)
-            self.archive_extractor.files_extracted.connect(self.on_files_extracted)  # Новый сигнал
+        if self._stopped() or not self.game_downloader.download_complete:
+            return False
 
-            # Запускаем обработку файлов
-            self.archive_extractor.start()
+        # Записываем в манифест файлы торрента
+        for file_path, file_size in self.game_downloader.get_downloaded_files():
+            self.manifest.add(file_path, file_size)
+        self.game_downloader.release()
 
-            # Ждем завершения
-            while self.archive_extractor.isRunning() and not self._cancelled:
-                self.msleep(100)
+        return not self._stopped()
 
-            if self._cancelled:
-                self.archive_extractor.cancel()
-                self.archive_extractor.wait()
-                self._was_cancelled = True
-                return
+    def _stage_extract(self) -> bool:
+        """Этап 4: Обработка файлов (в пределах общего лимита распаковок)"""
+        self.progress_updated.emit(75, "Этап 4: Обработка скачанных файлов...")
+        with install_resources.hold(install_resources.extractions, self._stopped) as acquired:
+            return acquired and self._extract_game()
 
+    def _extract_game(self) -> bool:
+        # Подключаем сигналы archive_extractor
+        self.archive_extractor.progress_updated.connect(self.progress_updated)
+        self.archive_extractor.finished.connect(self.on_extraction_finished)
+        self.archive_extractor.error_occurred.connect(self.on_extraction_error, Qt.ConnectionType.DirectConnection)
+        self.archive_extractor.files_extracted.connect(self.on_files_extracted)  # Новый сигнал
+
+        # Обработка файлов идет прямо в потоке этапа
+        try:
+            self.archive_extractor.run()
+        finally:
             # Отключаем сигналы
             self.archive_extractor.progress_updated.disconnect(self.progress_updated)
             self.archive_extractor.finished.disconnect(self.on_extraction_finished)
             self.archive_extractor.error_occurred.disconnect(self.on_extraction_error)
             self.archive_extractor.files_extracted.disconnect(self.on_files_extracted)
 
-            if self._cancelled:
-                self._was_cancelled = True
-                return
+        if self._stopped() or self.archive_extractor.failed:
+            return False
 
-            # Шаг 5: Конфиги
-            self.progress_updated.emit(85, "Этап 5: Установка конфигов...")
-            if self._cancelled:
-                self._was_cancelled = True
-                return
+        # Список берем у распаковщика напрямую: сигнал files_extracted
+        # доставляется через цикл событий и может прийти позже
+        self.extracted_files = list(self.archive_extractor.extracted_files)
+
+        # Дополняем манифест распакованными файлами
+        for file_path in self.extracted_files:
+            self.manifest.add(file_path)
 
-            self.config_manager.apply_config(
-                self.game_data.get('id'),
-                self.game_data.get('platform'),
-                self.game_data.get('preferred_emulator')
+        # Архив больше не нужен: удаляем, как только распаковка подтверждена
+        if self.archive_extractor.archive_path:
+            reclaimed = self.planner.reclaim_archive(
+                self.archive_extractor.archive_path,
+                self.archive_extractor.entry_sizes
+            )
+            for archive_path in reclaimed:
+                self.manifest.discard(archive_path)
+
+        return not self._stopped()
+
+    def _stage_promote(self) -> bool:
+        """Перенос staging в итоговую папку игры"""
+        if self._stopped():
+            return False
+
+        # Перенос между томами - копирование, одно на устройство
+        with install_resources.device_lock(self.staging.final_path):
+            self.install_dir = self.staging.promote()
+        self.manifest.root = self.install_dir
+        self.extracted_files = [self.staging.translate(f) for f in self.extracted_files]
+        return True
+
+    def _stage_config(self) -> bool:
+        """Этап 5: Конфиги"""
+        self.progress_updated.emit(85, "Этап 5: Установка конфигов...")
+        if self._cancelled:
+            return False
+
+        self.config_manager.apply_config(
+            self.game_data.get('id'),
+            self.game_data.get('platform'),
+            self.game_data.get('preferred_emulator')
+        )
+
+        return not self._cancelled
+
+    def _stage_launcher(self) -> bool:
+        """Этап 6: Создание лаунчера и регистрация игры через LaunchManager"""
+        self.progress_updated.emit(90, "Этап 6: Создание ярлыка для запуска...")
+        if self._cancelled:
+            return False
+
+        # Находим файл игры
+        game_file = self.find_game_file()
+
+        if not (game_file and game_file.is_file()):
+            error_msg = "Не удалось найти файл игры после установки"
+            logger.error(f"❌ {error_msg}")
+            self.progress_updated.emit(90, "❌ Файл игры не найден")
+            self._report_error(error_msg)
+            return False
+
+        # Используем LaunchManager для создания лаунчера
+        try:
+            success = self.launch_manager.create_launcher(
+                self.game_data, game_file,
+                progress_callback=lambda percent, message: self.progress_updated.emit(90, message),
+                is_cancelled=lambda: self._cancelled
             )
 
-            if self._cancelled:
-                self._was_cancelled = True
-                return
+            if not success:
+                # Улучшенная обработка ошибки создания лаунчера
+                error_msg = "Не удалось создать лаунчер для игры"
+                logger.error(f"❌ {error_msg}")
+                self.progress_updated.emit(90, "❌ Не удалось создать ярлык для запуска")
+                self._report_error(error_msg)
+                return False
+
+            # Получаем путь к созданному лаунчеру
+            launcher_path = self.launch_manager.scripts_dir / f"{self.game_data.get('id')}.sh"
+
+            # Получаем путь к обложке с логированием
+            logger.info(f"🔍 Поиск обложки для игры {self.game_data.get('id')}")
+            cover_path = self.launch_manager._get_cover_path(self.game_data)
+            logger.info(f"📁 Путь к обложке: {cover_path}")
+
+            # Сохраняем манифест установки
+            manifest_path = self.manifest.save()
+
+            # Регистрируем игру (эмулятор, тип и путь запуска - из записи LaunchManager)
+            launch_info = self.launch_manager.installed_games.get(self.game_data.get('id'), {})
+            serial = self._game_serial(Path(launch_info.get('install_path') or game_file))
+            for other_id, other_info in self.get_installed_games().items():
+                if serial and other_id != self.game_data.get('id') and other_info.get('serial') == serial:
+                    logger.warning(f"⚠️ Образ {serial} уже установлен как {other_id}")
+            game_info = {
+                'title': self.game_data.get('title'),
+                'platform': self.game_data.get('platform'),
+                'emulator': launch_info.get('emulator'),
+                'game_type': launch_info.get('game_type'),
+                'serial': serial,
+                'disc_set': disc_set_record(self.disc_set, game_file.parent) if self.disc_set else None,
+                'install_path': launch_info.get('install_path') or str(game_file.absolute()),
+                'launcher_path': str(launcher_path.absolute()),
+                'launch_spec_path': str(self.launch_manager.launch_spec_path(self.game_data.get('id')).absolute()),
+                'manifest_path': str(manifest_path),
+                'install_date': time.time(),
+                'cover_path': cover_path  # Добавляем путь к обложке
+            }
 
-            # Шаг 6: Создание лаунчера и регистрация игры через LaunchManager
-            self.progress_updated.emit(90, "Этап 6: Создание ярлыка для запуска...")
-            if self._cancelled:
-                self._was_cancelled = True
-                return
+            logger.info(f"💾 Сохранение информации об игре: {game_info}")
 
-            # Находим файл игры
-            game_file = self.find_game_file()
-
-            if game_file and game_file.is_file():
-                # Используем LaunchManager для создания лаунчера
-                try:
-                    success = self.launch_manager.create_launcher(self.game_data, game_file)
-
-                    if success:
-                        # Получаем путь к созданному лаунчеру
-                        launcher_path = self.launch_manager.scripts_dir / f"{self.game_data.get('id')}.sh"
-
-                        # Получаем путь к обложке с логированием
-                        logger.info(f"🔍 Поиск обложки для игры {self.game_data.get('id')}")
-                        cover_path = self.launch_manager._get_cover_path(self.game_data)
-                        logger.info(f"📁 Путь к обложке: {cover_path}")
-
-                        # Регистрируем игру
-                        installed_games = self.get_installed_games()
-                        game_info = {
-                            'title': self.game_data.get('title'),
-                            'platform': self.game_data.get('platform'),
-                            'install_path': str(game_file.absolute()),
-                            'launcher_path': str(launcher_path.absolute()),
-                            'install_date': time.time(),
-                            'cover_path': cover_path  # Добавляем путь к обложке
-                        }
-
-                        installed_games[self.game_data.get('id')] = game_info
-                        logger.info(f"💾 Сохранение информации об игре: {game_info}")
-
-                        # Сохраняем реестр
-                        with open(self.installed_games_file, 'w', encoding='utf-8') as f:
-                            json.dump(installed_games, f, ensure_ascii=False, indent=2)
-
-                        logger.info(f"✅ Игра успешно зарегистрирована в installed_games.json")
-
-                        self.progress_updated.emit(95, "✅ Лаунчер создан и игра зарегистрирована!")
-                        self.finished.emit(self.game_data)
-                    else:
-                        # Улучшенная обработка ошибки создания лаунчера
-                        error_msg = "Не удалось создать лаунчер для игры"
-                        logger.error(f"❌ {error_msg}")
-                        self.progress_updated.emit(90, "❌ Не удалось создать ярлык для запуска")
-                        self.error_occurred.emit(error_msg)
-                        return
-
-                except Exception as e:
-                    error_msg = f"Ошибка при создании лаунчера: {e}"
-                    logger.error(f"❌ {error_msg}")
-                    self.progress_updated.emit(90, "❌ Ошибка создания ярлыка")
-                    self.error_occurred.emit(error_msg)
-                    return
-            else:
-                error_msg = "Не удалось найти файл игры после установки"
-                logger.error(f"❌ {error_msg}")
-                self.progress_updated.emit(90, "❌ Файл игры не найден")
-                self.error_occurred.emit(error_msg)
-                return
+            # Сохраняем реестр (чтение-изменение-запись под блокировкой)
+            with _registry_lock:
+                installed_games = self.get_installed_games()
+                installed_games[self.game_data.get('id')] = game_info
+                save_installed_games(installed_games, self.installed_games_file)
+
+            logger.info(f"✅ Игра успешно зарегистрирована в installed_games.json")
+
+            self.progress_updated.emit(95, "✅ Лаунчер создан и игра зарегистрирована!")
+            self.finished.emit(self.game_data)
+            return True
 
         except Exception as e:
-            if not self._was_cancelled:
-                self.error_occurred.emit(f"Установка прервана из-за ошибки: {e}")
-        finally:
-            self.set_indeterminate.emit(False)
-            if self._was_cancelled:
-                self.cancelled.emit()
+            error_msg = f"Ошибка при создании лаунчера: {e}"
+            logger.error(f"❌ {error_msg}")
+            self.progress_updated.emit(90, "❌ Ошибка создания ярлыка")
+            self._report_error(error_msg)
+            return False
 
     def on_files_extracted(self, files_list):
         """Сохраняем список распакованных файлов"""
@@ -291,32 +418,36 @@ class InstallThread(QThread):
             logger.error(f"❌ Ошибка при поиске файла игры: {e}")
             return None
 
+    def _manifest_files(self) -> list:
+        """Файлы текущей установки по манифесту"""
+        return [f for f in self.manifest.files() if f.is_file()]
+
     def _find_ps3_game_file(self, game_id: str, game_type: str) -> Optional[Path]:
-        """Находит файлы для PS3 игры с рекурсивным поиском"""
+        """Находит файлы для PS3 игры по манифесту установки"""
         try:
             logger.info(f"🎮 Поиск PS3 игры типа: {game_type}")
 
-            # Рекурсивно ищем все возможные файлы PS3
+            # Перебираем только файлы этой установки
             ps3_files = []
+            manifest_files = self._manifest_files()
 
-            for file_path in self.install_dir.rglob('*'):
-                if file_path.is_file():
-                    filename_lower = file_path.name.lower()
+            for file_path in manifest_files:
+                filename_lower = file_path.name.lower()
 
-                    # Ищем EBOOT.BIN в любой папке
-                    if filename_lower == 'eboot.bin':
-                        logger.info(f"🎮 Найден EBOOT.BIN: {file_path}")
-                        ps3_files.append(file_path)
+                # Ищем EBOOT.BIN в любой папке
+                if filename_lower == 'eboot.bin':
+                    logger.info(f"🎮 Найден EBOOT.BIN: {file_path}")
+                    ps3_files.append(file_path)
 
-                    # Ищем PKG файлы
-                    elif file_path.suffix.lower() == '.pkg':
-                        logger.info(f"📦 Найден PKG: {file_path}")
-                        ps3_files.append(file_path)
+                # Ищем PKG файлы
+                elif file_path.suffix.lower() == '.pkg':
+                    logger.info(f"📦 Найден PKG: {file_path}")
+                    ps3_files.append(file_path)
 
-                    # Ищем ISO файлы
-                    elif file_path.suffix.lower() == '.iso':
-                        logger.info(f"💿 Найден ISO: {file_path}")
-                        ps3_files.append(file_path)
+                # Ищем ISO файлы
+                elif file_path.suffix.lower() == '.iso':
+                    logger.info(f"💿 Найден ISO: {file_path}")
+                    ps3_files.append(file_path)
 
             logger.info(f"📋 Найдено PS3 файлов: {len(ps3_files)}")
 
@@ -334,7 +465,7 @@ class InstallThread(QThread):
                 elif game_type == 'pkg':
                     pkg_files = [f for f in ps3_files if f.suffix.lower() == '.pkg']
                     if pkg_files:
-                        result = max(pkg_files, key=lambda f: f.stat().st_size)
+                        result = max(pkg_files, key=self.manifest.size_of)
                         logger.info(f"✅ Для типа 'pkg' выбран PKG: {result}")
                         return result
 
@@ -342,33 +473,27 @@ class InstallThread(QThread):
                 elif game_type == 'iso':
                     iso_files = [f for f in ps3_files if f.suffix.lower() == '.iso']
                     if iso_files:
-                        result = max(iso_files, key=lambda f: f.stat().st_size)
+                        result = max(iso_files, key=self.manifest.size_of)
                         logger.info(f"✅ Для типа 'iso' выбран ISO: {result}")
                         return result
 
                 # Fallback: берем самый большой файл
-                result = max(ps3_files, key=lambda f: f.stat().st_size)
+                result = max(ps3_files, key=self.manifest.size_of)
                 logger.info(f"⚠️ Тип {game_type}, выбран самый большой файл: {result}")
                 return result
 
             # Если файлов не найдено, проверяем есть ли папки с игрой
             logger.info("🔍 Файлы не найдены, проверяем структуру папок...")
 
-            # Ищем папки с кодами дисков (BLUS, BCES, NPEA и т.д.)
-            for dir_path in self.install_dir.rglob('*'):
-                if dir_path.is_dir():
-                    dir_name = dir_path.name.upper()
-                    if any(code in dir_name for code in ['BLUS', 'BCES', 'NPEA', 'NPUA', 'BLES', 'BCUS']):
-                        logger.info(f"🏷️ Найдена папка с кодом диска: {dir_path}")
-                        # Проверяем есть ли EBOOT внутри
-                        eboot_candidate = dir_path / 'PS3_GAME' / 'USRDIR' / 'EBOOT.BIN'
-                        if eboot_candidate.exists():
-                            logger.info(f"✅ Найден EBOOT в папке с кодом диска: {eboot_candidate}")
-                            return eboot_candidate
-                        else:
-                            # Если EBOOT нет, используем саму папку
-                            logger.info(f"⚠️ EBOOT не найден, использую папку: {dir_path}")
-                            return dir_path
+            # Ищем папки игр по PARAM.SFO в папке установки (один обход)
+            for record in get_ps3_index().scan(self.install_dir):
+                logger.info(f"🏷️ Найдена игра {record['title_id'] or '?'}: {record['root']}")
+                if record['eboot']:
+                    logger.info(f"✅ Найден EBOOT: {record['eboot']}")
+                    return record['eboot']
+                # Если EBOOT нет, используем саму папку
+                logger.info(f"⚠️ EBOOT не найден, использую папку: {record['root']}")
+                return record['root']
 
             logger.error("❌ Не найдено ни одного файла или папки PS3")
             return None
@@ -377,6 +502,21 @@ class InstallThread(QThread):
             logger.error(f"❌ Ошибка поиска PS3 файлов: {e}")
             return None
 
+    def _game_serial(self, game_path: Path) -> Optional[str]:
+        """Серийный номер игры: Title ID для PS3, иначе из метаданных образа"""
+        try:
+            if self.game_data.get('platform') == 'PS3':
+                record = get_ps3_index().resolve(game_path)
+                return record.get('title_id') if record else None
+            if self.disc_set:
+                # Серийный номер набора - номер первого диска
+                game_path = self.disc_set['discs'][0]
+            metadata = read_image_metadata(game_path) if game_path.is_file() else None
+            return metadata.get('serial') if metadata else None
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось определить серийный номер {game_path.name}: {e}")
+            return None
+
     def _find_standard_game_file(self, platform_id: str, game_id: str) -> Optional[Path]:
         """Стандартная логика поиска для других платформ"""
         try:
@@ -384,6 +524,20 @@ class InstallThread(QThread):
             supported_formats = self._get_supported_formats(platform_id)
             logger.info(f"🔍 Форматы для поиска: {supported_formats}")
 
+            # Наборы дисков и CUE/BIN: точка входа - .m3u или .cue, а не трек или первый диск
+            image_files = {f for f in list(self.extracted_files) + self._manifest_files()
+                           if f.is_file() and f.suffix.lower() in supported_formats}
+            disc_set = resolve_disc_set(
+                sorted(image_files),
+                write_playlist=self.game_data.get('preferred_emulator') in PLAYLIST_EMULATORS
+            )
+            if disc_set and (len(disc_set['discs']) > 1 or disc_set['entry'].suffix.lower() == '.cue'):
+                self.disc_set = disc_set
+                if disc_set['m3u']:
+                    self.manifest.add(disc_set['m3u'])
+                logger.info(f"✅ Набор дисков ({len(disc_set['discs'])}), запуск: {disc_set['entry'].name}")
+                return disc_set['entry']
+
             # Сначала проверяем распакованные файлы
             if self.extracted_files:
                 logger.info("🔍 Проверяем распакованные файлы...")
@@ -393,12 +547,32 @@ class InstallThread(QThread):
                         logger.info(f"✅ Найден распакованный файл: {file_path.name}")
                         return file_path
 
-            # Ищем в директории установки
-            logger.info("🔍 Проверяем файлы в директории установки...")
+            # Ищем среди файлов этой установки (манифест)
+            logger.info("🔍 Проверяем файлы установки по манифесту...")
+            candidates = self._manifest_files()
+
+            # Точное совпадение по серийному номеру образа (SYSTEM.CNF / UMD_DATA.BIN / PARAM.SFO)
+            images = {}
+            for file_path in candidates:
+                if file_path.suffix.lower() in supported_formats:
+                    metadata = read_image_metadata(file_path)
+                    if metadata and metadata.get('platform') in (None, platform_id):
+                        images[file_path] = metadata
+            expected_serial = self.game_data.get('serial')
+            if expected_serial:
+                for file_path, metadata in images.items():
+                    if metadata.get('serial') == expected_serial:
+                        logger.info(f"✅ Найден образ по серийному номеру {expected_serial}: {file_path.name}")
+                        return file_path
+            serial_images = [file_path for file_path, metadata in images.items() if metadata.get('serial')]
+            if serial_images:
+                result = max(serial_images, key=self.manifest.size_of)
+                logger.info(f"✅ Выбран образ {platform_id} {images[result]['serial']}: {result.name}")
+                return result
+
             game_files = []
-            for file_path in self.install_dir.iterdir():
-                if (file_path.is_file() and
-                    file_path.suffix.lower() in supported_formats):
+            for file_path in candidates:
+                if file_path.suffix.lower() in supported_formats:
 
                     # Проверяем соответствие имени файла ID игры
                     filename_lower = file_path.name.lower()
@@ -411,16 +585,16 @@ class InstallThread(QThread):
                         logger.info(f"⚠️ Файл не соответствует ID игры: {file_path.name}")
 
             if game_files:
-                result = max(game_files, key=lambda f: f.stat().st_size)
+                result = max(game_files, key=self.manifest.size_of)
                 logger.info(f"✅ Выбран файл игры: {result.name}")
                 return result
 
             # Fallback: любой подходящий файл
-            all_files = [f for f in self.install_dir.iterdir()
-                        if f.is_file() and f.suffix.lower() in supported_formats]
+            all_files = [f for f in candidates
+                        if f.suffix.lower() in supported_formats]
 
             if all_files:
-                result = max(all_files, key=lambda f: f.stat().st_size)
+                result = max(all_files, key=self.manifest.size_of)
                 logger.warning(f"⚠️ Точное соответствие не найдено, использую: {result.name}")
                 return result
 
@@ -472,7 +646,7 @@ class InstallThread(QThread):
         self.progress_updated.emit(70, "✅ Загрузка игры завершена!")
 
     def on_download_error(self, error_msg):
-        self.error_occurred.emit(f"Ошибка загрузки: {error_msg}")
+        self._report_error(f"Ошибка загрузки: {error_msg}")
 
     def on_extraction_finished(self):
         """Обработка завершения обработки файлов"""
@@ -480,7 +654,12 @@ class InstallThread(QThread):
 
     def on_extraction_error(self, error_msg):
         """Обработка ошибки обработки файлов"""
-        self.error_occurred.emit(f"Ошибка обработки файлов: {error_msg}")
+        self._report_error(f"Ошибка обработки файлов: {error_msg}")
+
+    def suspend(self):
+        """Останавливает установку, сохраняя staging (продолжится при следующем запуске)"""
+        self._keep_staging = True
+        self.cancel()
 
     def cancel(self):
         self._cancelled = True
@@ -555,11 +734,20 @@ class InstallDialog(QDialog):
         self.setLayout(layout)
 
     def start_installation(self):
+        # Игра уже ждет или устанавливается в очереди - второй установки не запускаем
+        from .install_queue import get_install_queue, QUEUED, RUNNING
+        queue = get_install_queue()
+        job = queue.get_job(self.game_data.get('id')) if queue else None
+        if job and job['status'] in (QUEUED, RUNNING):
+            self.handle_error("Эта игра уже устанавливается через очередь установки")
+            return
+
         self.thread = InstallThread(self.game_data, self.install_dir, self.project_root)
         self.thread.progress_updated.connect(self.update_progress)
         self.thread.error_occurred.connect(self.handle_error)
         self.thread.finished.connect(self.on_thread_finished)
         self.thread.cancelled.connect(self.on_thread_cancelled)
+        self.thread.completed.connect(self.on_thread_completed)
         self.thread.set_indeterminate.connect(self.set_progress_indeterminate)
         self.thread.start()
 
@@ -586,7 +774,11 @@ class InstallDialog(QDialog):
         self.status_label.setText("Ошибка: " + message)
         self.log_output.append("ОШИБКА: " + message)
         QMessageBox.critical(self, "Ошибка установки", message)
-        self.cancel_button.setEnabled(False)
+        # Пока этапы останавливаются, установку можно отменить;
+        # после завершения потока кнопка станет "Закрыть"
+        if not (self.thread and self.thread.isRunning()):
+            self.cancel_button.setText("Закрыть")
+            self.dialog_is_finished = True
         self.show_log_button.setEnabled(False)
         # Показываем лог при ошибке, чтобы пользователь сразу увидел детали
         self.log_output.show()
@@ -632,6 +824,14 @@ class InstallDialog(QDialog):
         self.dialog_is_finished = True
         self.animation_timer.stop()
 
+    def on_thread_completed(self):
+        """Поток остановлен (в том числе после ошибки): диалог можно закрыть"""
+        if not self.dialog_is_finished:
+            self.cancel_button.setText("Закрыть")
+            self.cancel_button.setEnabled(True)
+            self.dialog_is_finished = True
+            self.animation_timer.stop()
+
     def on_cancel_button_clicked(self):
         # Проверяем, завершена ли установка
         if self.dialog_is_finished:
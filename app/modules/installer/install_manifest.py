@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import os
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Импорт каталога пользовательских данных
+from core import get_users_subpath
+from core import to_users_relative
+from core import resolve_users_path
+
+logger = logging.getLogger('InstallManifest')
+
+
+class InstallManifest:
+    """
+    Манифест установки игры: точный список файлов, записанных при установке,
+    с их размерами. Пути хранятся относительно корня установки.
+    """
+
+    def __init__(self, game_id: str, root: Path):
+        self.game_id = game_id
+        self.root = Path(root)
+        self.entries: Dict[str, int] = {}
+        self.created = time.time()
+
+    @staticmethod
+    def manifests_dir() -> Path:
+        """Папка манифестов рядом с installed_games.json"""
+        return Path(get_users_subpath("manifests"))
+
+    @classmethod
+    def path_for(cls, game_id: str) -> Path:
+        """Возвращает путь к файлу манифеста игры"""
+        return cls.manifests_dir() / f"{game_id}.json"
+
+    def _relative(self, path: Path) -> str:
+        path = Path(path)
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            # Файл вне корня установки храним с абсолютным путем
+            return str(path)
+
+    def add(self, path: Path, size: Optional[int] = None):
+        """Добавляет файл в манифест"""
+        if size is None:
+            try:
+                size = os.stat(path).st_size
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось получить размер {path}: {e}")
+                return
+        self.entries[self._relative(path)] = size
+
+    def add_tree(self, path: Path):
+        """Добавляет файл или все файлы папки (только этой папки, без соседей)"""
+        path = Path(path)
+        if path.is_file():
+            self.add(path)
+            return
+
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                self.add(Path(dirpath) / filename)
+
+    def discard(self, path: Path):
+        """Удаляет файл из манифеста (например, архив после распаковки)"""
+        self.entries.pop(self._relative(path), None)
+
+    def files(self) -> List[Path]:
+        """Абсолютные пути всех файлов манифеста"""
+        return [self.root / rel for rel in self.entries]
+
+    def size_of(self, path: Path) -> int:
+        """Размер файла по манифесту (без обращения к диску)"""
+        return self.entries.get(self._relative(path), 0)
+
+    def total_size(self) -> int:
+        return sum(self.entries.values())
+
+    def verify(self) -> Dict[str, List[Path]]:
+        """Проверяет наличие и размеры файлов манифеста"""
+        result = {'missing': [], 'size_mismatch': []}
+        for rel, size in self.entries.items():
+            file_path = self.root / rel
+            try:
+                if os.stat(file_path).st_size != size:
+                    result['size_mismatch'].append(file_path)
+            except FileNotFoundError:
+                result['missing'].append(file_path)
+        return result
+
+    def remove_files(self) -> int:
+        """Удаляет файлы манифеста и опустевшие папки внутри корня установки"""
+        removed = 0
+        parents = set()
+        for file_path in self.files():
+            try:
+                file_path.unlink()
+                removed += 1
+                parents.add(file_path.parent)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось удалить {file_path}: {e}")
+
+        # Чистим пустые папки снизу вверх, не выходя за корень
+        for directory in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+            while directory != self.root and self.root in directory.parents:
+                try:
+                    directory.rmdir()
+                except OSError:
+                    break
+                directory = directory.parent
+
+        logger.info(f"🗑️ Удалено файлов по манифесту {self.game_id}: {removed}")
+        return removed
+
+    def to_dict(self) -> dict:
+        return {
+            'game_id': self.game_id,
+            # Корень внутри users хранится как ${USERS_ROOT}/... и переживает перенос users
+            'root': to_users_relative(self.root),
+            'created': self.created,
+            'total_size': self.total_size(),
+            'files': self.entries
+        }
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Сохраняет манифест на диск"""
+        path = Path(path) if path else self.path_for(self.game_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"💾 Манифест сохранен: {path} ({len(self.entries)} файлов)")
+        return path
+
+    @classmethod
+    def load(cls, game_id: str, path: Optional[Path] = None) -> Optional['InstallManifest']:
+        """Загружает манифест игры, если он есть"""
+        path = Path(path) if path else cls.path_for(game_id)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            manifest = cls(data.get('game_id', game_id), Path(resolve_users_path(data['root'])))
+            manifest.entries = {rel: int(size) for rel, size in data.get('files', {}).items()}
+            manifest.created = data.get('created', manifest.created)
+            return manifest
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения манифеста {path}: {e}")
+            return None
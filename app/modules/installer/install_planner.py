@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import os
+import re
+import shutil
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger('InstallPlanner')
+
+
+class InstallPlanner:
+    """
+    Планировщик места на диске для установки игры.
+    Оценка уточняется по ходу установки: size_bytes из каталога,
+    затем метаданные торрента, затем распакованный размер архива.
+    """
+
+    # Запас свободного места под конфиги, сохранения и файловую систему
+    RESERVE_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, game_data: dict, target_dir: Path):
+        self.game_data = game_data
+        self.target_dir = Path(target_dir)
+
+    def _existing_dir(self) -> Path:
+        """Ближайшая существующая папка на пути к target_dir (для disk_usage)"""
+        path = self.target_dir
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        return path
+
+    def free_space(self) -> int:
+        """Свободное место на томе, куда идет установка"""
+        try:
+            return shutil.disk_usage(self._existing_dir()).free
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось получить свободное место: {e}")
+            return -1
+
+    def check(self, required: int, stage: str) -> Tuple[bool, str]:
+        """
+        Проверяет, хватает ли места под required байт (плюс запас).
+        Возвращает (успех, сообщение).
+        """
+        free = self.free_space()
+        if free < 0 or required <= 0:
+            return True, ""
+
+        needed = required + self.RESERVE_BYTES
+        logger.info(f"💽 {stage}: нужно {self.format_size(needed)}, свободно {self.format_size(free)}")
+        if free >= needed:
+            return True, ""
+
+        message = (f"Недостаточно места на диске ({stage}): нужно {self.format_size(needed)}, "
+                   f"свободно {self.format_size(free)}")
+        logger.error(f"❌ {message}")
+        return False, message
+
+    def check_catalog_size(self) -> Tuple[bool, str]:
+        """Ранняя проверка по size_bytes из каталога, до начала загрузки"""
+        return self.check(int(self.game_data.get('size_bytes') or 0), "оценка по каталогу")
+
+    def check_download(self, total_wanted: int, total_done: int = 0) -> Tuple[bool, str]:
+        """Проверка по метаданным торрента (уже скачанное в staging не учитываем)"""
+        return self.check(total_wanted - total_done, "загрузка торрента")
+
+    def check_extraction(self, unpacked_size: int) -> Tuple[bool, str]:
+        """Проверка перед распаковкой: архив уже на диске, нужен только распакованный размер"""
+        return self.check(unpacked_size, "распаковка архива")
+
+    @staticmethod
+    def archive_volumes(archive_path: Path) -> list:
+        """Архив и его тома (name.part2.rar, name.r00, name.7z.002 ...)"""
+        archive_path = Path(archive_path)
+        name = archive_path.name
+        volumes = [archive_path]
+
+        match = re.match(r'^(.*)\.part\d+\.rar$', name, re.IGNORECASE)
+        if match:
+            pattern = re.compile(re.escape(match.group(1)) + r'\.part\d+\.rar$', re.IGNORECASE)
+        elif name.lower().endswith('.rar'):
+            pattern = re.compile(re.escape(name[:-4]) + r'\.r\d{2}$', re.IGNORECASE)
+        elif re.search(r'\.\d{3}$', name):
+            pattern = re.compile(re.escape(name[:-4]) + r'\.\d{3}$')
+        else:
+            return volumes
+
+        for sibling in archive_path.parent.iterdir():
+            if sibling != archive_path and pattern.match(sibling.name):
+                volumes.append(sibling)
+        return volumes
+
+    def verify_extracted(self, entry_sizes: Dict[Path, Optional[int]]) -> bool:
+        """Проверяет, что все файлы архива записаны на диск с ожидаемым размером"""
+        if not entry_sizes:
+            return False
+
+        for file_path, size in entry_sizes.items():
+            try:
+                actual = os.stat(file_path).st_size
+            except OSError:
+                logger.warning(f"⚠️ Распакованный файл отсутствует: {file_path}")
+                return False
+            if size is not None and actual != size:
+                logger.warning(f"⚠️ Размер не совпадает: {file_path} ({actual} != {size})")
+                return False
+        return True
+
+    def reclaim_archive(self, archive_path: Path, entry_sizes: Dict[Path, Optional[int]]) -> list:
+        """
+        Удаляет архив (со всеми томами) после проверенной распаковки.
+        Возвращает список удаленных файлов.
+        """
+        try:
+            from settings import app_settings
+            if app_settings.get_keep_archives():
+                logger.info("📦 Архивы сохраняются по настройке, удаление пропущено")
+                return []
+        except Exception:
+            pass
+
+        if not self.verify_extracted(entry_sizes):
+            logger.warning(f"⚠️ Распаковка не подтверждена, архив оставлен: {archive_path}")
+            return []
+
+        removed = []
+        freed = 0
+        for volume in self.archive_volumes(archive_path):
+            try:
+                size = volume.stat().st_size
+                volume.unlink()
+                removed.append(volume)
+                freed += size
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось удалить архив {volume}: {e}")
+
+        if removed:
+            logger.info(f"🗑️ Архив удален после распаковки, освобождено {self.format_size(freed)}")
+        return removed
+
+    @staticmethod
+    def format_size(bytes_size) -> str:
+        """Форматирует размер в читаемый вид"""
+        for unit in ['Б', 'КБ', 'МБ', 'ГБ']:
+            if bytes_size < 1024.0:
+                return f"{bytes_size:.1f}{unit}"
+            bytes_size /= 1024.0
+        return f"{bytes_size:.1f}ТБ"
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QProgressBar, QPushButton, QScrollArea, QWidget, QFrame)
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
+
+from .install import InstallThread
+from .staging import StagingArea
+
+# Импорт каталога установки
+from core import get_users_path, get_users_subpath
+
+logger = logging.getLogger('InstallQueue')
+
+# Статусы заданий очереди
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class InstallQueue(QObject):
+    """
+    Очередь установки игр. Задания сохраняются в users/install_queue.json
+    и переживают перезапуск приложения; одновременно выполняется несколько
+    установок, а их тяжелые этапы ограничивает install_resources.
+    """
+
+    job_updated = pyqtSignal(str)               # game_id
+    job_progress = pyqtSignal(str, int, str)    # game_id, процент, сообщение
+    job_finished = pyqtSignal(dict, bool)       # game_data, успех
+
+    MAX_ACTIVE = 4
+
+    def __init__(self, project_root: Path, parent=None):
+        super().__init__(parent)
+        self.project_root = Path(project_root)
+        self.queue_file = Path(get_users_path()) / 'install_queue.json'
+        self.jobs: List[dict] = []
+        self.threads: Dict[str, InstallThread] = {}
+        self._load()
+
+    def _load(self):
+        """Загружает очередь; прерванные установки снова ставятся в очередь"""
+        if not self.queue_file.exists():
+            return
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                self.jobs = json.load(f).get('jobs', [])
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения очереди установки: {e}")
+            self.jobs = []
+            return
+
+        for job in self.jobs:
+            if job.get('status') == RUNNING:
+                job['status'] = QUEUED
+                job['message'] = "Продолжение после перезапуска"
+        logger.info(f"📋 Очередь установки: {len(self.jobs)} заданий")
+
+    def _save(self):
+        """Атомарно сохраняет очередь"""
+        try:
+            self.queue_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.queue_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'jobs': self.jobs}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.queue_file)
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения очереди установки: {e}")
+
+    def get_job(self, game_id: str) -> Optional[dict]:
+        for job in self.jobs:
+            if job['game_id'] == game_id:
+                return job
+        return None
+
+    def enqueue(self, game_data: dict) -> bool:
+        """Добавляет игру в очередь. False, если она уже ждет или устанавливается"""
+        game_id = game_data.get('id')
+        job = self.get_job(game_id)
+        if job and job['status'] in (QUEUED, RUNNING):
+            logger.info(f"ℹ️ Игра уже в очереди: {game_id}")
+            return False
+        if game_id in self.threads:
+            # Поток прошлого задания еще останавливается
+            logger.info(f"ℹ️ Установка игры еще завершается: {game_id}")
+            return False
+
+        if job:
+            self.jobs.remove(job)
+
+        self.jobs.append({
+            'game_id': game_id,
+            'game_data': game_data,
+            'status': QUEUED,
+            'progress': 0,
+            'message': "В очереди",
+            'added': time.time()
+        })
+        logger.info(f"➕ В очередь установки добавлена игра: {game_data.get('title')}")
+        self._save()
+        self.job_updated.emit(game_id)
+        self._start_next()
+        return True
+
+    def start(self):
+        """Запускает задания, оставшиеся с прошлого запуска"""
+        self._start_next()
+
+    def _start_next(self):
+        for job in self.jobs:
+            if len(self.threads) >= self.MAX_ACTIVE:
+                break
+            if job['status'] == QUEUED:
+                self._start_job(job)
+
+    def _start_job(self, job: dict):
+        game_id = job['game_id']
+        game_data = job['game_data']
+        install_dir = Path(get_users_subpath("games")) / game_data.get('platform')
+        install_dir.mkdir(parents=True, exist_ok=True)
+
+        thread = InstallThread(game_data, install_dir, self.project_root)
+        thread.progress_updated.connect(lambda p, m, gid=game_id: self._on_progress(gid, p, m))
+        thread.error_occurred.connect(lambda m, gid=game_id: self._on_error(gid, m))
+        thread.finished.connect(lambda data, gid=game_id: self._on_success(gid))
+        thread.completed.connect(lambda gid=game_id: self._on_completed(gid))
+
+        job['status'] = RUNNING
+        job['message'] = "Подготовка к установке..."
+        job.pop('error', None)
+        self.threads[game_id] = thread
+        self._save()
+        self.job_updated.emit(game_id)
+
+        logger.info(f"▶️ Запуск установки из очереди: {game_data.get('title')}")
+        thread.start()
+
+    def _on_progress(self, game_id: str, percentage: int, message: str):
+        job = self.get_job(game_id)
+        if job:
+            job['progress'] = percentage
+            job['message'] = message
+            self.job_progress.emit(game_id, percentage, message)
+
+    def _on_error(self, game_id: str, message: str):
+        job = self.get_job(game_id)
+        if job and 'error' not in job:
+            job['error'] = message
+            logger.error(f"❌ Ошибка установки {game_id}: {message}")
+
+    def _on_success(self, game_id: str):
+        job = self.get_job(game_id)
+        if job:
+            job['status'] = DONE
+
+    def _on_completed(self, game_id: str):
+        """Поток установки завершился: фиксируем итог и запускаем следующее задание"""
+        thread = self.threads.pop(game_id, None)
+        job = self.get_job(game_id)
+        if job:
+            if job['status'] == DONE:
+                job['progress'] = 100
+                job['message'] = "Установка завершена ✅"
+            elif thread and thread._keep_staging:
+                job['status'] = QUEUED
+                job['message'] = "Приостановлено"
+            elif thread and thread._was_cancelled:
+                job['status'] = CANCELLED
+                job['message'] = "Установка отменена ❌"
+            else:
+                job['status'] = FAILED
+                job['message'] = job.get('error', "Ошибка установки")
+
+            self._save()
+            self.job_updated.emit(game_id)
+            if job['status'] in (DONE, FAILED, CANCELLED):
+                self.job_finished.emit(job['game_data'], job['status'] == DONE)
+
+        if thread:
+            thread.deleteLater()
+        self._start_next()
+
+    def cancel(self, game_id: str):
+        """Отменяет установку: ожидающую - сразу, идущую - через поток"""
+        job = self.get_job(game_id)
+        if not job:
+            return
+
+        thread = self.threads.get(game_id)
+        if thread:
+            job['message'] = "Отмена установки..."
+            thread.cancel()
+        elif job['status'] == QUEUED:
+            # У приостановленной установки остался staging с частичной загрузкой
+            platform_dir = Path(get_users_subpath("games")) / job['game_data'].get('platform')
+            StagingArea(platform_dir, game_id).discard()
+            job['status'] = CANCELLED
+            job['message'] = "Установка отменена ❌"
+            self._save()
+        self.job_updated.emit(game_id)
+
+    def retry(self, game_id: str):
+        """Повторяет неудачную или отмененную установку"""
+        job = self.get_job(game_id)
+        if job and job['status'] in (FAILED, CANCELLED):
+            self.enqueue(job['game_data'])
+
+    def remove(self, game_id: str):
+        """Убирает завершенное задание из списка"""
+        job = self.get_job(game_id)
+        if job and job['status'] not in (QUEUED, RUNNING):
+            self.jobs.remove(job)
+            self._save()
+            self.job_updated.emit(game_id)
+
+    def shutdown(self):
+        """
+        Приостанавливает идущие установки при выходе; они продолжатся при запуске.
+        Выход ждет остановки каждого потока: поток, переживший приложение,
+        продолжил бы писать в staging и реестр установленных игр.
+        """
+        for game_id, thread in list(self.threads.items()):
+            logger.info(f"⏸️ Приостановка установки: {game_id}")
+            thread.suspend()
+        for game_id, thread in list(self.threads.items()):
+            thread.wait()
+            logger.info(f"⏹️ Установка остановлена: {game_id}")
+        for job in self.jobs:
+            if job['status'] == RUNNING:
+                job['status'] = QUEUED
+        self._save()
+
+
+_install_queue = None
+
+
+def get_install_queue(project_root: Path = None) -> Optional[InstallQueue]:
+    """Возвращает глобальную очередь установки"""
+    global _install_queue
+    if _install_queue is None and project_root:
+        _install_queue = InstallQueue(project_root)
+    return _install_queue
+
+
+class InstallJobRow(QFrame):
+    """Строка задания в окне очереди"""
+
+    def __init__(self, queue: InstallQueue, game_id: str, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.game_id = game_id
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        header = QHBoxLayout()
+        self.title_label = QLabel(self)
+        header.addWidget(self.title_label, 1)
+
+        self.action_button = QPushButton(self)
+        self.action_button.clicked.connect(self.on_action_clicked)
+        header.addWidget(self.action_button)
+        layout.addLayout(header)
+
+        self.progress_bar = QProgressBar(self)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel(self)
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        self.refresh()
+
+    def refresh(self):
+        job = self.queue.get_job(self.game_id)
+        if not job:
+            return
+        self.title_label.setText(f"<b>{job['game_data'].get('title', self.game_id)}</b>")
+        self.progress_bar.setValue(job.get('progress', 0))
+        self.status_label.setText(job.get('message', ''))
+
+        status = job['status']
+        if status in (QUEUED, RUNNING):
+            self.action_button.setText("Отмена")
+        elif status in (FAILED, CANCELLED):
+            self.action_button.setText("Повторить")
+        else:
+            self.action_button.setText("Убрать")
+
+    def set_progress(self, percentage: int, message: str):
+        self.progress_bar.setValue(percentage)
+        self.status_label.setText(message)
+
+    def on_action_clicked(self):
+        job = self.queue.get_job(self.game_id)
+        if not job:
+            return
+        if job['status'] in (QUEUED, RUNNING):
+            self.queue.cancel(self.game_id)
+        elif job['status'] in (FAILED, CANCELLED):
+            self.queue.retry(self.game_id)
+        else:
+            self.queue.remove(self.game_id)
+
+
+class InstallQueueDialog(QDialog):
+    """
+    Немодальное окно очереди установки: прогресс каждой игры
+    из сигналов progress_updated ее потока установки.
+    """
+
+    def __init__(self, queue: InstallQueue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.rows: Dict[str, InstallJobRow] = {}
+
+        self.setWindowTitle("Очередь установки")
+        self.setModal(False)
+        self.resize(650, 420)
+
+        layout = QVBoxLayout(self)
+
+        scroll = QScrollArea(self)
+        scroll.setWidgetResizable(True)
+        self.rows_widget = QWidget()
+        self.rows_layout = QVBoxLayout(self.rows_widget)
+        self.rows_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        scroll.setWidget(self.rows_widget)
+        layout.addWidget(scroll)
+
+        close_button = QPushButton("Скрыть", self)
+        close_button.clicked.connect(self.hide)
+        layout.addWidget(close_button)
+
+        self.queue.job_updated.connect(self.on_job_updated)
+        self.queue.job_progress.connect(self.on_job_progress)
+
+        for job in self.queue.jobs:
+            self._add_row(job['game_id'])
+
+    def _add_row(self, game_id: str):
+        row = InstallJobRow(self.queue, game_id, self.rows_widget)
+        self.rows[game_id] = row
+        self.rows_layout.addWidget(row)
+
+    def on_job_updated(self, game_id: str):
+        row = self.rows.get(game_id)
+        if not self.queue.get_job(game_id):
+            if row:
+                self.rows_layout.removeWidget(row)
+                row.deleteLater()
+                del self.rows[game_id]
+            return
+
+        if not row:
+            self._add_row(game_id)
+        else:
+            row.refresh()
+
+    def on_job_progress(self, game_id: str, percentage: int, message: str):
+        row = self.rows.get(game_id)
+        if row:
+            row.set_progress(percentage, message)
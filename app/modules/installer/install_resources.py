@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger('InstallResources')
+
+
+class InstallResources:
+    """
+    Общие лимиты ресурсов для всех одновременно идущих установок:
+    число загрузок, число распаковок (по ядрам), одно тяжелое
+    копирование на физическое устройство и одна установка каждого
+    эмулятора и BIOS каждой платформы.
+    """
+
+    def __init__(self, downloads: int = 2, extractions: int = 0):
+        if not extractions:
+            extractions = max(1, (os.cpu_count() or 2) // 2)
+        self.downloads = threading.BoundedSemaphore(downloads)
+        self.extractions = threading.BoundedSemaphore(extractions)
+        self._device_locks = {}
+        self._keyed_locks = {}
+        self._lock = threading.Lock()
+        logger.info(f"⚙️ Лимиты установки: загрузок {downloads}, распаковок {extractions}")
+
+    def device_lock(self, path: Path) -> threading.Lock:
+        """Блокировка тяжелого копирования для устройства, на котором лежит path"""
+        path = Path(path)
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        device = os.stat(path).st_dev
+
+        with self._lock:
+            if device not in self._device_locks:
+                self._device_locks[device] = threading.Lock()
+            return self._device_locks[device]
+
+    def emulator_lock(self, emulator_id: str) -> threading.Lock:
+        """Блокировка установки эмулятора: его AppImage и загрузка в хранилище общие"""
+        return self._keyed_lock('emulator', str(emulator_id).lower())
+
+    def bios_lock(self, platform: str) -> threading.Lock:
+        """Блокировка установки BIOS платформы: папка users/bios/<платформа> общая"""
+        return self._keyed_lock('bios', platform)
+
+    def _keyed_lock(self, kind: str, key: str) -> threading.Lock:
+        with self._lock:
+            if (kind, key) not in self._keyed_locks:
+                self._keyed_locks[(kind, key)] = threading.Lock()
+            return self._keyed_locks[(kind, key)]
+
+    @contextmanager
+    def hold(self, semaphore, is_cancelled: Callable[[], bool]):
+        """
+        Занимает слот ресурса, пока не отменена установка.
+        Отдает True, если слот получен, и False при отмене во время ожидания.
+        """
+        acquired = False
+        while not is_cancelled():
+            if semaphore.acquire(timeout=0.5):
+                acquired = True
+                break
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                semaphore.release()
+
+
+def _create_resources() -> InstallResources:
+    try:
+        from settings import app_settings
+        return InstallResources(downloads=app_settings.get_max_parallel_downloads())
+    except Exception:
+        return InstallResources()
+
+
+# Общий экземпляр для всех установок (очередь и одиночный диалог)
+install_resources = _create_resources()
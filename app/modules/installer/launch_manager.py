@@ -1,7 +1,7 @@
 import os
 import json
+import hashlib
 import logging
-import shutil
 import time
 import subprocess
 from pathlib import Path
@@ -10,15 +10,39 @@ from typing import Optional, Dict, Any, List
 # Импорт каталога игровых данных
 from core import get_users_path
 from core import get_users_subpath
+from core import to_users_relative, users_root_env, load_installed_games, save_installed_games
+
+from .emulator_inventory import get_emulator_inventory
+from .config_manager import ConfigManager
+from .launch_spec import LaunchSpec
+from .pkg_installer import PkgInstaller
+from .ps3_index import get_ps3_index
 
 logger = logging.getLogger('LaunchManager')
 
+# Версия формата скриптов: при изменении генератора все лаунчеры пересобираются
+LAUNCHER_FORMAT = 2
+
+# Начало каждого скрипта: корень users передает ArcadeDeck, а при ручном
+# запуске он вычисляется по расположению скрипта (users/launchers/<id>.sh)
+LAUNCHER_HEADER = '''#!/bin/bash
+USERS_ROOT="${USERS_ROOT:-$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)}"
+cd "{project_root}"
+'''
+
 
 class LaunchManager:
     def __init__(self, project_root: Path):
         self.project_root = project_root
         self.launch_profiles = self._load_launch_profiles()
 
+        # Индекс AppImage: имена файлов из профилей запуска
+        self.emulator_inventory = get_emulator_inventory(project_root)
+        for profile_key, profile_data in self.launch_profiles.items():
+            if profile_data.get('appimage_filename'):
+                self.emulator_inventory.declare_appimage(profile_data.get('name', profile_key),
+                                                         profile_data['appimage_filename'])
+
         # Используем путь из настроек для лаунчеров
         users_path = Path(get_users_path())
         self.scripts_dir = users_path / 'launchers'
@@ -35,13 +59,10 @@ class LaunchManager:
 
     def get_installed_games(self):
         """Возвращает словарь установленных игр"""
-        if self.installed_games_file.exists():
-            try:
-                with open(self.installed_games_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        try:
+            return load_installed_games(self.installed_games_file)
+        except:
+            return {}
 
     def _load_launch_profiles(self) -> Dict[str, Any]:
         """Загружает реестр профилей запуска эмуляторов"""
@@ -56,10 +77,7 @@ class LaunchManager:
     def _load_installed_games(self) -> Dict[str, Any]:
         """Загружает информацию об установленных играх"""
         try:
-            if self.installed_games_file.exists():
-                with open(self.installed_games_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
+            return load_installed_games(self.installed_games_file)
         except Exception as e:
             logger.error(f"Ошибка загрузки installed_games: {e}")
             return {}
@@ -67,12 +85,155 @@ class LaunchManager:
     def _save_installed_games(self):
         """Сохраняет информацию об установленных играх"""
         try:
-            self.installed_games_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.installed_games_file, 'w', encoding='utf-8') as f:
-                json.dump(self.installed_games, f, ensure_ascii=False, indent=2)
+            save_installed_games(self.installed_games, self.installed_games_file)
         except Exception as e:
             logger.error(f"Ошибка сохранения installed_games: {e}")
 
+    def launch_spec_path(self, game_id: str) -> Path:
+        """Путь к спецификации запуска игры (argv/env без bash скрипта)"""
+        return self.scripts_dir / f"{game_id}.json"
+
+    def _save_launch_spec(self, game_id: str, launch_command: str, env: Dict[str, str],
+                          post_actions: List[str], flatpak_id: str = None) -> Optional[Path]:
+        """Компилирует команду запуска в LaunchSpec и сохраняет ее рядом со скриптом"""
+        try:
+            spec = LaunchSpec.from_command(launch_command, env=env, cwd=str(self.project_root),
+                                           post_actions=post_actions)
+            if flatpak_id:
+                spec.wrap_flatpak(flatpak_id)
+            spec_path = self.launch_spec_path(game_id)
+            spec.save(spec_path)
+            logger.info(f"✅ Сохранена спецификация запуска: {spec_path}")
+            return spec_path
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось собрать спецификацию запуска, будет использован скрипт: {e}")
+            return None
+
+    # === ПЕРЕГЕНЕРАЦИЯ ЛАУНЧЕРОВ ===
+
+    @property
+    def launcher_inputs_file(self) -> Path:
+        """Отпечатки входных данных, из которых собраны лаунчеры"""
+        return self.scripts_dir / '.inputs.json'
+
+    def _load_launcher_inputs(self) -> Dict[str, str]:
+        try:
+            with open(self.launcher_inputs_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_launcher_inputs(self, inputs: Dict[str, str]):
+        tmp_path = self.launcher_inputs_file.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(inputs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.launcher_inputs_file)
+
+    def _launcher_inputs_digest(self, game_info: Dict[str, Any]) -> str:
+        """
+        Отпечаток всего, от чего зависит лаунчер: формат скрипта, профиль
+        эмулятора, путь к эмулятору и путь к игре относительно ${USERS_ROOT}.
+        Перенос users отпечаток не меняет.
+        """
+        emulator_name = game_info.get('emulator') or ''
+        profile = self._find_launch_profile_by_name(emulator_name) if emulator_name else None
+        emulator_path = ''
+        if profile and profile.get('installation_type', 'flatpak') == 'appimage':
+            record = self.emulator_inventory.find_appimage(emulator_name)
+            emulator_path = str(record['path']) if record else ''
+        inputs = {
+            'format': LAUNCHER_FORMAT,
+            'project_root': str(self.project_root),
+            'platform': game_info.get('platform'),
+            'emulator': emulator_name,
+            'game_type': game_info.get('game_type'),
+            'install_path': to_users_relative(game_info.get('install_path', '')),
+            'profile': profile,
+            'emulator_path': emulator_path
+        }
+        return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _record_launcher_inputs(self, game_id: str):
+        try:
+            inputs = self._load_launcher_inputs()
+            inputs[game_id] = self._launcher_inputs_digest(self.installed_games[game_id])
+            self._save_launcher_inputs(inputs)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить отпечаток лаунчера {game_id}: {e}")
+
+    def _rebuild_launcher(self, game_id: str, game_info: Dict[str, Any]) -> bool:
+        """Пересобирает лаунчер и спецификацию запуска по записи installed_games"""
+        emulator_name = game_info.get('emulator')
+        if not emulator_name:
+            # Записи старого формата: эмулятор берется из реестра игр
+            try:
+                from app.modules.module_logic.game_data_manager import get_game_data_manager
+                manager = get_game_data_manager()
+                registry_game = manager.get_game_by_id(game_id) if manager else None
+                emulator_name = (registry_game or {}).get('preferred_emulator')
+            except Exception:
+                emulator_name = None
+        if not emulator_name:
+            logger.warning(f"⚠️ Эмулятор для {game_id} неизвестен, лаунчер не пересобран")
+            return False
+
+        game_data = {
+            'id': game_id,
+            'title': game_info.get('title'),
+            'platform': game_info.get('platform'),
+            'preferred_emulator': emulator_name,
+            'game_type': game_info.get('game_type', 'default')
+        }
+        game_path = Path(game_info['install_path'])
+        if game_data['platform'] == 'PS3' and emulator_name == 'rpcs3':
+            game_type = game_info.get('game_type') or self._detect_ps3_game_type(game_path)
+            success = self._create_simple_ps3_launcher(game_data, game_path, game_type)
+        else:
+            success = self._create_standard_launcher(game_data, game_path, game_data['platform'],
+                                                     game_id, emulator_name)
+
+        if success:
+            # Генератор перезаписывает запись - сохраняем поля установки (манифест, обложка, дата)
+            self.installed_games[game_id] = {**game_info, **self.installed_games[game_id],
+                                             'install_date': game_info.get('install_date', time.time())}
+            self._save_installed_games()
+            self._record_launcher_inputs(game_id)
+        return success
+
+    def regenerate_launchers(self, force: bool = False):
+        """
+        Пересобирает лаунчеры, у которых изменились входные данные (или все
+        при force). Возвращает (пересобрано, без изменений, ошибок).
+        """
+        inputs = self._load_launcher_inputs()
+        rebuilt = unchanged = failed = 0
+
+        for game_id, game_info in list(self.installed_games.items()):
+            if not isinstance(game_info, dict) or not game_info.get('install_path'):
+                continue
+            launcher_path = self.scripts_dir / f"{game_id}.sh"
+            if (not force and launcher_path.exists()
+                    and inputs.get(game_id) == self._launcher_inputs_digest(game_info)):
+                unchanged += 1
+                continue
+
+            logger.info(f"🔄 Пересборка лаунчера: {game_id}")
+            if self._rebuild_launcher(game_id, dict(game_info)):
+                rebuilt += 1
+            else:
+                failed += 1
+
+        # Отпечатки удаленных игр больше не нужны
+        inputs = self._load_launcher_inputs()
+        stale = [game_id for game_id in inputs if game_id not in self.installed_games]
+        if stale:
+            for game_id in stale:
+                del inputs[game_id]
+            self._save_launcher_inputs(inputs)
+
+        logger.info(f"✅ Лаунчеры: пересобрано {rebuilt}, без изменений {unchanged}, ошибок {failed}")
+        return rebuilt, unchanged, failed
+
     def _find_launch_profile_by_name(self, emulator_name: str) -> Optional[Dict[str, Any]]:
         """Ищет профиль запуска по имени эмулятора"""
         # Сначала ищем прямое совпадение
@@ -112,25 +273,13 @@ class LaunchManager:
         return None
 
     def _find_appimage(self, emulator_name: str) -> str:
-        """Ищет файл AppImage для эмулятора"""
-        appimages_dir = self.project_root / 'app' / 'emulators' / 'appimages'
-
-        if not appimages_dir.exists():
-            logger.error(f"❌ Директория AppImage не существует: {appimages_dir}")
-            return ""
+        """Ищет файл AppImage для эмулятора по индексу (точное совпадение ID)"""
+        record = self.emulator_inventory.find_appimage(emulator_name)
+        if record:
+            logger.info(f"✅ Найден AppImage: {record['path']} (версия: {record['version'] or 'неизвестна'})")
+            return str(record['path'])
 
-        # Ищем файлы AppImage в директории
-        for file_path in appimages_dir.iterdir():
-            if file_path.is_file() and file_path.suffix == '.AppImage':
-                # Проверяем, содержит ли имя файла название эмулятора
-                filename_lower = file_path.name.lower()
-                emulator_name_lower = emulator_name.lower()
-
-                if emulator_name_lower in filename_lower:
-                    logger.info(f"✅ Найден AppImage: {file_path}")
-                    return str(file_path)
-
-        logger.error(f"❌ AppImage не найден для эмулятора '{emulator_name}' в {appimages_dir}")
+        logger.error(f"❌ AppImage не найден для эмулятора '{emulator_name}' в {self.emulator_inventory.appimage_dir}")
         return ""
 
     def _get_cover_path(self, game_data: dict) -> str:
@@ -197,147 +346,31 @@ class LaunchManager:
             self._save_installed_games()
 
     def _detect_ps3_game_type(self, game_path: Path) -> str:
-        """Автоматически определяет тип PS3 игры по файлу"""
-        if game_path.suffix.lower() == '.pkg':
-            return 'pkg'
-        elif game_path.suffix.lower() == '.iso':
-            return 'iso'
-        elif game_path.is_dir():
-            # Проверяем, является ли папка корнем игры (наличие PS3_GAME, USRDIR, EBOOT.BIN)
-            # или это папка с кодом диска.
-            if (game_path / 'PS3_GAME').exists() or (game_path / 'USRDIR' / 'EBOOT.BIN').exists() or (game_path / 'EBOOT.BIN').exists():
-                return 'folder'
-            # Если папка - это просто код диска, то считаем ее EBOOT-запуском
-            elif (game_path / 'EBOOT.BIN').exists() or (game_path.name.startswith(('NPEA', 'NPUA', 'BLES', 'BLUS', 'NPUB', 'BCES', 'BCUS'))):
-                return 'eboot'
-            else:
-                return 'folder' # По умолчанию для папки, не PKG/ISO
-        else:
-            return 'unknown'
-
-    def _install_pkg(self, pkg_path: Path, platform: str) -> bool:
+        """Определяет тип PS3 игры по индексу PARAM.SFO (pkg, iso, folder, eboot)"""
+        record = get_ps3_index().resolve(game_path)
+        if record:
+            return record['game_type']
+        return 'folder' if game_path.is_dir() else 'unknown'
+
+    def _install_pkg(self, pkg_path: Path, platform: str,
+                     progress_callback=None, is_cancelled=None) -> Optional[Path]:
         """
-        Устанавливает PKG файл - ДОЖИДАЕМСЯ ЗАВЕРШЕНИЯ УСТАНОВКИ
+        Устанавливает PKG через RPCS3 (без интерфейса, если сборка умеет).
+        Возвращает папку игры в dev_hdd0/game по Title ID из заголовка PKG.
         """
-        try:
-            print(f"🔍 ДИАГНОСТИКА: Начало установки PKG")
-
-            emulator_path = self._find_appimage('rpcs3')
-            if not emulator_path:
-                logger.error("❌ RPCS3 не найден")
-                return False
-
-            print(f"🔍 ДИАГНОСТИКА: Emulator path: {emulator_path}")
-            print(f"🔍 ДИАГНОСТИКА: PKG path: {pkg_path}")
-
-            # Проверяем существование файлов
-            emulator_exists = Path(emulator_path).exists()
-            pkg_exists = pkg_path.exists()
-            print(f"🔍 ДИАГНОСТИКА: Emulator exists: {emulator_exists}")
-            print(f"🔍 ДИАГНОСТИКА: PKG exists: {pkg_exists}")
-
-            if not emulator_exists or not pkg_exists:
-                logger.error("❌ Файлы не найдены")
-                return False
-
-            configs_dir = Path(get_users_subpath("configs"))
-            print(f"🔍 ДИАГНОСТИКА: Config dir: {configs_dir / platform}")
-
-            # Команда установки
-            install_command = [
-                emulator_path,
-                '--installpkg',
-                str(pkg_path)
-            ]
-
-            print(f"🔍 ДИАГНОСТИКА: Command: {install_command}")
-
-            # Подготавливаем окружение
-            env = os.environ.copy()
-            env['XDG_CONFIG_HOME'] = str(configs_dir / platform)
-            env['SDL_VIDEO_MINIMIZE_ON_FOCUS_LOSS'] = '0'
-
-            print(f"🔍 ДИАГНОСТИКА: Environment: XDG_CONFIG_HOME={env['XDG_CONFIG_HOME']}")
-
-            logger.info(f"📦 Установка PKG: {pkg_path.name}")
-            logger.info(f"🚀 Команда установки: {' '.join(install_command)}")
-
-            # Запускаем процесс БЕЗ ожидания вывода (для GUI)
-            print(f"🔍 ДИАГНОСТИКА: Запуск subprocess...")
-
-            process = subprocess.Popen(
-                install_command,
-                env=env
-                # НЕ используем stdout/stderr PIPE - это может блокировать GUI приложение
-            )
-
-            print(f"🔍 ДИАГНОСТИКА: Process PID: {process.pid}")
-            logger.info(f"🔄 Процесс установки запущен (PID: {process.pid}). Ожидаем завершения...")
-
-            # Ждем завершения БЕЗ таймаута - пользователь сам закроет окно
-            print(f"🔍 ДИАГНОСТИКА: Ожидаем завершения установки...")
-            return_code = process.wait()  # Ждем пока пользователь закроет RPCS3
-
-            print(f"🔍 ДИАГНОСТИКА: Return code: {return_code}")
-
-            if return_code == 0:
-                logger.info("✅ PKG установлен успешно! Пользователь закрыл эмулятор.")
-                # Даем время для завершения фоновых процессов
-                time.sleep(5)
-                return True
-            else:
-                logger.warning(f"⚠️ RPCS3 завершился с кодом: {return_code}. Возможно пользователь прервал установку.")
-                return False
-
-        except Exception as e:
-            print(f"🔍 ДИАГНОСТИКА: Исключение: {e}")
-            import traceback
-            traceback.print_exc()
-            logger.error(f"❌ Ошибка установки PKG: {e}")
-            return False
+        emulator_path = self._find_appimage('rpcs3')
+        if not emulator_path:
+            logger.error("❌ RPCS3 не найден")
+            return None
+        if not pkg_path.exists():
+            logger.error(f"❌ PKG файл не найден: {pkg_path}")
+            return None
 
-    def _find_ps3_game_code_dir(self) -> Optional[Path]:
-        """
-        Ищет самую новую папку с кодом диска (например, BLUS30001) в dev_hdd0/game
-        после установки PKG.
-        """
         try:
-            configs_dir = Path(get_users_subpath("configs"))
-            # ПРАВИЛЬНЫЙ путь: добавляем папку rpcs3
-            games_base_dir = configs_dir / "PS3" / "rpcs3" / "dev_hdd0" / "game"
-
-            logger.info(f"🔍 Поиск папки с кодом диска в: {games_base_dir}")
-
-            if not games_base_dir.exists():
-                logger.warning(f"❌ Директория игр RPCS3 не найдена: {games_base_dir}")
-                # Выведем все содержимое родительской папки для диагностики
-                parent_dir = games_base_dir.parent
-                if parent_dir.exists():
-                    contents = [item.name for item in parent_dir.iterdir()]
-                    logger.info(f"📁 Содержимое {parent_dir}: {contents}")
-                return None
-
-            # Ищем папки, отсортированные по времени изменения (самая новая - только что установленная)
-            game_dirs = [d for d in games_base_dir.iterdir() if d.is_dir() and d.name.startswith(('NPEA', 'NPUA', 'BLES', 'BLUS', 'NPUB', 'BCES', 'BCUS'))]
-
-            if not game_dirs:
-                logger.warning("❌ Папки игр с кодами дисков не найдены")
-                # Выведем все папки для диагностики
-                all_dirs = [d.name for d in games_base_dir.iterdir() if d.is_dir()]
-                logger.info(f"📁 Все папки в {games_base_dir}: {all_dirs}")
-                return None
-
-            # Сортируем по времени последнего изменения (mtime)
-            game_dirs.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-
-            # Берем самую новую папку
-            latest_game_dir = game_dirs[0]
-            logger.info(f"✅ Найден код диска: {latest_game_dir.name}")
-
-            return latest_game_dir
-
+            installer = PkgInstaller(emulator_path, Path(get_users_subpath("configs")) / platform)
+            return installer.install(pkg_path, progress_callback, is_cancelled)
         except Exception as e:
-            logger.error(f"❌ Ошибка поиска кода диска: {e}")
+            logger.error(f"❌ Ошибка установки PKG: {e}")
             return None
 
     def _move_ps3_game_folder(self, source_path: Path) -> Optional[Path]:
@@ -347,14 +380,7 @@ class LaunchManager:
         try:
             destination_path = self.ps3_games_dir / source_path.name
             logger.info(f"🚚 Перемещение {source_path.name} в {destination_path}...")
-
-            if destination_path.exists():
-                logger.warning(f"⚠️ Целевая папка уже существует. Удаляем её: {destination_path}")
-                shutil.rmtree(destination_path)
-
-            shutil.move(str(source_path), str(self.ps3_games_dir))
-            logger.info(f"✅ Папка успешно перемещена.")
-            return destination_path
+            return PkgInstaller.move_title(source_path, self.ps3_games_dir)
 
         except Exception as e:
             logger.error(f"❌ Ошибка перемещения папки: {e}")
@@ -362,27 +388,22 @@ class LaunchManager:
 
     def _find_eboot_after_installation(self, game_dir: Path) -> Optional[Path]:
         """
-        Ищет EBOOT.BIN в перемещенной папке игры.
-        Ищет как в корне папки, так и в USRDIR.
+        Ищет EBOOT.BIN в папке игры по индексу PS3 (USRDIR, корень или PS3_GAME).
         """
-        # 1. Поиск в корне папки с кодом диска
-        eboot_root = game_dir / "EBOOT.BIN"
-        if eboot_root.exists():
-            return eboot_root
-
-        # 2. Поиск в USRDIR
-        eboot_usrdir = game_dir / "USRDIR" / "EBOOT.BIN"
-        if eboot_usrdir.exists():
-            return eboot_usrdir
+        record = get_ps3_index().title_info(game_dir)
+        if record and record['eboot']:
+            return record['eboot']
 
         logger.error(f"❌ EBOOT.BIN не найден в папке: {game_dir}")
         return None
 
     # === ОСНОВНОЙ МЕТОД СОЗДАНИЯ ЛАУНЧЕРОВ ===
 
-    def create_launcher(self, game_data: dict, game_install_path: Path) -> bool:
+    def create_launcher(self, game_data: dict, game_install_path: Path,
+                        progress_callback=None, is_cancelled=None) -> bool:
         """
-        Создает лаунчер для игры
+        Создает лаунчер для игры. progress_callback(percent, message) и
+        is_cancelled используются при установке PS3 PKG.
         """
         try:
             logger.info(f"🎯 Создание лаунчера для игры: {game_data.get('title')}")
@@ -398,7 +419,7 @@ class LaunchManager:
 
             # Для PS3 игр используем специальную логику
             if platform == 'PS3' and emulator_name == 'rpcs3':
-                return self._create_ps3_launcher(game_data, game_install_path)
+                return self._create_ps3_launcher(game_data, game_install_path, progress_callback, is_cancelled)
 
             # Для всех остальных платформ - стандартная логика
             else:
@@ -410,7 +431,8 @@ class LaunchManager:
 
     # === СПЕЦИАЛЬНАЯ ЛОГИКА ДЛЯ PS3 ===
 
-    def _create_ps3_launcher(self, game_data: dict, game_install_path: Path) -> bool:
+    def _create_ps3_launcher(self, game_data: dict, game_install_path: Path,
+                             progress_callback=None, is_cancelled=None) -> bool:
         """Создает лаунчер для PS3 игры (PKG, ISO, EBOOT)"""
         try:
             game_id = game_data.get('id')
@@ -418,23 +440,20 @@ class LaunchManager:
 
             logger.info(f"🎮 Создание лаунчера для PS3: {game_title}")
 
-            # Определяем тип игры
-            game_type = self._detect_ps3_game_type(game_install_path)
-            logger.info(f"📁 Тип игры: {game_type}")
+            # Определяем тип игры и путь запуска одним обращением к индексу PARAM.SFO
+            record = get_ps3_index().resolve(game_install_path)
+            game_type = record['game_type'] if record else self._detect_ps3_game_type(game_install_path)
+            logger.info(f"📁 Тип игры: {game_type}" + (f", Title ID: {record['title_id']}" if record and record.get('title_id') else ""))
 
             # === НОВАЯ ЛОГИКА ДЛЯ PKG ===
             if game_type == 'pkg':
                 logger.info("📦 Обнаружен PKG файл, начинаем установку...")
 
-                # 1. Устанавливаем PKG (пользователь закрывает окно после установки)
-                success = self._install_pkg(game_install_path, "PS3")
-                if not success:
-                    return False
-
-                # 2. Ищем папку с кодом диска, которую создал RPCS3
-                source_game_dir = self._find_ps3_game_code_dir()
+                # 1-2. Устанавливаем PKG; папка с кодом диска известна из заголовка PKG
+                source_game_dir = self._install_pkg(game_install_path, "PS3",
+                                                    progress_callback, is_cancelled)
                 if not source_game_dir:
-                    logger.error("❌ Не удалось найти папку с кодом диска после установки")
+                    logger.error("❌ Не удалось установить PKG")
                     return False
 
                 # 3. Перемещаем папку игры в целевой каталог
@@ -454,24 +473,8 @@ class LaunchManager:
 
             # Для ISO, EBOOT и FOLDER - создаем лаунчер напрямую
             else:
-                # В случае типа folder, убедимся, что game_install_path - это папка с игрой
-                if game_type == 'folder':
-                    # Для folder (Jailbreak) путь для запуска - сама папка
-                    game_launch_path = game_install_path
-                elif game_type == 'eboot':
-                    # Для eboot путь для запуска - это EBOOT.BIN или папка, если это папка-EBOOT
-                    if game_install_path.is_file():
-                        game_launch_path = game_install_path
-                    else:
-                        # Если пользователь указал папку с кодом диска
-                        found_eboot = self._find_eboot_after_installation(game_install_path)
-                        if found_eboot:
-                            game_launch_path = found_eboot
-                        else:
-                            game_launch_path = game_install_path # Fallback на папку
-                else:
-                    # Для iso и других
-                    game_launch_path = game_install_path
+                # folder (диск/Jailbreak) - сама папка, eboot - найденный EBOOT.BIN, iso - образ
+                game_launch_path = record['launch_path'] if record else game_install_path
 
                 return self._create_simple_ps3_launcher(game_data, game_launch_path, game_type)
 
@@ -511,7 +514,7 @@ class LaunchManager:
             # Переменные для шаблона
             template_vars = {
                 'emulator_path': f'"{emulator_path}"',
-                'game_path': f'"{str(game_path)}"',
+                'game_path': f'"{to_users_relative(game_path)}"',
                 # Другие переменные, если они нужны в шаблонах PS3
             }
 
@@ -529,11 +532,10 @@ class LaunchManager:
             post_actions_script = "\n".join(post_actions) + "\n" if post_actions else ""
 
             # Создаем скрипт запуска
-            script_content = f"""#!/bin/bash
-cd "{self.project_root}"
-
+            configs_dir = to_users_relative(Path(get_users_subpath("configs")) / "PS3")
+            script_content = LAUNCHER_HEADER.replace('{project_root}', str(self.project_root)) + f"""
 # Настройки окружения для RPCS3
-export XDG_CONFIG_HOME="{Path(get_users_subpath("configs")) / "PS3"}"
+export XDG_CONFIG_HOME="{configs_dir}"
 export SDL_VIDEO_MINIMIZE_ON_FOCUS_LOSS="0"
 
 # Дополнительные переменные окружения из реестра
@@ -560,6 +562,13 @@ echo "🔚 Игра завершена"
 
             logger.info(f"✅ Создан лаунчер: {launcher_path}")
 
+            spec_env = {
+                'XDG_CONFIG_HOME': configs_dir,
+                'SDL_VIDEO_MINIMIZE_ON_FOCUS_LOSS': '0',
+                **env_vars
+            }
+            spec_path = self._save_launch_spec(game_id, launch_command, spec_env, post_actions)
+
             # Обновляем информацию об игре
             self.installed_games[game_id] = {
                 'title': game_title,
@@ -569,9 +578,11 @@ echo "🔚 Игра завершена"
                 'emulator': 'rpcs3',
                 'game_type': game_type,
                 'launcher_path': str(launcher_path),
+                'launch_spec_path': str(spec_path) if spec_path else None,
                 'status': 'installed'
             }
             self._save_installed_games()
+            self._record_launcher_inputs(game_id)
 
             return True
 
@@ -609,16 +620,18 @@ echo "🔚 Игра завершена"
             # Подготавливаем переменные для шаблона
             configs_dir = Path(get_users_subpath("configs"))
             bios_dir = Path(get_users_subpath("bios")) / platform
+            game_path = to_users_relative(game_install_path)
 
+            # Каталог конфигов выбирается в скрипте: слои игры или общий каталог платформы
             template_vars = {
-                'config_dir': f'"{str(configs_dir / platform)}"',
-                'game_path': f'"{str(game_install_path)}"',
+                'config_dir': '"$XDG_CONFIG_HOME"',
+                'game_path': f'"{game_path}"',
                 'game_id': game_id,
                 'project_root': f'"{str(self.project_root)}"',
                 'emulator_name': emulator_name,
                 'emulator_path': emulator_path,
                 'flatpak_id': emulator_path,
-                'bios_dir': f'"{str(bios_dir)}"'
+                'bios_dir': f'"{to_users_relative(bios_dir)}"'
             }
 
             # === НОВОЕ: Проверяем наличие game_types в реестре ===
@@ -632,15 +645,15 @@ echo "🔚 Игра завершена"
             # === Старая логика для обратной совместимости ===
             elif emulator_name == 'duckstation':
                 launch_command = self._get_duckstation_launch_command(
-                    emulator_path, game_install_path, configs_dir / platform
+                    emulator_path, game_path, "$XDG_CONFIG_HOME"
                 )
             elif emulator_name == 'pcsx2':
                 launch_command = self._get_pcsx2_launch_command(
-                    emulator_path, game_install_path, configs_dir / platform
+                    emulator_path, game_path, "$XDG_CONFIG_HOME"
                 )
             elif emulator_name == 'ppsspp':
                 launch_command = self._get_ppsspp_launch_command(
-                    emulator_path, game_install_path, configs_dir / platform
+                    emulator_path, game_path, "$XDG_CONFIG_HOME"
                 )
             else:
                 # Используем основной шаблон из реестра
@@ -661,11 +674,15 @@ echo "🔚 Игра завершена"
             post_actions_script = "\n".join(post_actions) + "\n" if post_actions else ""
 
             # Создаем финальный скрипт запуска с новыми полями
-            script_content = f"""#!/bin/bash
-cd "{self.project_root}"
-
+            platform_config_dir = to_users_relative(configs_dir / platform)
+            game_config_dir = to_users_relative(ConfigManager.game_config_dir(platform, game_id))
+            script_content = LAUNCHER_HEADER.replace('{project_root}', str(self.project_root)) + f"""
 # Настройки окружения для эмулятора
-export XDG_CONFIG_HOME="{configs_dir / platform}"
+export XDG_CONFIG_HOME="{platform_config_dir}"
+# Конфиг со слоями игры (собирается ArcadeDeck перед запуском)
+if [ -d "{game_config_dir}" ]; then
+    export XDG_CONFIG_HOME="{game_config_dir}"
+fi
 export SDL_VIDEO_MINIMIZE_ON_FOCUS_LOSS="0"
 
 # Переменные окружения из реестра
@@ -694,6 +711,16 @@ echo "✅ Игра завершена"
 
             logger.info(f"✅ Создан финальный лаунчер: {final_launcher_path}")
 
+            spec_env = {
+                'XDG_CONFIG_HOME': platform_config_dir,
+                'SDL_VIDEO_MINIMIZE_ON_FOCUS_LOSS': '0',
+                **env_vars
+            }
+            spec_path = self._save_launch_spec(
+                game_id, launch_command, spec_env, post_actions,
+                flatpak_id=emulator_path if installation_type != 'appimage' else None
+            )
+
             # Обновляем информацию об игре
             self.installed_games[game_id] = {
                 'title': game_data.get('title'),
@@ -701,10 +728,13 @@ echo "✅ Игра завершена"
                 'install_path': str(game_install_path),
                 'install_date': time.time(),
                 'emulator': emulator_name,
+                'game_type': game_data.get('game_type', 'default'),
                 'launcher_path': str(final_launcher_path),
+                'launch_spec_path': str(spec_path) if spec_path else None,
                 'status': 'installed'
             }
             self._save_installed_games()
+            self._record_launcher_inputs(game_id)
 
             return True
 
@@ -714,15 +744,15 @@ echo "✅ Игра завершена"
 
     # === МЕТОДЫ ДЛЯ КОНКРЕТНЫХ ЭМУЛЯТОРОВ (СОХРАНЕНЫ!) ===
 
-    def _get_duckstation_launch_command(self, emulator_path: str, game_path: Path, config_dir: Path) -> str:
+    def _get_duckstation_launch_command(self, emulator_path: str, game_path, config_dir: str) -> str:
         """Создает команду запуска для DuckStation (PS1)"""
         return f'"{emulator_path}" -fullscreen -- "{game_path}"'
 
-    def _get_pcsx2_launch_command(self, emulator_path: str, game_path: Path, config_dir: Path) -> str:
+    def _get_pcsx2_launch_command(self, emulator_path: str, game_path, config_dir: str) -> str:
         """Создает команду запуска для PCSX2 (PS2)"""
         return f'"{emulator_path}" -fullscreen -- "{game_path}"'
 
-    def _get_ppsspp_launch_command(self, emulator_path: str, game_path: Path, config_dir: Path) -> str:
+    def _get_ppsspp_launch_command(self, emulator_path: str, game_path, config_dir: str) -> str:
         """Создает команду запуска для PPSSPP (PSP)"""
         return f'XDG_CONFIG_HOME="{config_dir}" "{emulator_path}" "{game_path}"'
 
@@ -773,25 +803,35 @@ echo "✅ Игра завершена"
         """Проверяет, установлена ли игра"""
         return game_id in self.installed_games
 
-    def launch_game(self, game_id: str) -> bool:
-        """Запускает игру через созданный скрипт-лаунчер"""
+    def launch_game(self, game_id: str, extra_env: Optional[Dict[str, str]] = None):
+        """
+        Запускает игру напрямую по спецификации запуска; для игр, установленных
+        до ее появления, - через скрипт-лаунчер. Возвращает процесс или None.
+        """
         game_info = self.installed_games.get(game_id)
         if not game_info:
             logger.error(f"❌ Игра {game_id} не установлена")
-            return False
-
-        launcher_path = Path(game_info.get('launcher_path', ''))
-        if not launcher_path.exists():
-            logger.error(f"❌ Лаунчер для игры {game_id} не найден")
-            return False
+            return None
 
         try:
-            subprocess.Popen(['bash', str(launcher_path)], start_new_session=True)
-            logger.info(f"🎮 Запускаем игру {game_id}")
-            return True
+            started = time.monotonic()
+            spec = LaunchSpec.load(game_info.get('launch_spec_path') or self.launch_spec_path(game_id))
+            if spec:
+                process = spec.spawn(extra_env)
+            else:
+                launcher_path = Path(game_info.get('launcher_path', ''))
+                if not launcher_path.exists():
+                    logger.error(f"❌ Лаунчер для игры {game_id} не найден")
+                    return None
+                env = {**os.environ, **users_root_env(), **(extra_env or {})}
+                process = subprocess.Popen(['bash', str(launcher_path)], env=env, start_new_session=True)
+
+            logger.info(f"🎮 Запускаем игру {game_id} (PID {process.pid}, "
+                        f"{(time.monotonic() - started) * 1000:.0f} мс до старта процесса)")
+            return process
         except Exception as e:
             logger.error(f"❌ Ошибка запуска игры: {e}")
-            return False
+            return None
 
     def uninstall_game(self, game_id: str) -> bool:
         """Удаляет игру из реестра"""
@@ -801,6 +841,7 @@ echo "✅ Игра завершена"
                 launcher_path = Path(self.installed_games[game_id].get('launcher_path', ''))
                 if launcher_path.exists():
                     launcher_path.unlink()
+                self.launch_spec_path(game_id).unlink(missing_ok=True)
 
                 # Удаляем из реестра
                 del self.installed_games[game_id]
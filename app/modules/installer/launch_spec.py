@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import shlex
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Импорт каталога игровых данных
+from core import users_root_env
+
+logger = logging.getLogger('LaunchSpec')
+
+ENV_ASSIGNMENT = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)=(.*)$', re.DOTALL)
+VARIABLE = re.compile(r'\$(?:\{([A-Za-z_][A-Za-z0-9_]*)\}|([A-Za-z_][A-Za-z0-9_]*))')
+
+
+class LaunchSpec:
+    """
+    Готовая команда запуска игры: argv, переменные окружения, рабочая папка
+    и действия после выхода. Собирается один раз при установке и хранится
+    рядом со скриптом лаунчера (users/launchers/<game_id>.json), а при
+    запуске эмулятор стартует напрямую, без bash и повторного разбора.
+    Ссылки вида $VAR / ${VAR} в argv и env раскрываются в момент запуска,
+    в том числе ${USERS_ROOT} - текущий путь к users из настроек.
+    """
+
+    def __init__(self, argv: List[str], env: Optional[Dict[str, str]] = None,
+                 cwd: Optional[str] = None, post_actions: Optional[List[str]] = None):
+        self.argv = list(argv)
+        self.env = dict(env or {})
+        self.cwd = cwd
+        self.post_actions = list(post_actions or [])
+
+    @classmethod
+    def from_command(cls, command: str, env: Optional[Dict[str, str]] = None,
+                     cwd: Optional[str] = None, post_actions: Optional[List[str]] = None) -> 'LaunchSpec':
+        """
+        Разбирает строку команды из шаблона профиля запуска. Присваивания
+        в начале (XDG_CONFIG_HOME=... emulator ...) переносятся в env.
+        """
+        tokens = shlex.split(command)
+        env = dict(env or {})
+        while tokens:
+            match = ENV_ASSIGNMENT.match(tokens[0])
+            if not match:
+                break
+            key, value = match.groups()
+            # XDG_CONFIG_HOME="$XDG_CONFIG_HOME" - значение уже задано в env
+            if value not in (f"${key}", f"${{{key}}}"):
+                env[key] = value
+            tokens.pop(0)
+        if not tokens:
+            raise ValueError(f"Пустая команда запуска: {command!r}")
+        return cls(tokens, env, cwd, post_actions)
+
+    def wrap_flatpak(self, flatpak_id: str):
+        """
+        Для Flatpak эмулятора запускает `flatpak run <id>`: переменные окружения
+        передаются в песочницу через --env, папка конфигов открывается через --filesystem.
+        """
+        if self.argv and self.argv[0] == 'flatpak':
+            return
+        args = self.argv[1:] if self.argv and self.argv[0] == flatpak_id else self.argv
+        options = [f"--env={key}=${{{key}}}" for key in self.env]
+        if 'XDG_CONFIG_HOME' in self.env:
+            options.append("--filesystem=$XDG_CONFIG_HOME")
+        self.argv = ['flatpak', 'run', *options, flatpak_id, *args]
+
+    # --- хранение ---
+
+    def to_dict(self) -> Dict:
+        return {
+            'argv': self.argv,
+            'env': self.env,
+            'cwd': self.cwd,
+            'post_actions': self.post_actions
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LaunchSpec':
+        return cls(data.get('argv', []), data.get('env'), data.get('cwd'), data.get('post_actions'))
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['LaunchSpec']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                spec = cls.from_dict(json.load(f))
+            return spec if spec.argv else None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения спецификации запуска {path}: {e}")
+            return None
+
+    # --- запуск ---
+
+    @staticmethod
+    def _expand(value: str, env: Dict[str, str]) -> str:
+        return VARIABLE.sub(lambda m: env.get(m.group(1) or m.group(2), m.group(0)), value)
+
+    def resolve(self, extra_env: Optional[Dict[str, str]] = None):
+        """Итоговые argv и окружение: os.environ + USERS_ROOT + env спецификации + extra_env"""
+        env = dict(os.environ)
+        env.update(users_root_env())
+        for key, value in self.env.items():
+            env[key] = self._expand(str(value), env)
+        env.update(extra_env or {})
+        argv = [self._expand(arg, env) for arg in self.argv]
+        return argv, env
+
+    def spawn(self, extra_env: Optional[Dict[str, str]] = None,
+              executable: Optional[str] = None) -> subprocess.Popen:
+        """
+        Запускает эмулятор напрямую в отдельной сессии. executable заменяет
+        argv[0] (например, AppRun распакованного AppImage).
+        """
+        argv, env = self.resolve(extra_env)
+        if executable:
+            argv[0] = executable
+        cwd = self.cwd if self.cwd and os.path.isdir(self.cwd) else None
+        logger.info(f"🚀 Запуск: {' '.join(shlex.quote(arg) for arg in argv)}")
+        process = subprocess.Popen(argv, env=env, cwd=cwd, start_new_session=True)
+
+        if self.post_actions:
+            threading.Thread(target=self._run_post_actions, args=(process, env, cwd),
+                             name='launch-post-actions', daemon=True).start()
+        return process
+
+    def _run_post_actions(self, process: subprocess.Popen, env: Dict[str, str], cwd: Optional[str]):
+        process.wait()
+        for action in self.post_actions:
+            try:
+                subprocess.run(action, shell=True, env=env, cwd=cwd, timeout=60)
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка действия после запуска '{action}': {e}")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import os
+import time
+import shutil
+import sqlite3
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Импорт каталога игровых данных
+from core import get_users_path
+
+logger = logging.getLogger('LaunchSupervisor')
+
+
+class SessionStats:
+    """
+    Локальная статистика игровых сессий (users/stats.db): время до появления
+    окна, длительность, код выхода и пиковая память процесса эмулятора.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    game_id TEXT NOT NULL,
+                    emulator TEXT,
+                    started_at REAL NOT NULL,
+                    window_ms INTEGER,
+                    duration_s REAL,
+                    exit_code INTEGER,
+                    peak_rss_kb INTEGER
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_game ON sessions (game_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def record_session(self, session: Dict):
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO sessions (game_id, emulator, started_at, window_ms, duration_s, exit_code, peak_rss_kb) "
+                "VALUES (:game_id, :emulator, :started_at, :window_ms, :duration_s, :exit_code, :peak_rss_kb)",
+                session
+            )
+
+    def play_time(self, game_id: str) -> float:
+        """Суммарное время в игре в секундах"""
+        with self._connect() as db:
+            row = db.execute("SELECT COALESCE(SUM(duration_s), 0) FROM sessions WHERE game_id = ?",
+                             (game_id,)).fetchone()
+        return row[0]
+
+    def last_played(self, game_id: str) -> Optional[float]:
+        with self._connect() as db:
+            row = db.execute("SELECT MAX(started_at) FROM sessions WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0]
+
+    def startup_stats(self, emulator: str, limit: int = 20) -> Dict:
+        """Среднее время до окна и пик памяти за последние запуски эмулятора"""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT AVG(window_ms), AVG(peak_rss_kb), COUNT(*) FROM ("
+                "SELECT window_ms, peak_rss_kb FROM sessions WHERE emulator = ? "
+                "ORDER BY started_at DESC LIMIT ?)",
+                (emulator, limit)
+            ).fetchone()
+        return {'avg_window_ms': row[0], 'avg_peak_rss_kb': row[1], 'sessions': row[2]}
+
+
+_session_stats = None
+
+
+def get_session_stats() -> SessionStats:
+    """Возвращает общую базу статистики сессий"""
+    global _session_stats
+    if _session_stats is None:
+        _session_stats = SessionStats(Path(get_users_path()) / 'stats.db')
+    return _session_stats
+
+
+class LaunchSupervisor(QObject):
+    """
+    Следит за запущенной игрой: ждет появления окна (X11 через xdotool или
+    wmctrl), снимает пиковую память всех процессов сессии из /proc и после
+    выхода записывает сессию в SessionStats.
+    """
+
+    session_started = pyqtSignal(str, int)      # game_id, мс до появления окна
+    session_finished = pyqtSignal(str, float)   # game_id, длительность в секундах
+
+    POLL_INTERVAL = 0.5
+    WINDOW_TIMEOUT = 120
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sessions: Dict[str, subprocess.Popen] = {}
+
+    def watch(self, game_id: str, process: subprocess.Popen, emulator: str = None,
+              started_at: float = None):
+        """Начинает наблюдение за процессом игры в фоновом потоке"""
+        self.sessions[game_id] = process
+        threading.Thread(
+            target=self._supervise,
+            args=(game_id, process, emulator, started_at or time.monotonic()),
+            name=f'supervisor-{game_id}', daemon=True
+        ).start()
+
+    # --- процессы сессии ---
+
+    @staticmethod
+    def _session_pids(session_id: int) -> Set[int]:
+        """PID всех процессов сессии: лаунчер запускается через setsid, SID == PID"""
+        pids = set()
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    # Поля после имени процесса: state ppid pgrp session ...
+                    fields = f.read().rsplit(')', 1)[1].split()
+                if int(fields[3]) == session_id:
+                    pids.add(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+        return pids
+
+    @staticmethod
+    def _peak_rss_kb(pid: int) -> int:
+        """VmHWM из /proc/<pid>/status (пиковый RSS процесса)"""
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            pass
+        return 0
+
+    @staticmethod
+    def _has_window(pids: Set[int]) -> bool:
+        if not os.environ.get('DISPLAY') or not pids:
+            return False
+        try:
+            if shutil.which('xdotool'):
+                for pid in pids:
+                    result = subprocess.run(['xdotool', 'search', '--onlyvisible', '--pid', str(pid)],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=2)
+                    if result.stdout.strip():
+                        return True
+            elif shutil.which('wmctrl'):
+                result = subprocess.run(['wmctrl', '-lp'], stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, timeout=2)
+                for line in result.stdout.splitlines():
+                    fields = line.split()
+                    if len(fields) > 2 and fields[2].isdigit() and int(fields[2]) in pids:
+                        return True
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        return False
+
+    # --- наблюдение ---
+
+    def _supervise(self, game_id: str, process: subprocess.Popen, emulator: Optional[str], started: float):
+        started_at = time.time() - (time.monotonic() - started)
+        window_ms = None
+        peak_rss_kb = 0
+        can_detect_window = bool(os.environ.get('DISPLAY')) and bool(shutil.which('xdotool') or shutil.which('wmctrl'))
+
+        while True:
+            try:
+                process.wait(timeout=self.POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+
+            pids = self._session_pids(process.pid) | {process.pid}
+            for pid in pids:
+                peak_rss_kb = max(peak_rss_kb, self._peak_rss_kb(pid))
+
+            elapsed = time.monotonic() - started
+            if window_ms is None and can_detect_window and elapsed < self.WINDOW_TIMEOUT:
+                if self._has_window(pids):
+                    window_ms = int(elapsed * 1000)
+                    logger.info(f"🪟 Окно игры {game_id} появилось через {window_ms} мс")
+                    self.session_started.emit(game_id, window_ms)
+
+        duration = time.monotonic() - started
+        self.sessions.pop(game_id, None)
+        session = {
+            'game_id': game_id,
+            'emulator': emulator,
+            'started_at': started_at,
+            'window_ms': window_ms,
+            'duration_s': duration,
+            'exit_code': process.returncode,
+            'peak_rss_kb': peak_rss_kb or None
+        }
+        logger.info(f"🏁 Сессия {game_id}: {duration:.0f} с, код выхода {process.returncode}, "
+                    f"пик памяти {peak_rss_kb // 1024} MB")
+
+        try:
+            get_session_stats().record_session(session)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи статистики сессии: {e}")
+        self.session_finished.emit(game_id, duration)
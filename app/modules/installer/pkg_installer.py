@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+import os
+import re
+import time
+import shutil
+import struct
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger('PkgInstaller')
+
+PKG_MAGIC = b'\x7fPKG'
+
+# Заголовок PKG (big-endian): магия, ревизия, тип, метаданные, число файлов,
+# общий размер, смещение и размер данных, затем Content ID с 0x30
+PKG_HEADER = struct.Struct('>4sHHIIIIQQQ36s')
+
+# Content ID: UP0001-BLUS30001_00-XXXXXXXXXXXXXXXX, Title ID - 9 символов после дефиса
+CONTENT_ID_PATTERN = re.compile(r'^[A-Z]{2}\d{4}-([A-Z]{4}\d{5})_\d{2}-')
+
+
+def read_pkg_header(pkg_path: Path) -> Optional[Dict]:
+    """Читает заголовок PS3 PKG: content_id, title_id, размер данных; None для не-PKG"""
+    try:
+        with open(pkg_path, 'rb') as f:
+            data = f.read(PKG_HEADER.size)
+    except OSError as e:
+        logger.error(f"❌ Не удалось прочитать PKG {pkg_path}: {e}")
+        return None
+    if len(data) < PKG_HEADER.size or not data.startswith(PKG_MAGIC):
+        return None
+
+    (_, revision, pkg_type, _, _, _, item_count,
+     total_size, data_offset, data_size, content_id) = PKG_HEADER.unpack(data)
+    content_id = content_id.split(b'\x00', 1)[0].decode('ascii', errors='replace')
+    match = CONTENT_ID_PATTERN.match(content_id)
+    return {
+        'content_id': content_id,
+        'title_id': match.group(1) if match else None,
+        'revision': revision,
+        'type': pkg_type,
+        'item_count': item_count,
+        'total_size': total_size,
+        'data_size': data_size
+    }
+
+
+class PkgInstaller:
+    """
+    Установка PS3 PKG через RPCS3 без блокировки на окне эмулятора.
+
+    Title ID берется из заголовка PKG заранее, поэтому папка игры в
+    dev_hdd0/game известна до установки. RPCS3 запускается в режиме без
+    интерфейса, если сборка его поддерживает; прогресс считается по объему
+    распакованных данных, а зависшая установка прерывается по таймауту
+    бездействия. Готовая папка переносится в users/games/PS3 через os.rename.
+    """
+
+    POLL_INTERVAL = 1.0
+    IDLE_TIMEOUT = 300           # без роста данных, в режиме без интерфейса
+    GUI_IDLE_TIMEOUT = 3600      # окно RPCS3 ждет действий пользователя
+    HEADLESS_FLAGS = ('--headless', '--no-gui')
+
+    _headless_flags: Dict[str, Optional[str]] = {}
+
+    def __init__(self, emulator_path: str, config_dir: Path):
+        self.emulator_path = str(emulator_path)
+        self.config_dir = Path(config_dir)
+        self.games_dir = self.config_dir / 'rpcs3' / 'dev_hdd0' / 'game'
+
+    def headless_flag(self) -> Optional[str]:
+        """Флаг режима без интерфейса из --help этой сборки RPCS3 (кешируется)"""
+        if self.emulator_path not in self._headless_flags:
+            flag = None
+            try:
+                result = subprocess.run([self.emulator_path, '--help'], stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True, timeout=30)
+                flag = next((f for f in self.HEADLESS_FLAGS if f in result.stdout), None)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                logger.warning(f"⚠️ Не удалось получить параметры RPCS3: {e}")
+            self._headless_flags[self.emulator_path] = flag
+        return self._headless_flags[self.emulator_path]
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        total = 0
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _drain_output(self, process: subprocess.Popen):
+        for line in process.stdout:
+            line = line.strip()
+            if line:
+                logger.debug(f"RPCS3: {line}")
+
+    def install(self, pkg_path: Path,
+                progress_callback: Optional[Callable[[int, str], None]] = None,
+                is_cancelled: Optional[Callable[[], bool]] = None) -> Optional[Path]:
+        """Устанавливает PKG; возвращает папку игры в dev_hdd0/game или None"""
+        pkg_path = Path(pkg_path)
+        header = read_pkg_header(pkg_path)
+        if not header or not header['title_id']:
+            logger.error(f"❌ {pkg_path.name} не является PS3 PKG или не содержит Title ID")
+            return None
+
+        title_dir = self.games_dir / header['title_id']
+        size_before = self._dir_size(title_dir) if title_dir.exists() else 0
+        expected = max(header['data_size'], 1)
+        logger.info(f"📦 Установка PKG {header['content_id']} ({expected / (1024 * 1024):.0f} MB) в {title_dir}")
+
+        headless = self.headless_flag()
+        command = [self.emulator_path]
+        if headless:
+            command.append(headless)
+        command += ['--installpkg', str(pkg_path)]
+
+        env = os.environ.copy()
+        env['XDG_CONFIG_HOME'] = str(self.config_dir)
+        env['SDL_VIDEO_MINIMIZE_ON_FOCUS_LOSS'] = '0'
+        if headless:
+            env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+        logger.info(f"🚀 Команда установки: {' '.join(command)}")
+        process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True, errors='replace')
+        threading.Thread(target=self._drain_output, args=(process,),
+                         name='rpcs3-installpkg', daemon=True).start()
+
+        idle_timeout = self.IDLE_TIMEOUT if headless else self.GUI_IDLE_TIMEOUT
+        last_size = size_before
+        last_change = time.monotonic()
+        while True:
+            try:
+                process.wait(timeout=self.POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+
+            if is_cancelled and is_cancelled():
+                logger.info("⏹️ Установка PKG отменена")
+                process.terminate()
+                process.wait()
+                return None
+
+            size = self._dir_size(title_dir) if title_dir.exists() else 0
+            if size != last_size:
+                last_size = size
+                last_change = time.monotonic()
+                if progress_callback:
+                    percent = min(99, int((size - size_before) * 100 / expected))
+                    progress_callback(percent, f"Установка PKG: {percent}%")
+            elif time.monotonic() - last_change > idle_timeout:
+                logger.error(f"❌ Установка PKG не продвигается {idle_timeout} с, процесс остановлен")
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                return None
+
+        if not (title_dir / 'PARAM.SFO').exists():
+            logger.error(f"❌ RPCS3 завершился с кодом {process.returncode}, {title_dir.name} не установлен")
+            return None
+
+        if progress_callback:
+            progress_callback(100, "Установка PKG завершена")
+        logger.info(f"✅ PKG установлен: {title_dir}")
+        return title_dir
+
+    @staticmethod
+    def move_title(source_dir: Path, target_root: Path) -> Optional[Path]:
+        """
+        Переносит папку игры в target_root: на той же файловой системе -
+        os.rename (мгновенно, без копирования), иначе shutil.move.
+        """
+        source_dir = Path(source_dir)
+        target_root = Path(target_root)
+        target_root.mkdir(parents=True, exist_ok=True)
+        destination = target_root / source_dir.name
+
+        # Прежняя версия убирается в сторону и удаляется только после переноса
+        backup = None
+        if destination.exists():
+            backup = destination.with_name(f".{destination.name}.old")
+            shutil.rmtree(backup, ignore_errors=True)
+            os.rename(destination, backup)
+
+        try:
+            if source_dir.stat().st_dev == target_root.stat().st_dev:
+                os.rename(source_dir, destination)
+            else:
+                logger.info("ℹ️ Папки на разных файловых системах, выполняется копирование")
+                shutil.move(str(source_dir), str(destination))
+        except OSError as e:
+            logger.error(f"❌ Ошибка переноса {source_dir.name}: {e}")
+            if backup:
+                os.rename(backup, destination)
+            return None
+
+        if backup:
+            shutil.rmtree(backup, ignore_errors=True)
+        logger.info(f"✅ Папка {source_dir.name} перенесена в {target_root}")
+        return destination
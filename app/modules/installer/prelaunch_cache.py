@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, Set
+
+from .launch_spec import LaunchSpec
+
+# Импорт каталога игровых данных
+from core import get_users_subpath, load_installed_games
+
+logger = logging.getLogger('PrelaunchCache')
+
+# Папки кеша шейдеров/JIT относительно XDG_CONFIG_HOME эмулятора
+SHADER_CACHE_DIRS = {
+    'rpcs3': ['rpcs3/cache'],
+    'pcsx2': ['PCSX2/cache'],
+    'duckstation': ['duckstation/cache', 'duckstation/shaders'],
+    'ppsspp': ['ppsspp/PSP/SYSTEM/CACHE']
+}
+
+
+class PrelaunchCache:
+    """
+    Прогрев запуска игры, пока открыта ее страница:
+    - AppImage эмулятора распаковывается (--appimage-extract) в кеш по ключу
+      версии, и запуск идет через AppRun без монтирования FUSE;
+    - образ игры и кеш шейдеров эмулятора подгружаются в page cache
+      через posix_fadvise(WILLNEED).
+    """
+
+    WARM_BUDGET_BYTES = 4 * 1024 * 1024 * 1024
+    EXTRACT_TIMEOUT = 300
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._lock = threading.Lock()
+        self._extract_lock = threading.Lock()
+        self._pending: Set[str] = set()
+
+    # --- AppImage ---
+
+    @staticmethod
+    def _is_appimage(path: str) -> bool:
+        return bool(path) and path.endswith('.AppImage') and os.path.isfile(path)
+
+    def _extract_dir(self, appimage_path: str) -> Path:
+        """Каталог распаковки: ключ - объект хранилища (sha256) или размер и время файла"""
+        real_path = Path(os.path.realpath(appimage_path))
+        if real_path.parent.name == 'objects':
+            key = real_path.stem[:16]
+        else:
+            st = real_path.stat()
+            key = f"{st.st_size}-{int(st.st_mtime)}"
+        return self.cache_dir / f"{Path(appimage_path).stem}-{key}"
+
+    def extracted_apprun(self, appimage_path: str) -> Optional[str]:
+        """AppRun распакованного AppImage, если распаковка уже готова"""
+        if not self._is_appimage(appimage_path):
+            return None
+        apprun = self._extract_dir(appimage_path) / 'squashfs-root' / 'AppRun'
+        return str(apprun) if (apprun.parent / '.complete').exists() and os.access(apprun, os.X_OK) else None
+
+    def extract_appimage(self, appimage_path: str) -> Optional[str]:
+        """Распаковывает AppImage в кеш (один раз на версию) и возвращает путь к AppRun"""
+        apprun = self.extracted_apprun(appimage_path)
+        if apprun or not self._is_appimage(appimage_path):
+            return apprun
+
+        with self._extract_lock:
+            apprun = self.extracted_apprun(appimage_path)
+            if apprun:
+                return apprun
+
+            target_dir = self._extract_dir(appimage_path)
+            tmp_dir = target_dir.with_name(f".{target_dir.name}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+
+            logger.info(f"📦 Распаковка {Path(appimage_path).name} для быстрого запуска")
+            try:
+                result = subprocess.run([appimage_path, '--appimage-extract'], cwd=tmp_dir,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        timeout=self.EXTRACT_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                logger.warning(f"⚠️ Не удалось распаковать AppImage: {e}")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return None
+
+            if result.returncode != 0 or not (tmp_dir / 'squashfs-root' / 'AppRun').exists():
+                logger.warning(f"⚠️ Распаковка AppImage завершилась с кодом {result.returncode}")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return None
+
+            (tmp_dir / 'squashfs-root' / '.complete').touch()
+            shutil.rmtree(target_dir, ignore_errors=True)
+            os.replace(tmp_dir, target_dir)
+
+            # Распаковки прошлых версий этого AppImage больше не нужны
+            prefix = f"{Path(appimage_path).stem}-"
+            for old_dir in self.cache_dir.iterdir():
+                if old_dir.name.startswith(prefix) and old_dir != target_dir:
+                    shutil.rmtree(old_dir, ignore_errors=True)
+
+            logger.info(f"✅ AppImage распакован: {target_dir}")
+            return str(target_dir / 'squashfs-root' / 'AppRun')
+
+    # --- page cache ---
+
+    @staticmethod
+    def _fadvise(path: Path, limit: int) -> int:
+        """Просит ядро заранее прочитать начало файла (до limit байт); возвращает объем"""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return 0
+        try:
+            length = min(os.fstat(fd).st_size, limit)
+            if hasattr(os, 'posix_fadvise') and length > 0:
+                os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+            return length
+        except OSError:
+            return 0
+        finally:
+            os.close(fd)
+
+    def warm_path(self, path: Path, budget: int) -> int:
+        """Прогревает файл или файлы папки в пределах budget байт; возвращает прогретый объем"""
+        path = Path(path)
+        if path.is_file():
+            return self._fadvise(path, budget)
+
+        warmed = 0
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                if warmed >= budget:
+                    return warmed
+                warmed += self._fadvise(Path(root) / name, budget - warmed)
+        return warmed
+
+    # --- подготовка игры ---
+
+    def prepare(self, game_id: str):
+        """Подготавливает быстрый запуск установленной игры"""
+        try:
+            game_info = load_installed_games().get(game_id)
+        except Exception:
+            return
+        if not game_info:
+            return
+
+        spec_path = game_info.get('launch_spec_path')
+        spec = LaunchSpec.load(Path(spec_path)) if spec_path else None
+        budget = self.WARM_BUDGET_BYTES
+
+        if spec:
+            argv, env = spec.resolve()
+            self.extract_appimage(argv[0])
+
+            emulator = game_info.get('emulator') or Path(argv[0]).stem.split('-')[0].lower()
+            config_dir = env.get('XDG_CONFIG_HOME')
+            for relative in SHADER_CACHE_DIRS.get(emulator, []) if config_dir else []:
+                cache_path = Path(config_dir) / relative
+                if cache_path.exists():
+                    budget -= self.warm_path(cache_path, budget)
+
+        install_path = game_info.get('install_path')
+        if install_path and os.path.exists(install_path):
+            warmed = self.warm_path(Path(install_path), budget)
+            logger.info(f"🔥 Прогрев {game_id}: {warmed / (1024 * 1024):.0f} MB образа игры")
+
+    def prepare_async(self, game_id: str):
+        """Запускает подготовку в фоне (повторные вызовы для той же игры игнорируются)"""
+        with self._lock:
+            if game_id in self._pending:
+                return
+            self._pending.add(game_id)
+
+        def worker():
+            try:
+                self.prepare(game_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка подготовки запуска {game_id}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(game_id)
+
+        threading.Thread(target=worker, name=f'prelaunch-{game_id}', daemon=True).start()
+
+
+_prelaunch_cache = None
+
+
+def get_prelaunch_cache() -> PrelaunchCache:
+    """Возвращает общий кеш подготовки запуска"""
+    global _prelaunch_cache
+    if _prelaunch_cache is None:
+        _prelaunch_cache = PrelaunchCache(Path(get_users_subpath("cache")) / 'prelaunch')
+    return _prelaunch_cache
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import os
+import struct
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .pkg_installer import read_pkg_header
+
+logger = logging.getLogger('Ps3Index')
+
+# PARAM.SFO (little-endian): магия, версия, начало таблицы ключей,
+# начало таблицы данных, число записей; затем записи индекса по 16 байт
+SFO_MAGIC = b'\x00PSF'
+SFO_HEADER = struct.Struct('<4sIIII')
+SFO_ENTRY = struct.Struct('<HHIII')
+SFO_MAX_SIZE = 64 * 1024
+
+SFO_FMT_UTF8_SPECIAL = 0x0004
+SFO_FMT_UTF8 = 0x0204
+SFO_FMT_INT32 = 0x0404
+
+
+def parse_param_sfo(sfo_path: Path) -> Optional[Dict[str, Any]]:
+    """Читает все ключи PARAM.SFO (TITLE_ID, TITLE, APP_VER, CATEGORY...); None при ошибке"""
+    try:
+        with open(sfo_path, 'rb') as f:
+            data = f.read(SFO_MAX_SIZE)
+    except OSError:
+        return None
+    values = parse_sfo(data)
+    if values is None and data.startswith(SFO_MAGIC):
+        logger.warning(f"⚠️ Поврежденный PARAM.SFO: {sfo_path}")
+    return values
+
+
+def parse_sfo(data: bytes) -> Optional[Dict[str, Any]]:
+    """Разбирает содержимое SFO (PS3 PARAM.SFO, PSP PARAM.SFO из образа или PBP)"""
+    if len(data) < SFO_HEADER.size or not data.startswith(SFO_MAGIC):
+        return None
+
+    _, _, key_table, data_table, count = SFO_HEADER.unpack_from(data)
+    values = {}
+    try:
+        for index in range(count):
+            key_offset, fmt, length, _, data_offset = SFO_ENTRY.unpack_from(
+                data, SFO_HEADER.size + index * SFO_ENTRY.size)
+            key_start = key_table + key_offset
+            key = data[key_start:data.index(b'\x00', key_start)].decode('ascii', errors='replace')
+            raw = data[data_table + data_offset:data_table + data_offset + length]
+            if fmt == SFO_FMT_INT32:
+                values[key] = struct.unpack('<I', raw[:4])[0]
+            elif fmt in (SFO_FMT_UTF8, SFO_FMT_UTF8_SPECIAL):
+                values[key] = raw.split(b'\x00', 1)[0].decode('utf-8', errors='replace')
+    except (struct.error, ValueError):
+        return values or None
+    return values
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class Ps3Index:
+    """
+    Индекс PS3 игр по PARAM.SFO.
+
+    Папка игры читается одним os.scandir: дисковая раскладка (PS3_GAME/PARAM.SFO,
+    PS3_GAME/USRDIR/EBOOT.BIN) или раскладка dev_hdd0/game (PARAM.SFO,
+    USRDIR/EBOOT.BIN). Title ID, название, версия и категория берутся из
+    PARAM.SFO, а не из префикса имени папки. Результаты кешируются по пути
+    и mtime, поэтому повторное определение игры - один stat.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._titles: Dict[str, Tuple[Tuple, Optional[Dict]]] = {}
+        self._scans: Dict[str, Tuple[Optional[int], List[Dict]]] = {}
+
+    # --- папка игры ---
+
+    @staticmethod
+    def _entries(path: Path) -> Dict[str, os.DirEntry]:
+        try:
+            with os.scandir(path) as it:
+                return {entry.name.upper(): entry for entry in it}
+        except OSError:
+            return {}
+
+    def _read_title(self, title_dir: Path, entries: Optional[Dict[str, os.DirEntry]] = None) -> Optional[Dict]:
+        if entries is None:
+            entries = self._entries(title_dir)
+        if 'PS3_GAME' in entries and entries['PS3_GAME'].is_dir():
+            layout = 'disc'
+            content_dir = Path(entries['PS3_GAME'].path)
+            entries = self._entries(content_dir)
+        else:
+            layout = 'hdd'
+            content_dir = title_dir
+
+        sfo_path = Path(entries['PARAM.SFO'].path) if 'PARAM.SFO' in entries else None
+        eboot_path = None
+        if 'USRDIR' in entries and (Path(entries['USRDIR'].path) / 'EBOOT.BIN').is_file():
+            eboot_path = Path(entries['USRDIR'].path) / 'EBOOT.BIN'
+        elif 'EBOOT.BIN' in entries:
+            eboot_path = Path(entries['EBOOT.BIN'].path)
+        if not sfo_path and not eboot_path:
+            return None
+
+        sfo = (parse_param_sfo(sfo_path) if sfo_path else None) or {}
+        return {
+            'root': title_dir,
+            'layout': layout,
+            'title_id': sfo.get('TITLE_ID'),
+            'title': sfo.get('TITLE'),
+            'version': sfo.get('APP_VER') or sfo.get('VERSION'),
+            'category': sfo.get('CATEGORY'),
+            'sfo': sfo_path,
+            'eboot': eboot_path,
+            'content_dir': content_dir
+        }
+
+    def title_info(self, title_dir: Path) -> Optional[Dict]:
+        """Описание игры в папке (диск или dev_hdd0/game/<ID>) или None, если это не игра"""
+        return self._title_info(Path(title_dir))
+
+    @staticmethod
+    def _title_stamp(title_dir: Path) -> Tuple:
+        return (_mtime_ns(title_dir), _mtime_ns(title_dir / 'PS3_GAME'),
+                _mtime_ns(title_dir / 'PARAM.SFO'), _mtime_ns(title_dir / 'PS3_GAME' / 'PARAM.SFO'))
+
+    def _title_info(self, title_dir: Path, entries: Optional[Dict[str, os.DirEntry]] = None) -> Optional[Dict]:
+        key = str(title_dir)
+        stamp = self._title_stamp(title_dir)
+        with self._lock:
+            cached = self._titles.get(key)
+            if cached and cached[0] == stamp:
+                return cached[1]
+
+        record = self._read_title(title_dir, entries) if stamp[0] is not None else None
+        with self._lock:
+            self._titles[key] = (stamp, record)
+        return record
+
+    # --- поиск игр ---
+
+    def scan(self, root: Path) -> List[Dict]:
+        """
+        Все игры под root за один обход os.scandir: в найденные папки игр
+        обход не спускается. Кешируется по mtime root.
+        """
+        root = Path(root)
+        key = str(root)
+        stamp = _mtime_ns(root)
+        with self._lock:
+            cached = self._scans.get(key)
+            if cached and cached[0] == stamp:
+                return cached[1]
+
+        titles = []
+        pending = [root]
+        while pending:
+            current = pending.pop()
+            entries = self._entries(current)
+            record = self._title_info(current, entries)
+            if record:
+                titles.append(record)
+                continue
+            pending.extend(Path(entry.path) for entry in entries.values()
+                           if entry.is_dir(follow_symlinks=False))
+
+        titles.sort(key=lambda record: str(record['root']))
+        with self._lock:
+            self._scans[key] = (stamp, titles)
+        return titles
+
+    def find_title(self, root: Path, title_id: str) -> Optional[Dict]:
+        """Игра с указанным Title ID под root"""
+        return next((record for record in self.scan(root) if record['title_id'] == title_id), None)
+
+    def resolve(self, game_path: Path) -> Optional[Dict]:
+        """
+        Определяет PS3 игру по пути (PKG, ISO, EBOOT.BIN, папка диска или
+        dev_hdd0): game_type для профиля запуска RPCS3, launch_path и данные PARAM.SFO.
+        """
+        game_path = Path(game_path)
+        suffix = game_path.suffix.lower()
+
+        if suffix == '.pkg':
+            header = read_pkg_header(game_path) or {}
+            return {'game_type': 'pkg', 'launch_path': game_path, 'title_id': header.get('title_id')}
+        if suffix == '.iso':
+            return {'game_type': 'iso', 'launch_path': game_path, 'title_id': None}
+
+        if game_path.name.upper() == 'EBOOT.BIN':
+            # USRDIR/EBOOT.BIN -> папка игры (для диска - родитель PS3_GAME)
+            title_dir = game_path.parent.parent if game_path.parent.name.upper() == 'USRDIR' else game_path.parent
+            if title_dir.name.upper() == 'PS3_GAME':
+                title_dir = title_dir.parent
+            record = self.title_info(title_dir) or {'root': title_dir, 'title_id': None}
+            return dict(record, game_type='eboot', launch_path=game_path)
+
+        if game_path.is_dir():
+            record = self.title_info(game_path)
+            if not record:
+                titles = self.scan(game_path)
+                record = titles[0] if titles else None
+            if not record:
+                return None
+            if record['layout'] == 'disc':
+                return dict(record, game_type='folder', launch_path=record['root'])
+            return dict(record, game_type='eboot', launch_path=record['eboot'] or record['root'])
+
+        return None
+
+
+_ps3_index = None
+
+
+def get_ps3_index() -> Ps3Index:
+    """Возвращает общий индекс PS3 игр"""
+    global _ps3_index
+    if _ps3_index is None:
+        _ps3_index = Ps3Index()
+    return _ps3_index
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger('StageScheduler')
+
+
+class Stage:
+    """Этап установки: функция без аргументов, возвращающая True/False"""
+
+    def __init__(self, name: str, func: Callable[[], bool], depends: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends = tuple(depends)
+        self.started = None
+        self.duration = None
+        self.succeeded = False
+        self.error = None
+
+
+class StageScheduler:
+    """
+    Выполняет этапы установки по графу зависимостей.
+    Независимые этапы (эмулятор, BIOS, загрузка игры) идут параллельно,
+    зависимые стартуют, когда завершились все их предшественники.
+    """
+
+    def __init__(self, max_workers: int = 3, is_cancelled: Optional[Callable[[], bool]] = None,
+                 on_abort: Optional[Callable[[], None]] = None):
+        self.max_workers = max_workers
+        self.is_cancelled = is_cancelled or (lambda: False)
+        # Первая неудача этапа: новые не стартуют, запущенным сообщает on_abort
+        self.on_abort = on_abort
+        self.aborted = threading.Event()
+        self.stages: Dict[str, Stage] = {}
+
+    def add(self, name: str, func: Callable[[], bool], depends: Iterable[str] = ()):
+        """Добавляет этап; зависимости должны быть добавлены раньше"""
+        for dependency in depends:
+            if dependency not in self.stages:
+                raise ValueError(f"Неизвестная зависимость этапа {name}: {dependency}")
+        self.stages[name] = Stage(name, func, depends)
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """Первое исключение, прервавшее этап"""
+        for stage in self.stages.values():
+            if stage.error:
+                return stage.error
+        return None
+
+    def should_stop(self) -> bool:
+        """Отмена пользователем или неудача другого этапа"""
+        return self.aborted.is_set() or self.is_cancelled()
+
+    def _abort(self, stage: Stage):
+        if self.aborted.is_set():
+            return
+        self.aborted.set()
+        logger.warning(f"⛔ Этап {stage.name} неудачен, остальные этапы прерываются")
+        if self.on_abort:
+            try:
+                self.on_abort()
+            except Exception as e:
+                logger.error(f"❌ Ошибка прерывания этапов: {e}")
+
+    def _run_stage(self, stage: Stage) -> bool:
+        stage.started = time.time()
+        try:
+            stage.succeeded = bool(stage.func())
+        except Exception as e:
+            logger.error(f"❌ Этап {stage.name} завершился исключением: {e}")
+            stage.error = e
+            stage.succeeded = False
+        stage.duration = time.time() - stage.started
+        logger.info(f"⏱️ Этап {stage.name}: {stage.duration:.1f} с "
+                    f"({'успешно' if stage.succeeded else 'неудачно'})")
+        return stage.succeeded
+
+    def run(self) -> bool:
+        """
+        Запускает граф. После первой неудачи или отмены новые этапы
+        не стартуют, а запущенные получают сигнал прерывания (aborted,
+        on_abort) и дожидаются своей остановки.
+        Возвращает True, если все этапы выполнены успешно.
+        """
+        pending = dict(self.stages)
+        running = {}
+        done = set()
+        failed = False
+        started_at = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='install-stage') as pool:
+            while pending or running:
+                if not failed and not self.should_stop():
+                    for name, stage in list(pending.items()):
+                        if all(dependency in done for dependency in stage.depends):
+                            del pending[name]
+                            running[pool.submit(self._run_stage, stage)] = stage
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    if future.result():
+                        done.add(stage.name)
+                    else:
+                        failed = True
+                        if not self.is_cancelled():
+                            self._abort(stage)
+
+        self._log_timings(time.time() - started_at)
+        return not failed and not pending
+
+    def _log_timings(self, total: float):
+        """Сводка по времени этапов в лог установки"""
+        summary = ", ".join(
+            f"{stage.name} {stage.duration:.1f} с"
+            for stage in self.stages.values() if stage.duration is not None
+        )
+        logger.info(f"⏱️ Этапы установки: {summary} | всего {total:.1f} с")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import os
+import errno
+import shutil
+import logging
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # не Linux
+    fcntl = None
+
+logger = logging.getLogger('StagingArea')
+
+
+class StagingArea:
+    """
+    Изолированная папка установки одной игры.
+    Загрузка и распаковка идут в users/games/.staging/<game_id>,
+    при успехе папка атомарно переименовывается в users/games/<PLATFORM>/<game_id>.
+    """
+
+    STAGING_DIR_NAME = '.staging'
+
+    def __init__(self, platform_dir: Path, game_id: str):
+        self.platform_dir = Path(platform_dir)
+        self.game_id = game_id
+        self.path = self.platform_dir.parent / self.STAGING_DIR_NAME / game_id
+        self.final_path = self.platform_dir / game_id
+        self.lock_path = self.path.with_name(f"{game_id}.lock")
+        self._lock_fd = None
+
+    def prepare(self) -> Path:
+        """Создает папку staging (существующая остается для докачки)"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        logger.info(f"📁 Staging папка: {self.path}")
+        return self.path
+
+    def acquire(self) -> bool:
+        """
+        Занимает staging игры на время установки. False, если игру уже
+        устанавливает другой поток или процесс (диалог установки и очередь).
+        """
+        if fcntl is None:
+            return True
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = open(self.lock_path, 'w')
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_fd.close()
+            logger.warning(f"⚠️ Игра уже устанавливается: {self.game_id}")
+            return False
+        self._lock_fd = lock_fd
+        return True
+
+    def release(self):
+        """Освобождает staging игры"""
+        if self._lock_fd is not None:
+            self._lock_fd.close()
+            self._lock_fd = None
+
+    def translate(self, path: Path) -> Path:
+        """Переводит путь внутри staging в путь внутри итоговой папки"""
+        path = Path(path)
+        try:
+            return self.final_path / path.relative_to(self.path)
+        except ValueError:
+            return path
+
+    def promote(self) -> Path:
+        """
+        Переносит staging в итоговую папку игры одним rename.
+        Предыдущая установка той же игры заменяется целиком.
+        """
+        self.final_path.parent.mkdir(parents=True, exist_ok=True)
+
+        old_path = None
+        if self.final_path.exists():
+            old_path = self.final_path.with_name(f".{self.game_id}.old-{int(time.time())}")
+            os.rename(self.final_path, old_path)
+            logger.info(f"♻️ Предыдущая установка отложена: {old_path}")
+
+        try:
+            os.rename(self.path, self.final_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                if old_path:
+                    os.rename(old_path, self.final_path)
+                raise
+            # Другой том (папка games - точка монтирования): переносим копированием
+            logger.warning("⚠️ Staging на другом томе, перенос копированием")
+            try:
+                shutil.copytree(self.path, self.final_path, symlinks=True)
+            except BaseException:
+                # Копия недописана: убираем ее и возвращаем предыдущую установку,
+                # staging остается на месте для повторной попытки
+                shutil.rmtree(self.final_path, ignore_errors=True)
+                if old_path:
+                    os.rename(old_path, self.final_path)
+                raise
+            shutil.rmtree(self.path, ignore_errors=True)
+
+        if old_path:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+        logger.info(f"✅ Установка перенесена: {self.final_path}")
+        return self.final_path
+
+    def discard(self):
+        """Удаляет staging папку (отмена установки)"""
+        if self.path.exists():
+            shutil.rmtree(self.path, ignore_errors=True)
+            logger.info(f"🗑️ Staging папка удалена: {self.path}")
@@ -7,6 +7,9 @@ from typing import Dict, List, Any, Optional
 # Импорт путей к игровым данным
 from core import get_users_path
 from core import get_users_subpath
+from core import load_installed_games
+
+from .library_verifier import LibraryVerifier
 
 logger = logging.getLogger('GameData')
 
@@ -27,6 +30,7 @@ class GameDataManager:
 
         self.registry_games = self._load_registry_games()
         self.installed_games = self._load_installed_games()
+        self.integrity = self._load_integrity()
 
         logger.info(f"[GameData] ✅ Загружено {len(self.registry_games)} игр из реестра")
         logger.info(f"[GameData] ✅ Загружено {len(self.installed_games)} установленных игр")
@@ -47,16 +51,46 @@ class GameDataManager:
         """Загружает установленные игры"""
         try:
             if self.installed_games_file.exists():
-                with open(self.installed_games_file, 'r', encoding='utf-8') as f:
-                    games = json.load(f)
-                    logger.info(f"[GameData] 📋 Установленные игры успешно загружены")
-                    return games
+                games = load_installed_games(self.installed_games_file)
+                logger.info(f"[GameData] 📋 Установленные игры успешно загружены")
+                return games
             else:
                 logger.info(f"[GameData] 📋 Файл установленных игр не найден, создадим новый при установке")
         except Exception as e:
             logger.error(f"[GameData] ❌ Ошибка загрузки установленных игр: {e}")
         return {}
 
+    def _load_integrity(self) -> Dict[str, Dict[str, Any]]:
+        """Результаты последней проверки библиотеки"""
+        try:
+            return LibraryVerifier(self.installed_games).last_report()
+        except Exception as e:
+            logger.error(f"[GameData] ❌ Ошибка загрузки результатов проверки: {e}")
+            return {}
+
+    def _integrity_status(self, game_id: str, installed_data: Dict[str, Any]) -> str:
+        """ok / broken / missing: наличие пути установки и итог последней проверки"""
+        status = LibraryVerifier.quick_status(installed_data)
+        if status != 'ok':
+            return status
+        report = self.integrity.get(game_id) or {}
+        # Проверка до переустановки игры уже не актуальна
+        if report.get('checked', 0) < installed_data.get('install_date', 0):
+            return 'ok'
+        return report.get('status', 'ok')
+
+    def verify_library(self, deep: bool = False, full: bool = False,
+                       progress_callback=None, is_cancelled=None) -> Dict[str, Any]:
+        """Проверяет целостность установленных игр (см. LibraryVerifier.verify)"""
+        logger.info(f"[GameData] 🔍 Проверка библиотеки ({'полная' if deep else 'быстрая'})...")
+        catalog = {game.get('id'): game for game in self.registry_games if game.get('id')}
+        verifier = LibraryVerifier(self.installed_games, catalog)
+        report = verifier.verify(deep=deep, full=full, progress_callback=progress_callback,
+                                 is_cancelled=is_cancelled)
+        if not report.get('cancelled'):
+            self.integrity = report['games']
+        return report
+
     def get_platform_formats(self, platform: str) -> List[str]:
         """Возвращает поддерживаемые форматы для платформы"""
         try:
@@ -110,6 +144,11 @@ class GameDataManager:
                         'is_user_game': True  # Помечаем как пользовательскую, если нет в реестре
                     }
 
+                game_data['integrity'] = self._integrity_status(game_id, installed_data)
+                game_data['is_broken'] = game_data['integrity'] != 'ok'
+                if game_data['is_broken']:
+                    logger.warning(f"[GameData] ⚠️ Установка повреждена ({game_data['integrity']}): {game_id}")
+
                 result.append(game_data)
                 used_ids.add(game_id)
 
@@ -141,6 +180,8 @@ class GameDataManager:
 
         try:
             for root, dirs, files in os.walk(games_dir):
+                # Пропускаем служебные папки (.staging незавершенных установок)
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
                 for file in files:
                     if file.startswith('.') or '.' not in file:
                         continue
@@ -222,6 +263,7 @@ class GameDataManager:
         logger.info(f"[GameData] 🔄 Обновление данных менеджера...")
         self.registry_games = self._load_registry_games()
         self.installed_games = self._load_installed_games()
+        self.integrity = self._load_integrity()
         logger.info(f"[GameData] ✅ Данные обновлены")
 
     def get_installed_games(self) -> List[Dict[str, Any]]:
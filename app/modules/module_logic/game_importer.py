@@ -5,6 +5,9 @@ import json
 import logging
 from pathlib import Path
 
+from app.modules.installer.format_detector import detect_format
+from .storage_analyzer import find_identical_file
+
 # Настройка логирования
 logger = logging.getLogger('ArcadeDeck')
 
@@ -108,17 +111,23 @@ class GameImporter:
         return importer.get_file_dialog_filters()
 
     def detect_platform(self, file_path):
-        """Определяет платформу по расширению файла через RegistryLoader"""
+        """Определяет платформу по содержимому и расширению файла через RegistryLoader"""
         ext = os.path.splitext(file_path)[1].lower()
         logger.info(f"🔍 Определение платформы для: {file_path}")
         logger.info(f"📁 Расширение: {ext}")
 
-        if not ext:
+        # Содержимое уточняет расширение: .iso/.bin/.chd есть у многих платформ
+        platform_hint = detect_format(file_path).platform_hint
+
+        if not ext and not platform_hint:
             logger.warning("⚠️ Файл без расширения")
             return None
 
         # Если RegistryLoader не доступен, используем fallback
         if not self.registry_loader:
+            if platform_hint:
+                logger.info(f"✅ Платформа по содержимому: {platform_hint}")
+                return platform_hint.lower()
             logger.warning("🔄 Используем fallback detection")
             return self._fallback_detect_platform(ext)
 
@@ -126,12 +135,20 @@ class GameImporter:
             # Получаем все конфиги платформ
             platform_configs = self.registry_loader.get_all_platform_configs()
 
+            # Платформы, которые принимают это расширение
+            candidates = [platform_id for platform_id, config in platform_configs.items()
+                          if ext in config.get("supported_formats", [])]
+
+            # Содержимое выбирает среди подходящих по расширению платформ,
+            # но не перебивает расширение, которое платформа не поддерживает
+            if platform_hint in platform_configs and (not candidates or platform_hint in candidates):
+                logger.info(f"✅ Платформа по содержимому: {platform_hint}")
+                return platform_hint
+
             # Ищем платформу по расширению
-            for platform_id, config in platform_configs.items():
-                formats = config.get("supported_formats", [])
-                if ext in formats:
-                    logger.info(f"✅ СОВПАДЕНИЕ: {ext} -> {platform_id}")
-                    return platform_id
+            if candidates:
+                logger.info(f"✅ СОВПАДЕНИЕ: {ext} -> {candidates[0]}")
+                return candidates[0]
 
             # Если не нашли, пробуем fallback
             logger.warning(f"❌ Платформа не найдена в реестре для {ext}")
@@ -234,16 +251,22 @@ class GameImporter:
         # Копируем файл в соответствующую директорию платформы
         filename = os.path.basename(file_path)
         new_path = os.path.join(platform_dir, filename)
-
-        # Если файл уже существует, добавляем суффикс
-        counter = 1
         base_name, ext = os.path.splitext(filename)
-        while os.path.exists(new_path):
-            new_path = os.path.join(platform_dir, f"{base_name}_{counter}{ext}")
-            counter += 1
 
-        logger.info(f"📋 Копируем файл в: {new_path}")
-        shutil.copy2(file_path, new_path)
+        # Такой же файл уже импортирован - используем его вместо копии name_1
+        existing_path = find_identical_file(file_path, platform_dir)
+        if existing_path:
+            new_path = existing_path
+            logger.info(f"♻️ Файл уже есть в библиотеке: {new_path}")
+        else:
+            # Если файл уже существует, добавляем суффикс
+            counter = 1
+            while os.path.exists(new_path):
+                new_path = os.path.join(platform_dir, f"{base_name}_{counter}{ext}")
+                counter += 1
+
+            logger.info(f"📋 Копируем файл в: {new_path}")
+            shutil.copy2(file_path, new_path)
 
         # Создаем метаданные игры
         title = base_name.replace('_', ' ').title()
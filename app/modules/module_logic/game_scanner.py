@@ -99,6 +99,8 @@ def _fallback_scan_games(games_dir=None) -> List[Dict[str, Any]]:
         # Рекурсивный поиск игр во вложенных папках
         file_count = 0
         for root, dirs, files in os.walk(scan_dir):
+            # Пропускаем служебные папки (.staging незавершенных установок)
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
             for file in files:
                 file_count += 1
                 file_path = os.path.join(root, file)
@@ -0,0 +1,306 @@
+import os
+import json
+import mmap
+import time
+import hashlib
+import logging
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+# Импорт путей к игровым данным
+from core import get_users_path
+from core import get_users_subpath
+from core import to_users_relative
+from core import load_installed_games
+
+from app.modules.installer.install_manifest import InstallManifest
+
+logger = logging.getLogger('LibraryVerifier')
+
+HASH_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def hash_file(path: str) -> Optional[str]:
+    """
+    sha1 файла через mmap (выполняется в процессе пула). Страницы читаются
+    ядром с упреждением, без копирования в буферы Python.
+    """
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return digest.hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, len(mapped), HASH_CHUNK_SIZE):
+                        digest.update(view[offset:offset + HASH_CHUNK_SIZE])
+                finally:
+                    view.release()
+    except (OSError, ValueError):
+        return None
+    return digest.hexdigest()
+
+
+class LibraryVerifier:
+    """
+    Проверка целостности установленных игр.
+
+    Быстрый проход сверяет наличие и размеры файлов с манифестом установки
+    (без манифеста - по install_path). Полный проход дополнительно считает
+    sha1 в пуле процессов и сравнивает с контрольными суммами каталога
+    (поле checksums игры в реестре) или с суммой прошлой проверки. Файлы,
+    у которых размер и mtime не изменились с прошлой проверки, повторно не
+    хешируются. Состояние хранится в users/library_verify.json.
+    """
+
+    STATE_NAME = 'library_verify.json'
+
+    def __init__(self, installed_games: Optional[Dict[str, Dict]] = None,
+                 catalog: Optional[Dict[str, Dict]] = None,
+                 state_path: Optional[Path] = None):
+        self.installed_games = installed_games if installed_games is not None else load_installed_games()
+        self.catalog = catalog or {}
+        self.state_path = Path(state_path) if state_path else Path(get_users_path()) / self.STATE_NAME
+        self.state = self._load_state()
+
+    # --- состояние ---
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            state.setdefault('files', {})
+            state.setdefault('games', {})
+            return state
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.state_path}: {e}")
+        return {'files': {}, 'games': {}}
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def last_report(self) -> Dict[str, Dict]:
+        """Результаты последней проверки по играм (без обращения к файлам игр)"""
+        return self.state.get('games', {})
+
+    # --- файлы игры ---
+
+    @staticmethod
+    def game_files(game_id: str, game_info: Dict) -> Dict[Path, Optional[int]]:
+        """Файлы игры с ожидаемыми размерами: из манифеста, иначе из install_path"""
+        manifest_path = game_info.get('manifest_path')
+        manifest = InstallManifest.load(game_id, Path(manifest_path) if manifest_path else None)
+        install_path = Path(game_info.get('install_path') or '')
+        if manifest and manifest.entries:
+            root = LibraryVerifier.manifest_root(manifest, install_path)
+            return {root / rel: size for rel, size in manifest.entries.items()}
+
+        files: Dict[Path, Optional[int]] = {}
+        if install_path.is_dir():
+            for dirpath, _, filenames in os.walk(install_path):
+                for filename in filenames:
+                    files[Path(dirpath) / filename] = None
+        elif str(install_path) not in ('', '.'):
+            files[install_path] = None
+            disc_set = game_info.get('disc_set') or {}
+            for disc in disc_set.get('discs', []):
+                files[install_path.parent / disc] = None
+        return files
+
+    @staticmethod
+    def manifest_root(manifest: InstallManifest, install_path: Path) -> Path:
+        """
+        Корень файлов манифеста. Манифесты старого формата хранят абсолютный
+        корень, который после переноса users указывает в старое место, - тогда
+        корень выводится из текущего install_path.
+        """
+        if manifest.root.is_dir() or str(install_path) in ('', '.'):
+            return manifest.root
+
+        install = install_path.as_posix()
+        for rel in manifest.entries:
+            if install.endswith('/' + rel):
+                return Path(install[:-len(rel) - 1])
+
+        # Папочная установка (PS3): install_path - папка внутри корня
+        sample = next(iter(manifest.entries))
+        for candidate in [install_path, *list(install_path.parents)[:3]]:
+            if (candidate / sample).exists():
+                return candidate
+        return manifest.root
+
+    def _expected_hash(self, game_id: str, file_path: Path, root: Path) -> Optional[str]:
+        """sha1 из каталога: checksums {имя или путь относительно папки игры: sha1}"""
+        checksums = (self.catalog.get(game_id) or {}).get('checksums') or {}
+        if not checksums:
+            return None
+        try:
+            relative = file_path.relative_to(root).as_posix()
+        except ValueError:
+            relative = file_path.name
+        value = checksums.get(relative) or checksums.get(file_path.name)
+        return value.lower() if value else None
+
+    # --- проверка ---
+
+    def verify(self, deep: bool = False, full: bool = False, workers: Optional[int] = None,
+               progress_callback: Optional[Callable[[int, str], None]] = None,
+               is_cancelled: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Проверяет библиотеку. deep - считать sha1, full - хешировать и
+        неизменившиеся файлы. Возвращает {'games': {game_id: результат},
+        'orphaned': {...}, 'hashed': n, 'skipped': n}; статус игры - ok,
+        broken (файлы отсутствуют, другого размера или с другой суммой)
+        или missing (нет папки/файла установки).
+        """
+        users_path = get_users_path()
+        files_state = self.state['files']
+        games = {}
+        pending: Dict[str, Dict] = {}
+
+        # Быстрый проход: stat каждого файла
+        for game_id, game_info in self.installed_games.items():
+            if not isinstance(game_info, dict):
+                continue
+            install_path = Path(game_info.get('install_path') or '')
+            result = {'status': 'ok', 'missing': [], 'size_mismatch': [], 'hash_mismatch': [],
+                      'files': 0, 'checked': time.time()}
+            games[game_id] = result
+
+            if str(install_path) in ('', '.') or not install_path.exists():
+                result['status'] = 'missing'
+                continue
+
+            root = install_path if install_path.is_dir() else install_path.parent
+            for file_path, size in self.game_files(game_id, game_info).items():
+                result['files'] += 1
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    result['missing'].append(str(file_path))
+                    continue
+                if size is not None and st.st_size != size:
+                    result['size_mismatch'].append(str(file_path))
+                    continue
+                if not deep:
+                    continue
+
+                key = to_users_relative(file_path, users_path)
+                record = files_state.get(key)
+                expected = self._expected_hash(game_id, file_path, root)
+                unchanged = (record and record.get('size') == st.st_size
+                             and record.get('mtime_ns') == st.st_mtime_ns and record.get('sha1'))
+                if unchanged and not full:
+                    if expected and record['sha1'] != expected:
+                        result['hash_mismatch'].append(str(file_path))
+                    continue
+                pending[str(file_path)] = {
+                    'game_id': game_id, 'key': key, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                    'expected': expected or (record or {}).get('sha1')
+                }
+
+        # Полный проход: sha1 изменившихся файлов в пуле процессов
+        hashed = 0
+        cancelled = False
+        if pending:
+            workers = workers or min(len(pending), os.cpu_count() or 1, 4)
+            total_bytes = max(sum(item['size'] for item in pending.values()), 1)
+            done_bytes = 0
+            logger.info(f"🔍 Хеширование {len(pending)} файлов ({total_bytes / (1024 ** 3):.1f} GB), процессов: {workers}")
+
+            # fork: процессы пула только читают файлы и не трогают Qt,
+            # а spawn заново выполнил бы app.py со всеми импортами интерфейса
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {pool.submit(hash_file, path): path for path in pending}
+                for future in as_completed(futures):
+                    if is_cancelled and is_cancelled():
+                        logger.info("⏹️ Проверка библиотеки отменена")
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        cancelled = True
+                        break
+
+                    path = futures[future]
+                    item = pending[path]
+                    sha1 = future.result()
+                    done_bytes += item['size']
+                    if progress_callback:
+                        percent = int(done_bytes * 100 / total_bytes)
+                        progress_callback(percent, f"Проверка файлов: {percent}%")
+
+                    if sha1 is None:
+                        games[item['game_id']]['missing'].append(path)
+                        continue
+                    hashed += 1
+                    if item['expected'] and sha1 != item['expected']:
+                        # Эталон остается прежним: поврежденный файл не становится новой нормой
+                        games[item['game_id']]['hash_mismatch'].append(path)
+                        continue
+                    files_state[item['key']] = {'game': item['game_id'], 'size': item['size'],
+                                                'mtime_ns': item['mtime_ns'], 'sha1': sha1}
+
+        # Записи о файлах удаленных игр больше не нужны (недоступный носитель - не удаление)
+        self.state['files'] = {key: value for key, value in files_state.items()
+                               if value.get('game') in self.installed_games}
+
+        # Уже посчитанные суммы сохраняются и при отмене - следующий проход их не повторит
+        if cancelled:
+            self._save_state()
+            return {'games': games, 'orphaned': {}, 'hashed': hashed, 'skipped': 0, 'cancelled': True}
+
+        for game_id, result in games.items():
+            if result['status'] == 'ok' and (result['missing'] or result['size_mismatch'] or result['hash_mismatch']):
+                result['status'] = 'broken'
+            if result['status'] != 'ok':
+                logger.warning(f"⚠️ {game_id}: {result['status']} (нет: {len(result['missing'])}, "
+                               f"размер: {len(result['size_mismatch'])}, sha1: {len(result['hash_mismatch'])})")
+
+        self.state['games'] = games
+        self.state['checked'] = time.time()
+        self._save_state()
+
+        report = {
+            'games': games,
+            'orphaned': self.find_orphans(),
+            'hashed': hashed,
+            'skipped': sum(result['files'] for result in games.values()) - len(pending) if deep else 0,
+            'cancelled': False
+        }
+        broken = sum(1 for result in games.values() if result['status'] != 'ok')
+        logger.info(f"✅ Проверка библиотеки: игр {len(games)}, с ошибками {broken}, "
+                    f"хешировано {hashed}, пропущено без изменений {report['skipped']}")
+        return report
+
+    def find_orphans(self) -> Dict[str, List[str]]:
+        """Манифесты и лаунчеры, для которых нет записи в installed_games.json"""
+        installed = set(self.installed_games)
+        orphaned = {'manifests': [], 'launchers': []}
+
+        manifests_dir = InstallManifest.manifests_dir()
+        if manifests_dir.is_dir():
+            orphaned['manifests'] = sorted(str(path) for path in manifests_dir.glob('*.json')
+                                           if path.stem not in installed)
+
+        launchers_dir = Path(get_users_subpath('launchers'))
+        if launchers_dir.is_dir():
+            orphaned['launchers'] = sorted(str(path) for path in launchers_dir.iterdir()
+                                           if path.suffix in ('.sh', '.json') and not path.name.startswith('.')
+                                           and path.stem not in installed)
+        return orphaned
+
+    @staticmethod
+    def quick_status(game_info: Dict) -> str:
+        """Статус без обхода файлов: missing, если нет пути установки"""
+        install_path = game_info.get('install_path')
+        return 'ok' if install_path and os.path.exists(install_path) else 'missing'
@@ -0,0 +1,398 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # не Linux
+    fcntl = None
+
+# Импорт путей к игровым данным
+from core import get_users_path
+from core import get_users_subpath
+from core import to_users_relative
+from core import load_installed_games
+
+from app.modules.installer.config_sync import FICLONE
+from app.modules.installer.disc_sets import parse_cue
+from app.modules.installer.format_detector import detect_format
+from .library_verifier import LibraryVerifier, hash_file
+
+logger = logging.getLogger('StorageAnalyzer')
+
+ARCHIVE_SUFFIXES = {'.zip', '.7z', '.rar', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.zst'}
+
+# Мелкие файлы (сейвы, конфиги) не стоят хеширования
+MIN_DUPLICATE_SIZE = 1024 * 1024
+
+# Файлы, измененные недавно, могут еще записываться - их не трогаем
+ACTIVE_WINDOW = 3600
+
+HEAD_SIZE = 64 * 1024
+
+
+def head_digest(path: str) -> Optional[str]:
+    """sha1 первых 64 КБ: быстро отсеивает одинаковые по размеру, но разные файлы"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read(HEAD_SIZE)).hexdigest()
+    except OSError:
+        return None
+
+
+def find_identical_file(file_path: str, directory: str) -> Optional[str]:
+    """Файл в directory с тем же содержимым, что и file_path (сначала по размеру)"""
+    try:
+        size = os.stat(file_path).st_size
+        with os.scandir(directory) as it:
+            candidates = [entry.path for entry in it
+                          if entry.is_file(follow_symlinks=False) and entry.stat().st_size == size]
+    except OSError:
+        return None
+    if not candidates:
+        return None
+
+    head = head_digest(file_path)
+    candidates = [path for path in candidates if head_digest(path) == head]
+    if not candidates:
+        return None
+    digest = hash_file(file_path)
+    return next((path for path in candidates if digest and hash_file(path) == digest), None)
+
+
+class StorageAnalyzer:
+    """
+    Анализ занятого места в users/games.
+
+    Все файлы собираются одним обходом; кандидаты в дубликаты - только файлы
+    одинакового размера (гистограмма размеров), затем их отсеивает sha1
+    первых 64 КБ, и только оставшиеся хешируются целиком в пуле процессов.
+    Суммы, уже посчитанные проверкой библиотеки для неизменившихся файлов,
+    используются повторно. Файлы, на которые не ссылается ни одна запись
+    installed_games.json, считаются лишними, архивы среди них - устаревшими.
+    """
+
+    def __init__(self, games_dir: Optional[Path] = None,
+                 installed_games: Optional[Dict[str, Dict]] = None):
+        self.games_dir = Path(games_dir or get_users_subpath('games'))
+        self.installed_games = installed_games if installed_games is not None else load_installed_games()
+        self.referenced, self.referenced_dirs = self._referenced_paths()
+
+    # --- ссылки из installed_games.json ---
+
+    def _referenced_paths(self) -> Tuple[Set[str], List[str]]:
+        """
+        Файлы установленных игр и папки, которые целиком принадлежат игре:
+        users/games/<PLATFORM>/<game_id>, папка install_path и корень манифеста
+        ниже папки платформы. Сам install_path и диски набора учитываются
+        всегда, даже если манифест устарел.
+        """
+        files: Set[str] = set()
+        dirs: Set[str] = set()
+        for game_id, game_info in self.installed_games.items():
+            if not isinstance(game_info, dict):
+                continue
+            for platform_dir in self._platform_dirs():
+                dirs.add(os.path.normpath(str(platform_dir / game_id)))
+
+            install_path = Path(game_info.get('install_path') or '')
+            if str(install_path) not in ('', '.'):
+                files.add(os.path.normpath(str(install_path)))
+                game_dir = self._game_dir(install_path)
+                if game_dir:
+                    dirs.add(game_dir)
+                disc_set = game_info.get('disc_set') or {}
+                base_dir = install_path.parent
+                for value in [disc_set.get('entry'), disc_set.get('m3u'), *disc_set.get('discs', [])]:
+                    if value:
+                        files.add(os.path.normpath(str(base_dir / value)))
+
+            for file_path in LibraryVerifier.game_files(game_id, game_info):
+                files.add(os.path.normpath(str(file_path)))
+                game_dir = self._game_dir(Path(file_path))
+                if game_dir:
+                    dirs.add(game_dir)
+
+            if game_info.get('cover_path'):
+                files.add(os.path.normpath(game_info['cover_path']))
+
+        # Треки CUE не всегда попадают в манифест старых установок
+        for path in list(files):
+            if path.lower().endswith('.cue'):
+                files.update(os.path.normpath(str(track)) for track in parse_cue(Path(path)))
+        return files, sorted(dirs)
+
+    def _platform_dirs(self) -> List[Path]:
+        try:
+            return [Path(entry.path) for entry in os.scandir(self.games_dir)
+                    if entry.is_dir() and not entry.name.startswith('.')]
+        except OSError:
+            return []
+
+    def _game_dir(self, path: Path) -> Optional[str]:
+        """Папка игры users/games/<PLATFORM>/<папка> для пути внутри нее (не сама папка платформы)"""
+        try:
+            parts = Path(os.path.normpath(str(path))).relative_to(self.games_dir).parts
+        except ValueError:
+            return None
+        if len(parts) < 2 or (len(parts) == 2 and not os.path.isdir(path)):
+            return None
+        return os.path.normpath(str(self.games_dir / parts[0] / parts[1]))
+
+    def is_referenced(self, path: str) -> bool:
+        """Файл принадлежит установленной игре: удалять его нельзя"""
+        path = os.path.normpath(path)
+        return path in self.referenced or any(
+            path == directory or path.startswith(directory + os.sep) for directory in self.referenced_dirs)
+
+    # --- анализ ---
+
+    def _walk(self) -> List[Dict]:
+        """Все файлы users/games, кроме служебных (.staging, временные файлы)"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.games_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if not os.path.isfile(path) or os.path.islink(path):
+                    continue
+                files.append({'path': path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                              'inode': (st.st_dev, st.st_ino)})
+        return files
+
+    def _known_hashes(self) -> Dict[str, Dict]:
+        """Суммы из users/library_verify.json (по относительному пути)"""
+        try:
+            return LibraryVerifier(self.installed_games).state.get('files', {})
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прочитать суммы проверки библиотеки: {e}")
+            return {}
+
+    def find_duplicates(self, files: List[Dict], workers: Optional[int] = None,
+                        progress_callback: Optional[Callable[[int, str], None]] = None,
+                        is_cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """Группы одинаковых файлов: [{'sha1', 'size', 'keep', 'copies': [...]}]"""
+        # Жесткие ссылки уже делят данные - один путь на inode
+        by_size: Dict[int, List[Dict]] = {}
+        inodes = set()
+        for item in files:
+            if item['size'] < MIN_DUPLICATE_SIZE or item['inode'] in inodes:
+                continue
+            inodes.add(item['inode'])
+            by_size.setdefault(item['size'], []).append(item)
+        candidates = [item for group in by_size.values() if len(group) > 1 for item in group]
+        if not candidates:
+            return []
+
+        by_head: Dict[Tuple[int, str], List[Dict]] = {}
+        for item in candidates:
+            head = head_digest(item['path'])
+            if head:
+                by_head.setdefault((item['size'], head), []).append(item)
+        candidates = [item for group in by_head.values() if len(group) > 1 for item in group]
+
+        users_path = get_users_path()
+        known = self._known_hashes()
+        digests: Dict[str, str] = {}
+        pending = []
+        for item in candidates:
+            record = known.get(to_users_relative(item['path'], users_path)) or {}
+            if record.get('size') == item['size'] and record.get('mtime_ns') == item['mtime_ns'] and record.get('sha1'):
+                digests[item['path']] = record['sha1']
+            else:
+                pending.append(item)
+
+        if pending:
+            workers = workers or min(len(pending), os.cpu_count() or 1, 4)
+            total_bytes = max(sum(item['size'] for item in pending), 1)
+            done_bytes = 0
+            logger.info(f"🔍 Хеширование {len(pending)} кандидатов в дубликаты "
+                        f"({total_bytes / (1024 ** 3):.1f} GB), процессов: {workers}")
+
+            # fork: как и в проверке библиотеки, без повторного выполнения app.py
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {pool.submit(hash_file, item['path']): item for item in pending}
+                for future in as_completed(futures):
+                    if is_cancelled and is_cancelled():
+                        logger.info("⏹️ Анализ места отменен")
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        return []
+                    item = futures[future]
+                    digest = future.result()
+                    if digest:
+                        digests[item['path']] = digest
+                    done_bytes += item['size']
+                    if progress_callback:
+                        percent = int(done_bytes * 100 / total_bytes)
+                        progress_callback(percent, f"Поиск дубликатов: {percent}%")
+
+        groups: Dict[str, List[Dict]] = {}
+        for item in candidates:
+            if item['path'] in digests:
+                groups.setdefault(digests[item['path']], []).append(item)
+
+        duplicates = []
+        for digest, group in groups.items():
+            if len(group) < 2:
+                continue
+            # Оставляем файл, на который ссылается установка, затем без суффикса _N, затем старший
+            group.sort(key=lambda item: (not self.is_referenced(item['path']), len(Path(item['path']).stem),
+                                         item['mtime_ns']))
+            duplicates.append({
+                'sha1': digest,
+                'size': group[0]['size'],
+                'keep': group[0]['path'],
+                'copies': [item['path'] for item in group[1:]]
+            })
+        return duplicates
+
+    def analyze(self, workers: Optional[int] = None,
+                progress_callback: Optional[Callable[[int, str], None]] = None,
+                is_cancelled: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Возвращает {'total_size', 'duplicates', 'orphans', 'archives', 'reclaimable'}.
+        orphans и archives - файлы без записи об установке ({'path', 'size'}),
+        reclaimable - сколько байт освободит reclaim() со всеми категориями.
+        """
+        started = time.time()
+        files = self._walk()
+        now = time.time()
+
+        orphans, archives = [], []
+        for item in files:
+            if self.is_referenced(item['path']) or now - item['mtime_ns'] / 1e9 < ACTIVE_WINDOW:
+                continue
+            entry = {'path': item['path'], 'size': item['size']}
+            if Path(item['path']).suffix.lower() in ARCHIVE_SUFFIXES or detect_format(item['path']).is_archive:
+                archives.append(entry)
+            else:
+                orphans.append(entry)
+
+        duplicates = self.find_duplicates(files, workers, progress_callback, is_cancelled)
+
+        # Копия-сирота считается один раз - в дубликатах
+        duplicate_copies = {path for group in duplicates for path in group['copies']}
+        orphans = [entry for entry in orphans if entry['path'] not in duplicate_copies]
+        archives = [entry for entry in archives if entry['path'] not in duplicate_copies]
+
+        report = {
+            'total_size': sum(item['size'] for item in files),
+            'duplicates': duplicates,
+            'orphans': orphans,
+            'archives': archives,
+            'reclaimable': (sum(group['size'] * len(group['copies']) for group in duplicates)
+                            + sum(entry['size'] for entry in orphans + archives))
+        }
+        logger.info(f"📊 users/games: {report['total_size'] / (1024 ** 3):.1f} GB, дубликатов {len(duplicate_copies)}, "
+                    f"лишних файлов {len(orphans)}, архивов {len(archives)}, можно освободить "
+                    f"{report['reclaimable'] / (1024 ** 3):.1f} GB ({time.time() - started:.1f} с)")
+        return report
+
+    # --- освобождение места ---
+
+    def _remove(self, path: str, size: int) -> int:
+        """Удаляет файл, если он не изменился с анализа и на него не появилась ссылка"""
+        try:
+            if os.stat(path).st_size != size or self.is_referenced(path):
+                logger.warning(f"⚠️ {path} изменился после анализа, пропускаем")
+                return 0
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось удалить {path}: {e}")
+            return 0
+
+        # Пустые папки внутри users/games
+        directory = Path(path).parent
+        while directory != self.games_dir and self.games_dir in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+        return size
+
+    def reclaim(self, report: Dict, duplicates: bool = True, orphans: bool = True,
+                archives: bool = True) -> int:
+        """
+        Удаляет выбранные категории из отчета analyze(). Копии, на которые
+        ссылается установка, не удаляются, а связываются с оригиналом через
+        dedupe(). Возвращает число освобожденных байт.
+        """
+        freed = 0
+        if duplicates:
+            for group in report.get('duplicates', []):
+                for path in group['copies']:
+                    if not self.is_referenced(path):
+                        freed += self._remove(path, group['size'])
+            freed += self.dedupe(report, referenced_only=True)
+        for category, enabled in (('orphans', orphans), ('archives', archives)):
+            if enabled:
+                for entry in report.get(category, []):
+                    freed += self._remove(entry['path'], entry['size'])
+        logger.info(f"🧹 Освобождено {freed / (1024 ** 3):.2f} GB")
+        return freed
+
+    def _link(self, source: str, target: str) -> Optional[str]:
+        """Заменяет target ссылкой на данные source: reflink, иначе жесткая ссылка"""
+        tmp_path = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.dedupe")
+        method = None
+        if fcntl is not None:
+            try:
+                with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                shutil.copystat(target, tmp_path)
+                method = 'reflink'
+            except OSError:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        if method is None:
+            try:
+                os.link(source, tmp_path)
+                method = 'hardlink'
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось связать {target} с {source}: {e}")
+                return None
+        os.replace(tmp_path, target)
+        return method
+
+    def dedupe(self, report: Dict, referenced_only: bool = False) -> int:
+        """
+        Оставляет одну копию данных для каждой группы дубликатов: копии
+        заменяются reflink-клоном (btrfs/xfs) или жесткой ссылкой на
+        оригинал, пути для установок не меняются. Возвращает освобожденные байты.
+        """
+        freed = 0
+        for group in report.get('duplicates', []):
+            for path in group['copies']:
+                if referenced_only and not self.is_referenced(path):
+                    continue
+                try:
+                    if os.stat(path).st_size != group['size'] or os.path.samefile(path, group['keep']):
+                        continue
+                except OSError:
+                    continue
+                if head_digest(path) != head_digest(group['keep']):
+                    logger.warning(f"⚠️ {path} изменился после анализа, пропускаем")
+                    continue
+                method = self._link(group['keep'], path)
+                if method:
+                    freed += group['size']
+                    logger.info(f"🔗 {Path(path).name} -> {Path(group['keep']).name} ({method})")
+        return freed
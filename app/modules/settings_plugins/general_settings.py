@@ -6,7 +6,7 @@ from pathlib import Path
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QFileDialog, QMessageBox, QFrame, QSizePolicy
+    QFileDialog, QMessageBox, QFrame, QSizePolicy, QCheckBox, QSpinBox
 )
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt, pyqtSignal
@@ -421,4 +421,44 @@ class GeneralSettingsPage(QWidget):
         info_label.setFont(QFont("Arial", 10))
         layout.addWidget(info_label)
 
+        # Установка и запуск игр
+        install_title = QLabel("Установка и запуск")
+        install_title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        install_title.setFont(QFont("Arial", 14, QFont.Weight.Bold))
+        layout.addWidget(install_title)
+
+        self.keep_archives_checkbox = QCheckBox("Сохранять скачанные архивы после распаковки")
+        self.keep_archives_checkbox.setChecked(app_settings.get_keep_archives())
+        self.keep_archives_checkbox.toggled.connect(app_settings.set_keep_archives)
+        layout.addWidget(self.keep_archives_checkbox)
+
+        self.prelaunch_cache_checkbox = QCheckBox("Готовить запуск игры, пока открыта ее страница")
+        self.prelaunch_cache_checkbox.setChecked(app_settings.get_prelaunch_cache())
+        self.prelaunch_cache_checkbox.toggled.connect(app_settings.set_prelaunch_cache)
+        layout.addWidget(self.prelaunch_cache_checkbox)
+
+        downloads_layout = QHBoxLayout()
+        downloads_label = QLabel("Одновременных загрузок:")
+        downloads_label.setFont(QFont("Arial", 10))
+        downloads_layout.addWidget(downloads_label)
+
+        self.max_downloads_spinbox = QSpinBox()
+        self.max_downloads_spinbox.setRange(1, 8)
+        self.max_downloads_spinbox.setValue(app_settings.get_max_parallel_downloads())
+        self.max_downloads_spinbox.valueChanged.connect(app_settings.set_max_parallel_downloads)
+        downloads_layout.addWidget(self.max_downloads_spinbox)
+        downloads_layout.addStretch(1)
+        layout.addLayout(downloads_layout)
+
+        install_info = QLabel(
+            "• Если архивы не сохраняются, архив удаляется после проверенной распаковки\n"
+            "• Подготовка запуска распаковывает AppImage эмулятора и подгружает образ игры "
+            "в память, пока открыта страница игры\n"
+            "• Число одновременных загрузок применяется после перезапуска ArcadeDeck"
+        )
+        install_info.setWordWrap(True)
+        install_info.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        install_info.setFont(QFont("Arial", 10))
+        layout.addWidget(install_info)
+
         layout.addStretch(1)
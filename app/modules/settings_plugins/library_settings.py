@@ -0,0 +1,334 @@
+import logging
+
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QProgressBar, QMessageBox
+)
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+
+from app.modules.module_logic.game_data_manager import get_game_data_manager
+from app.modules.module_logic.storage_analyzer import StorageAnalyzer
+
+# Название модуля в логе
+logger = logging.getLogger('Плагин настроек библиотеки')
+
+
+class LibraryTaskWorker(QThread):
+    """Поток для долгой операции над библиотекой (проверка, анализ места)"""
+    progress_update = pyqtSignal(int, str)
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, task):
+        super().__init__()
+        # task(progress_callback, is_cancelled) -> результат
+        self.task = task
+        self.cancelled = False
+
+    def run(self):
+        try:
+            result = self.task(self.progress_update.emit, lambda: self.cancelled)
+            self.finished.emit(result, "")
+        except Exception as e:
+            logger.error(f"❌ Ошибка операции над библиотекой: {e}")
+            self.finished.emit(None, str(e))
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class LibrarySettingsPage(QWidget):
+    """Страница обслуживания библиотеки: проверка целостности и освобождение места"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker = None
+        self.analyzer = None
+        self.storage_report = None
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(20)
+
+        title = QLabel("Библиотека")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        layout.addWidget(title)
+
+        # Проверка целостности
+        verify_title = QLabel("Проверка установленных игр")
+        verify_title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        verify_title.setFont(QFont("Arial", 14, QFont.Weight.Bold))
+        layout.addWidget(verify_title)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.setSpacing(20)
+        buttons_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.quick_verify_btn = QPushButton("Быстрая проверка")
+        self.quick_verify_btn.clicked.connect(lambda: self.start_verify(deep=False))
+        buttons_layout.addWidget(self.quick_verify_btn)
+
+        self.deep_verify_btn = QPushButton("Полная проверка")
+        self.deep_verify_btn.clicked.connect(lambda: self.start_verify(deep=True))
+        buttons_layout.addWidget(self.deep_verify_btn)
+
+        layout.addLayout(buttons_layout)
+
+        verify_info = QLabel(
+            "• Быстрая проверка - наличие и размер файлов каждой игры\n"
+            "• Полная проверка - дополнительно контрольные суммы (sha1), "
+            "повторно хешируются только изменившиеся файлы"
+        )
+        verify_info.setWordWrap(True)
+        verify_info.setFont(QFont("Arial", 10))
+        layout.addWidget(verify_info)
+
+        # Освобождение места в users/games
+        storage_title = QLabel("Место на диске")
+        storage_title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        storage_title.setFont(QFont("Arial", 14, QFont.Weight.Bold))
+        layout.addWidget(storage_title)
+
+        storage_layout = QHBoxLayout()
+        storage_layout.setSpacing(20)
+        storage_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.analyze_btn = QPushButton("Анализ места")
+        self.analyze_btn.clicked.connect(self.start_analyze)
+        storage_layout.addWidget(self.analyze_btn)
+
+        self.dedupe_btn = QPushButton("Объединить дубликаты")
+        self.dedupe_btn.clicked.connect(self.start_dedupe)
+        storage_layout.addWidget(self.dedupe_btn)
+
+        self.reclaim_btn = QPushButton("Освободить место")
+        self.reclaim_btn.clicked.connect(self.start_reclaim)
+        storage_layout.addWidget(self.reclaim_btn)
+
+        layout.addLayout(storage_layout)
+
+        storage_info = QLabel(
+            "• Анализ - поиск дубликатов, файлов без установленной игры и оставшихся архивов\n"
+            "• Объединить дубликаты - копии заменяются ссылками на один файл, пути игр не меняются\n"
+            "• Освободить место - удаляет найденные лишние файлы после подтверждения"
+        )
+        storage_info.setWordWrap(True)
+        storage_info.setFont(QFont("Arial", 10))
+        layout.addWidget(storage_info)
+
+        # Прогресс текущей операции
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.status_label.setFont(QFont("Arial", 10))
+        layout.addWidget(self.status_label)
+
+        cancel_layout = QHBoxLayout()
+        cancel_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.cancel_btn = QPushButton("Отмена")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_task)
+        cancel_layout.addWidget(self.cancel_btn)
+        layout.addLayout(cancel_layout)
+
+        layout.addStretch(1)
+        self.set_busy(False)
+
+    # --- выполнение операций в потоке ---
+
+    def run_task(self, task, on_finished, message):
+        """Запускает task в LibraryTaskWorker, блокируя кнопки до завершения"""
+        if self.worker and self.worker.isRunning():
+            return
+        self.set_busy(True)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(message)
+
+        self.worker = LibraryTaskWorker(task)
+        self.worker.progress_update.connect(self.update_progress)
+        self.worker.finished.connect(on_finished)
+        self.worker.start()
+
+    def set_busy(self, busy):
+        """Переключает страницу между ожиданием и выполнением операции"""
+        for button in self.action_buttons():
+            button.setEnabled(not busy)
+        # Действия над отчетом доступны только после анализа
+        has_report = bool(self.storage_report and self.storage_report['reclaimable'])
+        self.dedupe_btn.setEnabled(not busy and has_report and bool(self.storage_report['duplicates']))
+        self.reclaim_btn.setEnabled(not busy and has_report)
+        self.progress_bar.setVisible(busy)
+        self.cancel_btn.setVisible(busy)
+        self.cancel_btn.setEnabled(busy)
+
+    def action_buttons(self):
+        """Кнопки, запускающие операции"""
+        return [self.quick_verify_btn, self.deep_verify_btn, self.analyze_btn]
+
+    def update_progress(self, percent, message):
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(message)
+
+    def cancel_task(self):
+        """Отменяет текущую операцию"""
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Отмена...")
+
+    def task_failed(self, error):
+        """Общая обработка ошибки операции"""
+        self.status_label.setText(f"Ошибка: {error}")
+        QMessageBox.warning(self, "Ошибка", f"Операция не выполнена:\n{error}")
+
+    # --- проверка библиотеки ---
+
+    def start_verify(self, deep):
+        """Запускает проверку целостности установленных игр"""
+        manager = get_game_data_manager()
+        if manager is None:
+            QMessageBox.warning(self, "Проверка библиотеки", "Менеджер данных игр не инициализирован")
+            return
+
+        logger.info(f"🔍 Запуск проверки библиотеки из настроек ({'полная' if deep else 'быстрая'})")
+        self.run_task(
+            lambda progress, cancelled: manager.verify_library(
+                deep=deep, progress_callback=progress, is_cancelled=cancelled),
+            self.verify_finished,
+            "Проверка библиотеки..."
+        )
+
+    def verify_finished(self, report, error):
+        """Показывает итог проверки библиотеки"""
+        self.set_busy(False)
+        if error:
+            self.task_failed(error)
+            return
+        if report.get('cancelled'):
+            self.status_label.setText("Проверка отменена")
+            return
+
+        games = report.get('games', {})
+        broken = sorted(game_id for game_id, result in games.items() if result.get('status') == 'broken')
+        missing = sorted(game_id for game_id, result in games.items() if result.get('status') == 'missing')
+        orphaned = report.get('orphaned', {})
+        orphaned_count = len(orphaned.get('manifests', [])) + len(orphaned.get('launchers', []))
+
+        summary = (
+            f"Проверено игр: {len(games)}\n"
+            f"Исправны: {len(games) - len(broken) - len(missing)}\n"
+            f"Повреждены: {len(broken)}\n"
+            f"Не найдены: {len(missing)}\n"
+            f"Лишних манифестов и ярлыков: {orphaned_count}"
+        )
+        if report.get('hashed'):
+            summary += f"\nПересчитано контрольных сумм: {report['hashed']}"
+        self.status_label.setText(summary)
+
+        details = ""
+        if broken:
+            details += "\n\nПовреждены (требуют переустановки):\n" + "\n".join(f"• {game_id}" for game_id in broken)
+        if missing:
+            details += "\n\nНе найдены:\n" + "\n".join(f"• {game_id}" for game_id in missing)
+
+        if broken or missing:
+            QMessageBox.warning(self, "Проверка библиотеки", summary + details)
+        else:
+            QMessageBox.information(self, "Проверка библиотеки", summary)
+
+    # --- место на диске ---
+
+    @staticmethod
+    def format_size(size):
+        return f"{size / (1024 ** 3):.2f} GB"
+
+    def start_analyze(self):
+        """Запускает анализ занятого места в users/games"""
+        logger.info("📊 Запуск анализа места из настроек")
+        self.storage_report = None
+
+        def analyze(progress, cancelled):
+            self.analyzer = StorageAnalyzer()
+            return self.analyzer.analyze(progress_callback=progress, is_cancelled=cancelled)
+
+        self.run_task(analyze, self.analyze_finished, "Анализ места...")
+
+    def analyze_finished(self, report, error):
+        """Сохраняет отчет анализа и показывает, сколько места можно освободить"""
+        if error:
+            self.set_busy(False)
+            self.task_failed(error)
+            return
+        if self.worker.cancelled:
+            self.set_busy(False)
+            self.status_label.setText("Анализ отменен")
+            return
+
+        self.storage_report = report
+        self.set_busy(False)
+        self.status_label.setText(self.storage_summary(report))
+
+    def storage_summary(self, report):
+        """Текст отчета analyze() по категориям"""
+        duplicates = report['duplicates']
+        duplicates_size = sum(group['size'] * len(group['copies']) for group in duplicates)
+        copies = sum(len(group['copies']) for group in duplicates)
+        return (
+            f"Занято играми: {self.format_size(report['total_size'])}\n"
+            f"Дубликаты: {copies} ({self.format_size(duplicates_size)})\n"
+            f"Файлы без установленной игры: {len(report['orphans'])} "
+            f"({self.format_size(sum(entry['size'] for entry in report['orphans']))})\n"
+            f"Архивы: {len(report['archives'])} "
+            f"({self.format_size(sum(entry['size'] for entry in report['archives']))})\n"
+            f"Можно освободить: {self.format_size(report['reclaimable'])}"
+        )
+
+    def start_dedupe(self):
+        """Заменяет копии-дубликаты ссылками на один файл"""
+        if not self.storage_report:
+            return
+        report, analyzer = self.storage_report, self.analyzer
+        self.run_task(lambda progress, cancelled: analyzer.dedupe(report),
+                      self.storage_action_finished, "Объединение дубликатов...")
+        # Файлы заменяются по одному атомарно, прерывать нечего
+        self.cancel_btn.setEnabled(False)
+
+    def start_reclaim(self):
+        """Удаляет лишние файлы из отчета анализа после подтверждения"""
+        if not self.storage_report:
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "Освобождение места",
+            f"{self.storage_summary(self.storage_report)}\n\n"
+            "Дубликаты, файлы без установленной игры и архивы будут удалены.\n"
+            "Внимание: удаление нельзя отменить!",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        report, analyzer = self.storage_report, self.analyzer
+        self.run_task(lambda progress, cancelled: analyzer.reclaim(report),
+                      self.storage_action_finished, "Освобождение места...")
+        self.cancel_btn.setEnabled(False)
+
+    def storage_action_finished(self, freed, error):
+        """Итог освобождения места; отчет устарел и требует нового анализа"""
+        self.storage_report = None
+        self.set_busy(False)
+        if error:
+            self.task_failed(error)
+            return
+        message = f"Освобождено: {self.format_size(freed)}"
+        self.status_label.setText(message)
+        QMessageBox.information(self, "Место на диске", message)
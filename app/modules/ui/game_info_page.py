@@ -172,6 +172,7 @@ class GameInfoPage(QWidget):
         self.rating_label = self._create_meta_label("⭐ Рейтинг: —")
         self.developer_label = self._create_meta_label("👨‍💻 Разработчик: —")
         self.genre_label = self._create_meta_label("🎭 Жанр: —")
+        self.play_time_label = self._create_meta_label("⏱️ Время в игре: —")
 
         # Распределяем по 2 колонкам для лучшего отображения
         meta_layout.addWidget(self.platform_label, 0, 0)
@@ -181,6 +182,7 @@ class GameInfoPage(QWidget):
         meta_layout.addWidget(self.language_label, 2, 0)
         meta_layout.addWidget(self.genre_label, 2, 1)
         meta_layout.addWidget(self.developer_label, 3, 0, 1, 2)  # Занимает обе колонки
+        meta_layout.addWidget(self.play_time_label, 4, 0, 1, 2)
 
         return meta_panel
 
@@ -332,10 +334,22 @@ class GameInfoPage(QWidget):
         self.developer_label.setText(f"👨‍💻 Разработчик: {self.game_data.get('developer', '—')}")
         self.genre_label.setText(f"🎭 Жанр: {self.game_data.get('genre', '—')}")
 
+        self.update_play_time()
+
         # Обновить обложку и кнопки
         self.update_cover_image()
         self.update_installation_status(self.is_installed)
 
+        # Прогрев запуска, пока пользователь смотрит страницу игры
+        if self.is_installed and self.game_data.get('id'):
+            try:
+                from settings import app_settings
+                if app_settings.get_prelaunch_cache():
+                    from app.modules.installer.prelaunch_cache import get_prelaunch_cache
+                    get_prelaunch_cache().prepare_async(self.game_data['id'])
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось запустить прогрев игры: {e}")
+
     def resizeEvent(self, event):
         """Обработчик изменения размера окна"""
         super().resizeEvent(event)
@@ -440,6 +454,25 @@ class GameInfoPage(QWidget):
         else:
             return f"{size_bytes / 1024:.0f} KB"
 
+    def update_play_time(self):
+        """Время в игре из статистики сессий"""
+        game_id = self.game_data.get('id')
+        seconds = 0
+        if game_id:
+            try:
+                from app.modules.installer.launch_supervisor import get_session_stats
+                seconds = get_session_stats().play_time(game_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось получить время в игре: {e}")
+
+        if seconds >= 3600:
+            play_time = f"{int(seconds // 3600)} ч {int(seconds % 3600 // 60)} мин"
+        elif seconds >= 60:
+            play_time = f"{int(seconds // 60)} мин"
+        else:
+            play_time = "—"
+        self.play_time_label.setText(f"⏱️ Время в игре: {play_time}")
+
     def update_installation_status(self, is_installed):
         """Обновить кнопки в зависимости от статуса установки"""
         self.is_installed = is_installed
@@ -668,15 +701,14 @@ class GameInfoPage(QWidget):
                 project_root = Path(".")
 
             # ИСПРАВЛЕНО: используем пути из настроек
-            from core import get_users_path, get_users_subpath
+            from core import get_users_path, get_users_subpath, load_installed_games
             registry_path = Path(get_users_path()) / "installed_games.json"
 
             if not registry_path.exists():
                 logger.warning("⚠️ Реестр установленных игр не найден")
                 return
 
-            with open(registry_path, 'r', encoding='utf-8') as f:
-                registry = json.load(f)
+            registry = load_installed_games(registry_path)
 
             game_id = game_data.get('id')
             game_info = registry.get(game_id)
@@ -685,9 +717,19 @@ class GameInfoPage(QWidget):
                 logger.warning(f"⚠️ Игра {game_id} не найдена в реестре")
                 return
 
+            # Если есть манифест установки - удаляем ровно записанные файлы
+            from app.modules.installer.install_manifest import InstallManifest
+            manifest_path = game_info.get('manifest_path')
+            manifest = InstallManifest.load(game_id, Path(manifest_path)) if manifest_path else None
+            if manifest:
+                manifest.remove_files()
+                Path(manifest_path).unlink(missing_ok=True)
+                logger.info(f"🗑️ Удален манифест установки: {manifest_path}")
+
             paths_to_delete = [
                 game_info.get('install_path'),
                 game_info.get('launcher_path'),
+                game_info.get('launch_spec_path'),
             ]
 
             for path_str in paths_to_delete:
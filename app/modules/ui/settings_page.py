@@ -15,6 +15,7 @@ from app.modules.settings_plugins.about_settings import AboutPage
 from modules.settings_plugins.general_settings import GeneralSettingsPage
 from modules.settings_plugins.appearance_settings import AppearanceSettingsPage
 from modules.settings_plugins.dev_settings import DevSettingsPage
+from modules.settings_plugins.library_settings import LibrarySettingsPage
 
 logger = logging.getLogger('ArcadeDeck.SettingsPage')
 
@@ -185,6 +186,7 @@ class SettingsPage(QWidget):
         settings_items = [
             {"name": "Общие", "icon": "", "page": GeneralSettingsPage},
             {"name": "Внешний вид", "icon": "", "page": AppearanceSettingsPage},
+            {"name": "Библиотека", "icon": "", "page": LibrarySettingsPage},
             {"name": "Инструменты отладки", "icon": "", "page": DevSettingsPage},
             {"name": "О ArcadeDeck", "icon": "", "page": AboutPage},
             {"name": "Выход", "icon": "", "page": None}
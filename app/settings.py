@@ -61,5 +61,33 @@ class AppSettings:
         self._ensure_settings()
         self._settings.setValue("Modules-dev-settings/auto_scroll", "true" if enabled else "false")
 
+    # Настройки установщика
+    def get_keep_archives(self):
+        self._ensure_settings()
+        value = self._settings.value("Installer/keep_archives", "false")
+        return value.lower() == "true"
+
+    def set_keep_archives(self, enabled):
+        self._ensure_settings()
+        self._settings.setValue("Installer/keep_archives", "true" if enabled else "false")
+
+    def get_max_parallel_downloads(self):
+        self._ensure_settings()
+        return self._settings.value("Installer/max_parallel_downloads", 2, type=int)
+
+    def set_max_parallel_downloads(self, count):
+        self._ensure_settings()
+        self._settings.setValue("Installer/max_parallel_downloads", count)
+
+    # Настройки запуска игр
+    def get_prelaunch_cache(self):
+        self._ensure_settings()
+        value = self._settings.value("Launcher/prelaunch_cache", "false")
+        return value.lower() == "true"
+
+    def set_prelaunch_cache(self, enabled):
+        self._ensure_settings()
+        self._settings.setValue("Launcher/prelaunch_cache", "true" if enabled else "false")
+
 # Глобальный экземпляр настроек
 app_settings = AppSettings()
@@ -319,22 +319,15 @@ class UpdateDownloaderThread(QThread):
             # Формируем имя файла
             self.download_path = os.path.join(temp_dir, self.asset_name)
 
-            # Скачиваем файл с прогрессом
-            response = requests.get(self.download_url, stream=True)
-            response.raise_for_status()
-
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            chunk_size = 8192
-
-            with open(self.download_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_size > 0:
-                            progress = int((downloaded / total_size) * 100)
-                            self.progress.emit(progress)
+            # Скачиваем файл с прогрессом (общий загрузчик: Range, докачка .part)
+            from app.modules.installer.http_downloader import HttpDownloader
+
+            def on_progress(downloaded, total_size):
+                if total_size > 0:
+                    self.progress.emit(int((downloaded / total_size) * 100))
+
+            if not HttpDownloader().download(self.download_url, self.download_path, on_progress):
+                raise Exception("Не удалось скачать обновление")
 
             # Распаковываем архив
             self.progress.emit(101)  # Сигнал начала распаковки
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Проверка HttpDownloader на локальном http.server: загрузка с нуля,
+докачка прерванного .part и перезапуск, если файл на сервере сменился.
+
+Запуск: python -m unittest discover tests
+"""
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'app' / 'modules'))
+
+from installer.http_downloader import HttpDownloader  # noqa: E402
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Отдает server.content с ETag, Range и If-Range"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        content, etag = server.content, server.etag
+        server.requests.append(dict(self.headers))
+
+        start, end = 0, len(content) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        partial = bool(match) and (if_range is None or if_range == etag)
+        if partial:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+
+        body = content[start:end + 1]
+        self.send_response(206 if partial else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(len(body)))
+        if partial:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HttpDownloaderTest(unittest.TestCase):
+
+    SIZE = 3 * 1024 * 1024
+    CHUNK = 64 * 1024
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FileHandler)
+        self.server.content = os.urandom(self.SIZE)
+        self.server.etag = '"v1"'
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/game.bin'
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.target = Path(self.tmp_dir.name) / 'game.bin'
+        self.part = self.target.with_name('game.bin.part')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def _downloader(self, stop_after_chunks=None) -> HttpDownloader:
+        """Загрузчик в одно соединение; stop_after_chunks - отмена после N блоков"""
+        chunks = []
+
+        def is_cancelled():
+            chunks.append(1)
+            return stop_after_chunks is not None and len(chunks) > stop_after_chunks
+
+        downloader = HttpDownloader(connections=1, is_cancelled=is_cancelled)
+        downloader.CHUNK_SIZE = self.CHUNK
+        return downloader
+
+    def _interrupt(self):
+        self.assertFalse(self._downloader(stop_after_chunks=10).download(self.url, self.target))
+        self.assertFalse(self.target.exists())
+        self.assertGreater(self.part.stat().st_size, 0)
+        self.assertLess(self.part.stat().st_size, self.SIZE)
+        self.server.requests.clear()
+
+    def test_fresh_download(self):
+        self.assertTrue(self._downloader().download(self.url, self.target))
+        self.assertEqual(self.target.read_bytes(), self.server.content)
+        self.assertFalse(self.part.exists())
+        self.assertFalse(self.part.with_name(self.part.name + '.json').exists())
+
+    def test_resume_interrupted_part(self):
+        self._interrupt()
+        offset = self.part.stat().st_size
+
+        self.assertTrue(self._downloader().download(self.url, self.target))
+        self.assertEqual(self.target.read_bytes(), self.server.content)
+        resumed = self.server.requests[-1]
+        self.assertEqual(resumed.get('Range'), f'bytes={offset}-')
+        self.assertEqual(resumed.get('If-Range'), '"v1"')
+
+    def test_changed_etag_restarts(self):
+        self._interrupt()
+        self.server.content = os.urandom(self.SIZE)
+        self.server.etag = '"v2"'
+
+        self.assertTrue(self._downloader().download(self.url, self.target))
+        self.assertEqual(self.target.read_bytes(), self.server.content)
+        self.assertNotIn('If-Range', self.server.requests[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()